@@ -0,0 +1,83 @@
+"""
+Incremental parsing of bulk address uploads.
+
+Uploads arrive as a stream of byte chunks in either CSV (with a header row)
+or NDJSON (one JSON object per line). Rows are yielded as soon as they are
+complete, so an upload is never held in memory as a whole.
+"""
+
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, Tuple
+
+CSV = "csv"
+NDJSON = "ndjson"
+
+
+def detect_format(content_type: str) -> str:
+    """Upload format implied by a Content-Type header; CSV unless it names JSON."""
+    content_type = (content_type or "").lower()
+    return NDJSON if "json" in content_type else CSV
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode UTF-8 chunks and yield complete lines without their line endings."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+
+async def iter_rows(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, Dict]]:
+    """
+    Yield (row_number, row) for each record in the upload.
+
+    row_number counts data rows from 1. A row that cannot be parsed is
+    yielded as a ValueError in place of the dict so the caller can report it
+    and carry on.
+    """
+    if fmt == NDJSON:
+        number = 0
+        async for line in iter_lines(chunks):
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                row = ValueError(f"Invalid JSON: {e}")
+            yield number, row
+        return
+
+    header = None
+    number = 0
+    record = ""
+    async for line in iter_lines(chunks):
+        # A quoted field may span lines; keep reading until the quotes balance
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            continue
+        number += 1
+        if len(values) > len(header):
+            yield number, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield number, {k: (v if v != "" else None) for k, v in zip(header, values)}
+    if record:
+        number += 1
+        yield number, ValueError("Unterminated quoted field")
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Benchmark every API route on synthetic city-scale data, offline.
+
+The app runs in-process against local_warehouse.LocalWarehouse (synthetic
+radon tests and NOAA tornado segments with simulated connect/query latency)
+and a SQLite store seeded with synthetic addresses, in a scratch data
+directory. Each scenario reports p50/p95/p99 latency, throughput and the
+process's peak RSS. A failed request or a route with no scenario fails the
+run. Timings depend on the machine, so comparing against a baseline is opt-in:
+record one locally with --update-baseline, then --compare fails the run on a
+latency, throughput or memory regression beyond the tolerance. No baseline is
+shipped with the repo.
+
+Usage:
+    python benchmark.py                     # full profile: 200k addresses, 1M radon tests
+    python benchmark.py --profile quick     # 10x smaller, for a fast check
+    python benchmark.py --only map/         # scenarios whose name contains "map/"
+    python benchmark.py --update-baseline   # record the results as this machine's baseline
+    python benchmark.py --compare           # fail on regressions against that baseline
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BACKEND_DIR, "benchmark_baseline.json")
+
+PROFILES = {
+    "full": {"addresses": 200000, "radon_tests": 1000000, "tornado_tracks": 4, "segments_per_track": 12},
+    "quick": {"addresses": 20000, "radon_tests": 100000, "tornado_tracks": 4, "segments_per_track": 12},
+}
+
+# Latency changes smaller than this are treated as noise regardless of tolerance
+MIN_REGRESSION_MS = 5.0
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+class Scenario:
+    """One benchmarked request shape for a route."""
+
+    def __init__(self, name: str, route: Tuple[str, str], request: Callable[[int], Request],
+                 iterations: int = 50, concurrency: int = 1, warmup: int = 1, expect=(200,),
+                 before: Optional[Callable] = None, requires: Optional[str] = None):
+        self.name = name
+        self.route = route
+        self.request = request
+        self.iterations = iterations
+        self.concurrency = concurrency
+        self.warmup = warmup
+        self.expect = expect
+        # Untimed coroutine run before each request (e.g. to drop a cache for cold measurements)
+        self.before = before
+        # Optional module the route needs; the scenario is skipped without it
+        self.requires = requires
+
+
+def get(path: str, **kwargs) -> Callable[[int], Request]:
+    return lambda i: ("GET", path, kwargs)
+
+
+def tile_for(lat: float, lon: float, z: int) -> Tuple[int, int, int]:
+    n = 2 ** z
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return z, x, y
+
+
+def peak_rss_mb() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * q / 100.0
+    low, high = math.floor(k), math.ceil(k)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def build_scenarios(main, seeded: Dict[str, List[str]], iterations: float) -> List[Scenario]:
+    """Scenarios covering every route; iterations scales the request counts."""
+    from radon_query import encode_cursor
+
+    def n(count: int) -> int:
+        return max(1, int(count * iterations))
+
+    neighborhood_ids = seeded["neighborhoods"]
+    address_ids = seeded["addresses"]
+    deletable_neighborhoods = seeded["deletable_neighborhoods"]
+    deletable_addresses = seeded["deletable_addresses"]
+
+    async def drop_map_caches():
+        main.tornado_path_cache.invalidate()
+        main.radon_results_cache.invalidate()
+
+    async def drop_radon_cache():
+        main.radon_results_cache.invalidate()
+
+    def new_neighborhood(i):
+        return ("POST", "/api/neighborhoods", {"json": {
+            "name": f"Bench Neighborhood {i}", "description": None, "risk_level": "high",
+            "messaging_template": "Free radon test kits available",
+        }})
+
+    def import_csv(i):
+        lines = ["address,neighborhood_id"] + [
+            f"\"{j} Bench Import Rd {i}, St. Louis, MO\",{neighborhood_ids[j % len(neighborhood_ids)]}"
+            for j in range(1000)
+        ]
+        return ("POST", "/api/addresses/import", {
+            "content": "\n".join(lines).encode(), "headers": {"Content-Type": "text/csv"},
+        })
+
+    def patch_addresses(i):
+        start = (i * 100) % (len(address_ids) - 100)
+        return ("PATCH", "/api/addresses", {"json": [
+            {"id": address_id, "status": "visited", "notes": f"bench {i}"}
+            for address_id in address_ids[start:start + 100]
+        ]})
+
+    downtown = (38.627, -90.199)
+    export_bbox = "38.60,38.66,-90.25,-90.18"
+    return [
+        Scenario("root", ("GET", "/"), get("/"), n(200)),
+        Scenario("ready", ("GET", "/api/ready"), get("/api/ready"), n(200)),
+        Scenario("status", ("GET", "/api/status"), get("/api/status"), n(200)),
+        Scenario("status-deep", ("GET", "/api/status"), get("/api/status", params={"deep": "true"}), n(20)),
+
+        Scenario("neighborhoods/list", ("GET", "/api/neighborhoods"), get("/api/neighborhoods"), n(100)),
+        Scenario("neighborhoods/create", ("POST", "/api/neighborhoods"), new_neighborhood, n(100)),
+        Scenario("neighborhoods/update", ("PUT", "/api/neighborhoods/{neighborhood_id}"),
+                 lambda i: ("PUT", f"/api/neighborhoods/{neighborhood_ids[i % len(neighborhood_ids)]}", {"json": {
+                     "name": f"Neighborhood {i}", "description": "updated", "risk_level": "medium",
+                     "messaging_template": "Test your home for radon",
+                 }}), n(100)),
+        Scenario("neighborhoods/delete", ("DELETE", "/api/neighborhoods/{neighborhood_id}"),
+                 lambda i: ("DELETE", f"/api/neighborhoods/{deletable_neighborhoods[i]}", {}),
+                 min(n(50), len(deletable_neighborhoods) - 1)),
+
+        Scenario("addresses/list", ("GET", "/api/addresses"), get("/api/addresses"), n(5)),
+        Scenario("addresses/list-by-neighborhood", ("GET", "/api/addresses"),
+                 lambda i: ("GET", "/api/addresses", {"params": {
+                     "neighborhood_id": neighborhood_ids[i % len(neighborhood_ids)], "status": "not_visited",
+                 }}), n(100)),
+        Scenario("addresses/not-modified", ("GET", "/api/addresses"),
+                 lambda i: ("GET", "/api/addresses", {"headers": {"If-None-Match": addresses_etag(main)}}),
+                 n(100), expect=(304,)),
+        Scenario("addresses/counts", ("GET", "/api/addresses/counts"), get("/api/addresses/counts"), n(50)),
+        Scenario("addresses/create", ("POST", "/api/addresses"),
+                 lambda i: ("POST", "/api/addresses", {"json": {
+                     "address": f"{i} Bench Create Ave, St. Louis, MO", "neighborhood_id": neighborhood_ids[0],
+                 }}), n(100)),
+        Scenario("addresses/import-1000", ("POST", "/api/addresses/import"), import_csv, n(10)),
+        Scenario("addresses/imports", ("GET", "/api/addresses/imports"), get("/api/addresses/imports"), n(100)),
+        Scenario("addresses/update", ("PUT", "/api/addresses/{address_id}"),
+                 lambda i: ("PUT", f"/api/addresses/{address_ids[i % len(address_ids)]}",
+                            {"json": {"status": "interested"}}), n(100)),
+        Scenario("addresses/patch-100", ("PATCH", "/api/addresses"), patch_addresses, n(20)),
+        Scenario("addresses/delete", ("DELETE", "/api/addresses/{address_id}"),
+                 lambda i: ("DELETE", f"/api/addresses/{deletable_addresses[i]}", {}),
+                 min(n(50), len(deletable_addresses) - 1)),
+        # After the writes above, so this is a typical small delta sync
+        Scenario("addresses/changes-since", ("GET", "/api/addresses"),
+                 lambda i: ("GET", "/api/addresses", {"params": {
+                     "since": max(0, main.store.collection_version("addresses") - 5),
+                 }}), n(100)),
+
+        Scenario("map/tornado-path", ("GET", "/api/map/tornado-path"), get("/api/map/tornado-path"), n(200),
+                 concurrency=8),
+        Scenario("map/tornado-path-cold", ("GET", "/api/map/tornado-path"), get("/api/map/tornado-path"), n(10),
+                 before=drop_map_caches),
+        Scenario("map/radon-results", ("GET", "/api/map/radon-results"), get("/api/map/radon-results"), n(5)),
+        Scenario("map/radon-results-columnar", ("GET", "/api/map/radon-results"),
+                 get("/api/map/radon-results", params={"format": "columnar"}), n(5)),
+        Scenario("map/radon-results-near-tornado", ("GET", "/api/map/radon-results"),
+                 get("/api/map/radon-results", params={"near_tornado": "true", "radius_miles": 1.0}), n(20),
+                 concurrency=4),
+        Scenario("map/radon-results-cold", ("GET", "/api/map/radon-results"),
+                 get("/api/map/radon-results", params={"format": "columnar"}), n(3), warmup=0,
+                 before=drop_radon_cache),
+        Scenario("map/radon-stream-near-tornado", ("GET", "/api/map/radon-results/stream"),
+                 get("/api/map/radon-results/stream", params={"near_tornado": "true", "radius_miles": 1.0}), n(5)),
+        Scenario("map/radon-page", ("GET", "/api/map/radon-results/page"),
+                 lambda i: ("GET", "/api/map/radon-results/page", {"params": {
+                     "limit": 1000, **({"cursor": encode_cursor(i * 1000)} if i else {}),
+                 }}), n(30), concurrency=4),
+        Scenario("map/tile-z11", ("GET", "/api/map/tiles/{z}/{x}/{y}"),
+                 get("/api/map/tiles/%d/%d/%d" % tile_for(*downtown, 11)), n(100), concurrency=4),
+        Scenario("map/tile-z16", ("GET", "/api/map/tiles/{z}/{x}/{y}"),
+                 get("/api/map/tiles/%d/%d/%d" % tile_for(*downtown, 16)), n(100), concurrency=4),
+
+        Scenario("export/radon-arrow", ("GET", "/api/export/radon-results"),
+                 get("/api/export/radon-results", params={"format": "arrow", "bbox": export_bbox}), n(5),
+                 requires="pyarrow"),
+        Scenario("export/radon-parquet", ("GET", "/api/export/radon-results"),
+                 get("/api/export/radon-results", params={"format": "parquet", "bbox": export_bbox}), n(5),
+                 requires="pyarrow"),
+        Scenario("export/tornado-parquet", ("GET", "/api/export/tornado-path"),
+                 get("/api/export/tornado-path", params={
+                     "format": "parquet", "start_date": "2015-01-01", "end_date": "2024-12-31",
+                 }), n(10), requires="pyarrow"),
+
+        Scenario("radon/hot-neighborhoods", ("GET", "/api/radon/hot-neighborhoods"),
+                 get("/api/radon/hot-neighborhoods", params={"minTests": 5, "sortBy": "percent"}), n(100)),
+
+        Scenario("admin/cache", ("GET", "/api/admin/cache"), get("/api/admin/cache"), n(100)),
+        Scenario("admin/warehouse", ("GET", "/api/admin/warehouse"), get("/api/admin/warehouse"), n(100)),
+        Scenario("admin/snapshots", ("GET", "/api/admin/snapshots"), get("/api/admin/snapshots"), n(100)),
+        Scenario("metrics", ("GET", "/api/metrics"), get("/api/metrics"), n(100)),
+        Scenario("admin/cache-invalidate", ("POST", "/api/admin/cache/invalidate"),
+                 lambda i: ("POST", "/api/admin/cache/invalidate", {}), n(50)),
+        # Last: once a snapshot exists the map routes read from it instead of the warehouse
+        Scenario("admin/snapshots-refresh", ("POST", "/api/admin/snapshots/refresh"),
+                 lambda i: ("POST", "/api/admin/snapshots/refresh", {}), n(3), warmup=0),
+    ]
+
+
+def addresses_etag(main) -> str:
+    """The ETag the full address listing currently has (see main.collection_response)."""
+    return f'W/"addresses-{main.store.collection_version("addresses")}-all-full"'
+
+
+def uncovered_routes(app, scenarios: List[Scenario]) -> List[str]:
+    """METHOD path for every app route that no scenario exercises."""
+    from fastapi.routing import APIRoute
+    covered = {s.route for s in scenarios}
+    missing = []
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            for method in sorted(route.methods - {"HEAD"}):
+                if (method, route.path) not in covered:
+                    missing.append(f"{method} {route.path}")
+    return missing
+
+
+def seed_store(main, addresses: int) -> Dict[str, List[str]]:
+    """Fill the store with neighborhoods and synthetic addresses; returns ids the scenarios use."""
+    from local_warehouse import generate_addresses
+
+    neighborhoods = [
+        main.store.insert_neighborhood({
+            "name": f"Neighborhood {i + 1}", "description": None, "risk_level": ["low", "medium", "high"][i % 3],
+            "messaging_template": "Free radon testing in your area", "created_at": "2024-06-01T09:00:00",
+        })["id"]
+        for i in range(120)
+    ]
+    inserted, _ = main.store.insert_addresses(generate_addresses(addresses, neighborhoods[:80]))
+    ids = [r["id"] for r in inserted]
+    return {
+        "neighborhoods": neighborhoods[:80],
+        "deletable_neighborhoods": neighborhoods[80:],
+        "addresses": ids[:-1000],
+        "deletable_addresses": ids[-1000:],
+    }
+
+
+async def fetch(client, method: str, url: str, kwargs: Dict[str, Any]) -> Tuple[int, bytes]:
+    """
+    Send a request and read the whole (still encoded) body; returns the status and its first bytes.
+
+    The body is not decoded or kept: httpx responses sit in reference cycles,
+    so keeping multi-megabyte bodies would inflate peak RSS until the next GC.
+    """
+    head = b""
+    async with client.stream(method, url, **kwargs) as response:
+        async for chunk in response.aiter_raw():
+            if len(head) < 200:
+                head += chunk[:200]
+    return response.status_code, head
+
+
+async def run_scenario(client, scenario: Scenario) -> Dict[str, Any]:
+    latencies: List[float] = []
+    failures: List[str] = []
+    setup_time = 0.0
+
+    for i in range(scenario.warmup):
+        method, url, kwargs = scenario.request(i)
+        await fetch(client, method, url, kwargs)
+
+    indexes = iter(range(scenario.warmup, scenario.warmup + scenario.iterations))
+
+    async def worker():
+        nonlocal setup_time
+        for i in indexes:
+            if scenario.before:
+                started = time.perf_counter()
+                await scenario.before()
+                setup_time += time.perf_counter() - started
+            method, url, kwargs = scenario.request(i)
+            started = time.perf_counter()
+            status, head = await fetch(client, method, url, kwargs)
+            latencies.append(time.perf_counter() - started)
+            if status not in scenario.expect:
+                failures.append(f"{method} {url} -> {status}: {head[:200]!r}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(scenario.concurrency)))
+    # Setup runs are serialized with the requests when concurrency is 1; exclude them
+    elapsed = time.perf_counter() - started - (setup_time if scenario.concurrency == 1 else 0.0)
+    return {
+        "requests": len(latencies),
+        "concurrency": scenario.concurrency,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "failures": failures[:5],
+    }
+
+
+async def run(args, config: Dict[str, Any]) -> Dict[str, Any]:
+    import httpx
+
+    import local_warehouse
+    import main
+
+    print(f"Generating {config['radon_tests']} radon tests and {config['addresses']} addresses...")
+    started = time.perf_counter()
+    warehouse = local_warehouse.LocalWarehouse(
+        local_warehouse.generate_radon_tests(config["radon_tests"]),
+        local_warehouse.generate_tornado_segments(config["tornado_tracks"], config["segments_per_track"]),
+        connect_latency=config["connect_latency"],
+        query_latency=config["query_latency"],
+        rows_per_second=config["rows_per_second"],
+    )
+    local_warehouse.install(warehouse)
+    seeded = seed_store(main, config["addresses"])
+    print(f"Data ready in {time.perf_counter() - started:.1f}s")
+
+    scenarios = build_scenarios(main, seeded, args.iterations)
+    missing = uncovered_routes(main.app, scenarios)
+    selected = [s for s in scenarios if not args.only or any(p in s.name for p in args.only)]
+
+    results: Dict[str, Any] = {"config": config, "routes": {}, "skipped": [], "uncovered_routes": missing}
+    started = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        # The warm-up runs in the background; measure until the app reports ready
+        while not main.startup_state["ready"]:
+            await asyncio.sleep(0.005)
+        results["startup_seconds"] = round(time.perf_counter() - started, 3)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for scenario in selected:
+                if scenario.requires:
+                    try:
+                        __import__(scenario.requires)
+                    except ImportError:
+                        results["skipped"].append(scenario.name)
+                        print(f"{scenario.name:<34} skipped ({scenario.requires} not installed)")
+                        continue
+                result = await run_scenario(client, scenario)
+                results["routes"][scenario.name] = result
+                print(f"{scenario.name:<34} p50 {result['p50_ms']:>9.2f}  p95 {result['p95_ms']:>9.2f}  "
+                      f"p99 {result['p99_ms']:>9.2f} ms  {result['throughput_rps']:>8.1f} req/s  "
+                      f"rss {result['peak_rss_mb']:>7.1f} MB")
+                for failure in result["failures"]:
+                    print(f"    failed: {failure}")
+    results["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    results["warehouse"] = warehouse.stats()
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of results against baseline, as messages."""
+    regressions = []
+    for name, current in results["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if not previous:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            limit = previous[key] * (1 + tolerance)
+            if current[key] > limit and current[key] - previous[key] > MIN_REGRESSION_MS:
+                regressions.append(f"{name}: {key} {current[key]:.2f} > {previous[key]:.2f} (+{tolerance:.0%})")
+        slower = current["p50_ms"] - previous["p50_ms"] > MIN_REGRESSION_MS
+        if slower and current["throughput_rps"] < previous["throughput_rps"] / (1 + tolerance):
+            regressions.append(
+                f"{name}: throughput {current['throughput_rps']:.1f} < {previous['throughput_rps']:.1f} req/s"
+            )
+    if baseline.get("peak_rss_mb") and results["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS {results['peak_rss_mb']:.1f} MB > {baseline['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="full")
+    parser.add_argument("--only", action="append", help="Run only scenarios whose name contains this (repeatable)")
+    parser.add_argument("--iterations", type=float, default=1.0, help="Scale every scenario's request count")
+    parser.add_argument("--connect-latency", type=float, default=0.3, help="Simulated warehouse login time (s)")
+    parser.add_argument("--query-latency", type=float, default=0.05, help="Simulated per-statement latency (s)")
+    parser.add_argument("--rows-per-second", type=float, default=None, help="Simulated transfer rate (rows/s)")
+    parser.add_argument("--tolerance", type=float, default=float(os.getenv("BENCHMARK_TOLERANCE", "0.25")),
+                        help="Allowed slowdown before a change counts as a regression (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--compare", action="store_true",
+                        help="Fail on regressions against the baseline (recorded on this machine)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--output", help="Also write the full results as JSON to this file")
+    args = parser.parse_args()
+
+    config = {
+        **PROFILES[args.profile],
+        "connect_latency": args.connect_latency,
+        "query_latency": args.query_latency,
+        "rows_per_second": args.rows_per_second,
+        "iterations": args.iterations,
+    }
+
+    # The app keeps its data relative to the working directory; use a scratch one.
+    # Background refreshes would race the measurements, and warming the caches
+    # up front would hide the cold-load scenarios (pyproj is already loaded by
+    # the data generator, and there is no Snowflake connector to import).
+    os.environ["SNAPSHOT_REFRESH_SECONDS"] = "0"
+    os.environ["HEALTH_CHECK_INTERVAL_SECONDS"] = "0"
+    os.environ.setdefault("STARTUP_WARMUP", "pool")
+    with tempfile.TemporaryDirectory(prefix="radon-benchmark-") as workdir:
+        os.chdir(workdir)
+        results = asyncio.run(run(args, config))
+        os.chdir(BACKEND_DIR)
+
+    print(f"Startup {results['startup_seconds']:.2f}s, peak RSS {results['peak_rss_mb']:.1f} MB, "
+          f"warehouse {results['warehouse']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    if results["uncovered_routes"]:
+        failed = True
+        print("Routes with no benchmark scenario:")
+        for route in results["uncovered_routes"]:
+            print(f"    {route}")
+    if any(r["failures"] for r in results["routes"].values()):
+        failed = True
+        print("Some requests failed (see above)")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baselines = json.load(f)
+    baseline = baselines.get(args.profile)
+
+    if args.update_baseline:
+        if failed:
+            print("Not updating the baseline: the run had failures")
+            return 1
+        recorded = {k: results[k] for k in ("config", "routes", "peak_rss_mb", "startup_seconds")}
+        if baseline and args.only:
+            # Partial run: keep the other scenarios' baselines
+            recorded["routes"] = {**baseline.get("routes", {}), **results["routes"]}
+            recorded["peak_rss_mb"] = baseline.get("peak_rss_mb", results["peak_rss_mb"])
+        for route in recorded["routes"].values():
+            route.pop("failures", None)
+        baselines[args.profile] = recorded
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline for profile '{args.profile}' written to {args.baseline}")
+        return 1 if failed else 0
+
+    if not args.compare:
+        return 1 if failed else 0
+    if baseline is None:
+        failed = True
+        print(f"No baseline for profile '{args.profile}'; run with --update-baseline to record one")
+    elif baseline.get("config") != config:
+        failed = True
+        print(f"Baseline for profile '{args.profile}' was recorded with different settings "
+              f"({baseline.get('config')}); not comparing")
+    else:
+        if args.only:
+            # Peak RSS depends on which scenarios ran
+            baseline = {**baseline, "peak_rss_mb": None}
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            failed = True
+            print("Regressions against the baseline:")
+            for message in regressions:
+                print(f"    {message}")
+        else:
+            print(f"No regressions against the '{args.profile}' baseline (tolerance {args.tolerance:.0%})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
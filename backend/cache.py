@@ -0,0 +1,114 @@
+"""
+In-process result cache for warehouse-backed endpoints.
+
+Entries have a per-cache TTL and the cache is bounded with LRU eviction. Once
+an entry expires it keeps being served while a background task reloads it
+(stale-while-revalidate), so callers only wait on the warehouse for the very
+first load of a key. Concurrent misses for the same key share a single load.
+A failed background refresh keeps the old value.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("value", "loaded_at", "refreshing")
+
+    def __init__(self, value: Any, loaded_at: float):
+        self.value = value
+        self.loaded_at = loaded_at
+        self.refreshing: Optional[asyncio.Task] = None
+
+
+class ResultCache:
+    """TTL + stale-while-revalidate cache with LRU eviction."""
+
+    def __init__(self, name: str, ttl: float, max_entries: int = 64, max_stale: Optional[float] = None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # How long past expiry a stale value may still be served; None means indefinitely
+        self.max_stale = max_stale
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._loads = SingleFlight(name)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, loading it with loader() on a miss."""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = now - entry.loaded_at
+            if age <= self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if self.max_stale is None or age <= self.ttl + self.max_stale:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if entry.refreshing is None:
+                    entry.refreshing = asyncio.create_task(self._refresh(key, entry, loader))
+                return entry.value
+
+        self.misses += 1
+        return await self._loads.do(key, lambda: self._load(key, loader))
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+        self._store(key, value)
+        return value
+
+    async def _refresh(self, key: Hashable, entry: _Entry, loader: Callable[[], Awaitable[Any]]):
+        try:
+            value = await loader()
+        except Exception as e:
+            self.refresh_errors += 1
+            logger.warning(f"Background refresh of {self.name} cache failed: {e}")
+            entry.refreshing = None
+            return
+        if self._entries.get(key) is entry:
+            self._store(key, value)
+        entry.refreshing = None
+
+    def _store(self, key: Hashable, value: Any):
+        self._entries[key] = _Entry(value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> int:
+        """Drop one key, or every key if none is given. Returns the number of entries removed."""
+        if key is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        return 1 if self._entries.pop(key, None) is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refresh_errors": self.refresh_errors,
+            # Misses that waited on another caller's load instead of starting their own
+            "coalesced_misses": self._loads.coalesced,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,153 @@
+"""
+Circuit breaker for warehouse calls, and the degraded-response flag.
+
+After failure_threshold consecutive failures the circuit opens and calls fail
+immediately with CircuitOpenError, so callers fall back to cached or sample
+data in milliseconds instead of waiting on connect timeouts. Once
+reset_timeout has passed a single probe call is let through (half-open): if
+it succeeds the circuit closes, otherwise it reopens with the timeout
+doubled, up to max_reset_timeout.
+
+Requests that were served from a fallback are flagged with an
+X-Data-Degraded response header: code on the fallback path calls
+mark_degraded(reason) and DegradedMiddleware adds the header.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEGRADED_HEADER = b"x-data-degraded"
+
+# Reasons the current request was degraded; a shared list, so marks made on worker threads are seen too
+_degraded: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("degraded", default=None)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the warehouse while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker with exponential backoff between probes. Thread-safe."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 max_reset_timeout: float = 300.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max(reset_timeout, max_reset_timeout)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        self.opened = 0
+        self.rejected = 0
+        self._backoff = reset_timeout
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead (closed, or the one half-open probe)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self._backoff:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self._backoff - (time.monotonic() - self._opened_at))
+        mark_degraded("circuit-open")
+        raise CircuitOpenError(f"{self.name} circuit is open (last error: {self.last_error}); retry in {retry_in:.0f}s")
+
+    def cancel_call(self):
+        """The call allowed by before_call never reached the warehouse; count it neither way."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"{self.name} circuit closed")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._backoff = self.reset_timeout
+            self._probing = False
+
+    def record_failure(self, error: Any):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = str(error) or type(error).__name__
+            if self.state == HALF_OPEN:
+                # The probe failed: stay open for longer
+                self._backoff = min(self._backoff * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        """Caller holds the lock."""
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+        self.opened += 1
+        logger.warning(f"{self.name} circuit open for {self._backoff:g}s after: {self.last_error}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self._backoff - (time.monotonic() - self._opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "last_error": self.last_error,
+                "retry_in_seconds": retry_in,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+def mark_degraded(reason: str):
+    """Flag the current request as served from cached or fallback data."""
+    reasons = _degraded.get()
+    if reasons is not None and reason not in reasons:
+        reasons.append(reason)
+
+
+class DegradedMiddleware:
+    """ASGI middleware adding X-Data-Degraded to responses that called mark_degraded."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        reasons: List[str] = []
+        token = _degraded.set(reasons)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and reasons:
+                headers = list(message.get("headers", []))
+                headers.append((DEGRADED_HEADER, ",".join(reasons).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _degraded.reset(token)
@@ -0,0 +1,88 @@
+"""
+Compact encodings for map payloads.
+
+The row format repeats every key on every radon result. The columnar format
+sends one array per field instead: coordinates as integers quantized to
+COORDINATE_SCALE (1e-5 degrees, about a meter), and the low-cardinality text
+fields (valid_test, city, zip_code) dictionary-encoded as a list of distinct
+values plus one small integer code per row.
+
+Payloads are serialized with orjson when it is installed and fall back to
+the standard json module otherwise. Brotli compression is used for clients
+that accept it when the brotli package is installed; gzip is applied by the
+middleware for everyone else. Both packages are listed in
+requirements-speedups.txt.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COORDINATE_SCALE = 100000
+RESULT_DECIMALS = 3
+DICTIONARY_FIELDS = ("valid_test", "city", "zip_code")
+MIN_COMPRESS_SIZE = 1000
+BROTLI_QUALITY = 5
+
+
+def dumps(payload: Any) -> bytes:
+    """Serialize payload to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def _dictionary_encode(values: List) -> Dict[str, List]:
+    index: Dict[Any, int] = {}
+    codes = [index.setdefault(v, len(index)) for v in values]
+    return {"values": list(index), "codes": codes}
+
+
+def _float_column(results: List[Dict], field: str) -> np.ndarray:
+    return np.array([r.get(field) for r in results], dtype=np.float64)
+
+
+def to_columnar(results: List[Dict]) -> Dict:
+    """Columnar encoding of radon result rows (see the module docstring)."""
+    payload: Dict[str, Any] = {
+        "format": "columnar",
+        "count": len(results),
+        "coordinate_scale": COORDINATE_SCALE,
+        "latitude": np.rint(_float_column(results, "latitude") * COORDINATE_SCALE).astype(np.int64).tolist(),
+        "longitude": np.rint(_float_column(results, "longitude") * COORDINATE_SCALE).astype(np.int64).tolist(),
+        "final_result": np.round(_float_column(results, "final_result"), RESULT_DECIMALS).tolist(),
+    }
+    for field in DICTIONARY_FIELDS:
+        payload[field] = _dictionary_encode([r.get(field) for r in results])
+    if results and "distance_miles" in results[0]:
+        payload["distance_miles"] = np.round(_float_column(results, "distance_miles"), RESULT_DECIMALS).tolist()
+    return payload
+
+
+def json_response(request: Optional[Request], payload: Any) -> Response:
+    """
+    JSON response built with the fast serializer.
+
+    Large bodies are brotli-compressed here when the client accepts br and
+    brotli is installed; otherwise they are left to the gzip middleware.
+    """
+    body = dumps(payload)
+    headers = {}
+    accept = request.headers.get("accept-encoding", "") if request is not None else ""
+    if brotli is not None and len(body) >= MIN_COMPRESS_SIZE and "br" in accept:
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+        headers = {"Content-Encoding": "br", "Vary": "Accept-Encoding"}
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,64 @@
+"""
+Shared fixtures for the backend tests.
+
+The app keeps its data relative to the working directory and reads its
+settings at import time, so main is imported once per session from a scratch
+directory with Snowflake disabled and background jobs off. Tests that need a
+warehouse use the local_warehouse stand-in through the `warehouse` fixture.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+# Helper script for trying account identifiers, not a test
+collect_ignore = ["test_snowflake_account.py"]
+
+
+@pytest.fixture(scope="session")
+def main_module():
+    for name in [k for k in os.environ if k.startswith("SNOWFLAKE_")]:
+        os.environ.pop(name)
+    os.environ.update({
+        "USE_SNOWFLAKE": "false",
+        "SNAPSHOT_REFRESH_SECONDS": "0",
+        "HEALTH_CHECK_INTERVAL_SECONDS": "0",
+        "STARTUP_WARMUP": "",
+    })
+    cwd = os.getcwd()
+    workdir = tempfile.TemporaryDirectory(prefix="radon-tests-")
+    os.chdir(workdir.name)
+    import main
+    yield main
+    main.store.close()
+    os.chdir(cwd)
+    workdir.cleanup()
+
+
+@pytest.fixture
+def client(main_module):
+    from fastapi.testclient import TestClient
+    with TestClient(main_module.app) as client:
+        yield client
+
+
+@pytest.fixture
+def warehouse(main_module, monkeypatch):
+    """A small LocalWarehouse installed in place of Snowflake, with fresh caches and breaker."""
+    import local_warehouse
+    import snowflake_connection
+    from circuit import CircuitBreaker
+
+    warehouse = local_warehouse.LocalWarehouse(
+        local_warehouse.generate_radon_tests(5000),
+        local_warehouse.generate_tornado_segments(),
+    )
+    monkeypatch.setattr(snowflake_connection, "USE_SNOWFLAKE", True)
+    monkeypatch.setattr(snowflake_connection, "get_snowflake_connection", warehouse.connect)
+    monkeypatch.setattr(snowflake_connection, "breaker", CircuitBreaker("snowflake"))
+    for cache in main_module.CACHES.values():
+        cache.invalidate()
+    yield warehouse
+    for cache in main_module.CACHES.values():
+        cache.invalidate()
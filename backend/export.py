@@ -0,0 +1,168 @@
+"""
+Apache Arrow IPC and Parquet exports of the radon and tornado datasets.
+
+Each Snowflake result chunk arrives as a pyarrow Table (see
+iter_snowflake_arrow_batches), is cast to a fixed export schema, gets
+latitude/longitude columns for radon rows, and is written straight to the
+output stream, so no Python object is built per row and memory stays bounded
+by one chunk.
+
+pyarrow is optional and imported on first use, so it costs nothing at
+startup; without it the export endpoints report 501.
+"""
+
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from projection import bbox_mask, utm_to_latlon
+
+# Media type and file extension per export format
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+class ExportUnavailableError(Exception):
+    """Raised when pyarrow is not installed."""
+
+
+@lru_cache(maxsize=None)
+def require_pyarrow():
+    """The pyarrow module, imported on first use. Raises ExportUnavailableError if it is not installed."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ExportUnavailableError("Arrow/Parquet export requires the pyarrow package") from e
+    return pyarrow
+
+
+@lru_cache(maxsize=None)
+def radon_schema():
+    pa = require_pyarrow()
+    return pa.schema([
+        ("object_id", pa.int64()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("x_coord", pa.float64()),
+        ("y_coord", pa.float64()),
+        ("final_result", pa.float64()),
+        ("valid_test", pa.string()),
+        ("city", pa.string()),
+        ("zip_code", pa.string()),
+    ])
+
+
+@lru_cache(maxsize=None)
+def tornado_schema():
+    pa = require_pyarrow()
+    return pa.schema([
+        ("begin_lat", pa.float64()),
+        ("begin_lon", pa.float64()),
+        ("end_lat", pa.float64()),
+        ("end_lon", pa.float64()),
+        ("begin_date", pa.string()),
+        ("event_type", pa.string()),
+    ])
+
+
+def parse_bbox(value: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """Parse "lat_min,lat_max,lon_min,lon_max". Raises ValueError if malformed."""
+    if not value:
+        return None
+    parts = [float(p) for p in value.split(",")]
+    if len(parts) != 4 or parts[0] > parts[1] or parts[2] > parts[3]:
+        raise ValueError(f"Invalid bbox: {value} (expected lat_min,lat_max,lon_min,lon_max)")
+    return tuple(parts)
+
+
+def _conform(table, schema):
+    """Lowercase column names and cast to schema; Snowflake chunk types vary (e.g. int8 vs int64)."""
+    pa = require_pyarrow()
+    table = table.rename_columns([name.lower() for name in table.column_names])
+    return pa.table([table.column(f.name).cast(f.type) for f in schema], schema=schema)
+
+
+def radon_batch(table, bbox=None):
+    """Export-schema table for one radon result chunk, with lat/lon added and the exact bbox applied."""
+    pa = require_pyarrow()
+    table = table.rename_columns([name.lower() for name in table.column_names])
+    x = table.column("x_coord").to_numpy(zero_copy_only=False).astype(np.float64)
+    y = table.column("y_coord").to_numpy(zero_copy_only=False).astype(np.float64)
+    lat, lon = utm_to_latlon(x, y)
+    table = table.append_column("latitude", pa.array(lat)).append_column("longitude", pa.array(lon))
+    # Snowflake filtered on a UTM box that slightly exceeds the lat/lon box
+    keep = np.isfinite(lat) & np.isfinite(lon)
+    if bbox is not None:
+        keep &= bbox_mask(lat, lon, bbox)
+    if not keep.all():
+        table = table.filter(pa.array(keep))
+    return _conform(table, radon_schema())
+
+
+def tornado_batch(table):
+    return _conform(table, tornado_schema())
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last take()."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def writable(self) -> bool:
+        return True
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def encode_batches(tables: Iterator, schema, fmt: str) -> Iterator[bytes]:
+    """Encode tables (already in schema) as an Arrow IPC stream or Parquet file, yielding bytes per table."""
+    pa = require_pyarrow()
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pa.parquet.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for table in tables:
+            if table.num_rows:
+                writer.write_table(table)
+                data = sink.take()
+                if data:
+                    yield data
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def export_query(fetch_batches, query: str, params, convert, schema, fmt: str) -> Iterator[bytes]:
+    """Run query through fetch_batches (yielding pyarrow Tables) and encode the converted chunks."""
+    batches = fetch_batches(query, params)
+    try:
+        yield from encode_batches((convert(t) for t in batches), schema, fmt)
+    finally:
+        batches.close()
@@ -0,0 +1,90 @@
+"""
+Background warehouse health monitor.
+
+Polling /api/status used to open a Snowflake connection per call. Instead a
+background task probes the warehouse every interval seconds and records the
+outcome, and /api/status answers from that record. A deep check runs a probe
+on demand (concurrent deep checks share one probe).
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Runs probe() on a schedule and keeps its latest outcome."""
+
+    def __init__(self, probe: Callable[[], Awaitable[bool]], interval: float = 30.0, timeout: float = 10.0):
+        self.probe_fn = probe
+        self.interval = interval
+        self.timeout = timeout
+        self.connected: Optional[bool] = None  # None until the first probe finishes
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[str] = None
+        self.last_success_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[str] = None
+        self.consecutive_failures = 0
+        self.probes = 0
+        self._checked_monotonic: Optional[float] = None
+        self._probing: Optional[asyncio.Task] = None
+
+    async def probe(self) -> Dict[str, Any]:
+        """Probe now and return the updated state; joins a probe that is already running."""
+        if self._probing is None:
+            self._probing = asyncio.ensure_future(self._probe())
+            self._probing.add_done_callback(lambda _: setattr(self, "_probing", None))
+        await asyncio.shield(self._probing)
+        return self.state()
+
+    async def _probe(self):
+        started = time.perf_counter()
+        error = None
+        try:
+            connected = bool(await asyncio.wait_for(self.probe_fn(), timeout=self.timeout))
+            if not connected:
+                error = "No connection available"
+        except asyncio.TimeoutError:
+            connected, error = False, f"Probe timed out after {self.timeout:g}s"
+        except Exception as e:
+            connected, error = False, str(e) or type(e).__name__
+        now = datetime.now().isoformat()
+        self.probes += 1
+        self.connected = connected
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.checked_at = now
+        self._checked_monotonic = time.monotonic()
+        if connected:
+            self.last_success_at = now
+            self.consecutive_failures = 0
+        else:
+            self.last_error = error
+            self.last_error_at = now
+            self.consecutive_failures += 1
+            logger.warning(f"Warehouse health probe failed: {error}")
+
+    async def run(self):
+        """Probe every interval seconds until cancelled."""
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.interval)
+
+    def state(self) -> Dict[str, Any]:
+        age = time.monotonic() - self._checked_monotonic if self._checked_monotonic is not None else None
+        return {
+            "connected": self.connected,
+            "latency_ms": self.latency_ms,
+            "checked_at": self.checked_at,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "last_success_at": self.last_success_at,
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at,
+            "consecutive_failures": self.consecutive_failures,
+            "probes": self.probes,
+            "interval_seconds": self.interval,
+        }
@@ -0,0 +1,116 @@
+"""
+Incrementally maintained radon summary per neighborhood.
+
+Keeps, for each (neighborhood, zip_code, ward), the number of valid tests,
+the sum of their results and how many are at or above the 4.0 pCi/L action
+level. New tests are folded in as partial aggregates (only rows past the last
+seen object_id are queried), so the summary is never recomputed from
+scratch. Neighborhoods are kept presorted for each supported sort order, and
+the rows for each order are memoized until the summary next changes, so the
+memo holds at most one list per sort order.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+SORT_ORDERS = ("average", "count", "percent")
+
+GroupKey = Tuple[str, Optional[str], Optional[int]]
+
+# Partial aggregates for tests newer than a watermark, grouped like the summary
+DELTA_QUERY = """
+SELECT
+    n.neighborhood,
+    n.zip_code,
+    n.ward,
+    COUNT(*) as test_count,
+    SUM(r.final_result) as result_sum,
+    SUM(CASE WHEN r.final_result >= 4.0 THEN 1 ELSE 0 END) as high_risk_count,
+    MAX(r.object_id) as max_object_id
+FROM archdata.raw.radon_test_results r
+JOIN neighborhood_reference n ON r.zip_code::STRING = n.zip_code::STRING
+WHERE (r.valid_test = 'YES' OR r.valid_test = 'Y')
+    AND r.city = 'St. Louis'
+    AND r.object_id > %(after_id)s
+GROUP BY n.neighborhood, n.zip_code, n.ward
+"""
+
+
+class NeighborhoodSummary:
+    """Per-neighborhood count, sum and high-risk count with presorted views."""
+
+    def __init__(self):
+        self._groups: Dict[GroupKey, Dict] = {}
+        self._sorted: Dict[str, List[GroupKey]] = {order: [] for order in SORT_ORDERS}
+        self._memo: Dict[str, List[Dict]] = {}
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self.watermark = 0
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def merge(self, rows: List[Dict], after: Optional[int] = None) -> bool:
+        """
+        Fold partial aggregates (neighborhood, zip_code, ward, test_count, result_sum, high_risk_count) in.
+
+        With after, rows are the delta queried past that watermark; they are
+        dropped (returning False) if the summary has moved past it since, so
+        the same tests are never counted twice.
+        """
+        if after is not None and after != self.watermark:
+            return False
+        if not rows:
+            return True
+        for row in rows:
+            key = (row["neighborhood"], row.get("zip_code"), row.get("ward"))
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = {"count": 0, "sum": 0.0, "above": 0}
+            group["count"] += int(row["test_count"])
+            group["sum"] += float(row["result_sum"])
+            group["above"] += int(row["high_risk_count"])
+            max_id = row.get("max_object_id")
+            if max_id is not None and max_id > self.watermark:
+                self.watermark = max_id
+        self._resort()
+        return True
+
+    def _metric(self, key: GroupKey, order: str) -> float:
+        group = self._groups[key]
+        if order == "count":
+            return group["count"]
+        if order == "percent":
+            return group["above"] / group["count"]
+        return group["sum"] / group["count"]
+
+    def _resort(self):
+        for order in SORT_ORDERS:
+            self._sorted[order] = sorted(self._groups, key=lambda k: self._metric(k, order), reverse=True)
+        self._memo.clear()
+        self.version += 1
+
+    def _row(self, key: GroupKey) -> Dict:
+        group = self._groups[key]
+        neighborhood, zip_code, ward = key
+        return {
+            "neighborhood": neighborhood,
+            "zip_code": zip_code,
+            "ward": ward,
+            "test_count": group["count"],
+            "average_radon_level": round(group["sum"] / group["count"], 2),
+            "high_risk_count": group["above"],
+            "percent_above_action_level": round(group["above"] * 100.0 / group["count"], 1),
+        }
+
+    def query(self, min_tests: int = 5, sort_by: str = "average") -> List[Dict]:
+        """Neighborhoods with at least min_tests tests, in sort_by order (one of SORT_ORDERS)."""
+        if sort_by not in SORT_ORDERS:
+            raise ValueError(f"Unknown sort order: {sort_by}")
+        rows = self._memo.get(sort_by)
+        if rows is None:
+            self.memo_misses += 1
+            rows = self._memo[sort_by] = [self._row(k) for k in self._sorted[sort_by]]
+        else:
+            self.memo_hits += 1
+        return [row for row in rows if row["test_count"] >= min_tests]
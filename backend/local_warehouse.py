@@ -0,0 +1,408 @@
+"""
+Offline stand-in for the Snowflake warehouse, used by the benchmarks.
+
+LocalWarehouse holds synthetic radon tests, NOAA tornado segments and a
+neighborhood reference table in numpy arrays and answers the statements the
+backend issues (built by radon_query, noaa_schema and hot_neighborhoods)
+through a small DB-API style connection. install() points
+snowflake_connection at it, so execute_snowflake_query, the column and batch
+variants and the connection pool all run their real code against local data.
+
+connect_latency and query_latency add a fixed delay per login and per
+statement, and rows_per_second (if set) adds transfer time proportional to
+the rows fetched, to mimic a remote warehouse.
+"""
+
+import re
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from projection import ST_LOUIS_BBOX, get_transformer
+
+# St. Louis city zip codes; a few tests fall in neighboring cities
+ZIP_CODES = [
+    "63101", "63102", "63103", "63104", "63106", "63107", "63108", "63109", "63110", "63111",
+    "63112", "63113", "63115", "63116", "63118", "63120", "63123", "63137", "63139", "63147",
+]
+OTHER_CITIES = ["Clayton", "University City", "Maplewood", "Webster Groves"]
+TORNADO_DATE = "2024-05-16"
+TORNADO_COLUMNS = ["begin_lat", "begin_lon", "end_lat", "end_lon", "begin_date", "event_type"]
+
+
+def generate_radon_tests(count: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Synthetic radon test table: count rows ordered by object_id.
+
+    Locations are clustered around neighborhood centres inside the St. Louis
+    box (a few percent outside it, and a few with no coordinates), results
+    are log-normal around the action level, about 5% of tests are invalid
+    and about 10% are in other cities.
+    """
+    rng = np.random.default_rng(seed)
+    lat_min, lat_max, lon_min, lon_max = ST_LOUIS_BBOX
+    centres = np.column_stack([rng.uniform(lat_min, lat_max, 200), rng.uniform(lon_min, lon_max, 200)])
+    picks = rng.integers(0, len(centres), count)
+    lat = centres[picks, 0] + rng.normal(0, 0.01, count)
+    lon = centres[picks, 1] + rng.normal(0, 0.012, count)
+    stray = rng.random(count) < 0.03
+    lat[stray] += rng.choice([-0.6, 0.6], stray.sum())
+    x, y = get_transformer(inverse=True).transform(lon, lat)
+    x, y = np.asarray(x), np.asarray(y)
+    missing = rng.random(count) < 0.005
+    x[missing] = 0.0
+    y[missing] = 0.0
+
+    city = np.full(count, "St. Louis", dtype=object)
+    elsewhere = rng.random(count) < 0.1
+    city[elsewhere] = rng.choice(OTHER_CITIES, elsewhere.sum())
+    valid_test = rng.choice(np.array(["Y", "YES", "N"], dtype=object), count, p=[0.6, 0.35, 0.05])
+    start = date(2010, 1, 1)
+    test_date = np.array([(start + timedelta(days=int(d))).isoformat() for d in rng.integers(0, 5400, count)],
+                         dtype=object)
+    return {
+        "object_id": np.arange(1, count + 1, dtype=np.int64),
+        "x_coord": x,
+        "y_coord": y,
+        "final_result": np.round(rng.lognormal(np.log(2.5), 0.8, count), 1),
+        "valid_test": valid_test,
+        "city": city,
+        "zip_code": np.array(ZIP_CODES, dtype=object)[picks % len(ZIP_CODES)],
+        "test_date": test_date,
+    }
+
+
+def generate_tornado_segments(tracks: int = 4, segments_per_track: int = 12, other_events: int = 200,
+                              seed: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Synthetic NOAA storm events: tracks of connected segments on TORNADO_DATE
+    crossing St. Louis, plus other events (other dates, other event types).
+    """
+    rng = np.random.default_rng(seed)
+    rows: List[Tuple] = []
+    for _ in range(tracks):
+        lat, lon = rng.uniform(38.55, 38.65), rng.uniform(-90.30, -90.25)
+        for _ in range(segments_per_track):
+            end_lat = lat + rng.uniform(0.002, 0.012)
+            end_lon = lon + rng.uniform(0.003, 0.012)
+            rows.append((lat, lon, end_lat, end_lon, TORNADO_DATE, "TORNADO"))
+            lat, lon = end_lat, end_lon
+    start = date(2015, 1, 1)
+    for _ in range(other_events):
+        lat, lon = rng.uniform(38.4, 38.9), rng.uniform(-90.5, -90.0)
+        event_date = (start + timedelta(days=int(rng.integers(0, 3600)))).isoformat()
+        event_type = "TORNADO" if rng.random() < 0.5 else "THUNDERSTORM WIND"
+        rows.append((lat, lon, lat + 0.01, lon + 0.01, event_date, event_type))
+    return {name: np.array(values, dtype=object if name in ("begin_date", "event_type") else np.float64)
+            for name, values in zip(TORNADO_COLUMNS, zip(*rows))}
+
+
+def generate_neighborhood_reference(per_zip: int = 4) -> Dict[str, np.ndarray]:
+    """neighborhood_reference rows: per_zip neighborhoods in each zip code, with a ward."""
+    names, zips, wards = [], [], []
+    for i, zip_code in enumerate(ZIP_CODES):
+        for j in range(per_zip):
+            names.append(f"Neighborhood {i * per_zip + j + 1}")
+            zips.append(zip_code)
+            wards.append(i % 14 + 1)
+    return {
+        "neighborhood": np.array(names, dtype=object),
+        "zip_code": np.array(zips, dtype=object),
+        "ward": np.array(wards, dtype=np.int64),
+    }
+
+
+def generate_addresses(count: int, neighborhood_ids: Sequence[str], seed: int = 0) -> List[Dict]:
+    """Canvassing address records (unique street addresses) spread over the given neighborhoods."""
+    rng = np.random.default_rng(seed)
+    streets = ["Grand", "Natural Bridge", "Kingshighway", "Florissant", "Jefferson", "Broadway",
+               "Union", "Goodfellow", "Page", "Delmar", "Gravois", "Chippewa"]
+    suffixes = ["Ave", "Blvd", "St", "Dr"]
+    statuses = np.array(["not_visited", "visited", "interested", "scheduled", "completed"], dtype=object)
+    status = rng.choice(statuses, count, p=[0.6, 0.2, 0.1, 0.05, 0.05])
+    neighborhood = rng.integers(0, len(neighborhood_ids), count) if neighborhood_ids else None
+    return [
+        {
+            "address": f"{i + 100} {streets[i % len(streets)]} {suffixes[(i // len(streets)) % len(suffixes)]}, "
+                       f"St. Louis, MO {ZIP_CODES[i % len(ZIP_CODES)]}",
+            "neighborhood_id": neighborhood_ids[neighborhood[i]] if neighborhood is not None else None,
+            "status": status[i],
+            "notes": None,
+            "visited_at": None,
+            "created_at": "2024-06-01T09:00:00",
+        }
+        for i in range(count)
+    ]
+
+
+def _split_select_list(sql: str) -> List[Tuple[str, str]]:
+    """(expression, output name) for each item between SELECT and FROM."""
+    match = re.search(r"\bSELECT\b(.*?)\bFROM\b", sql, re.IGNORECASE | re.DOTALL)
+    items = []
+    for item in match.group(1).split(","):
+        item = item.strip()
+        parts = re.split(r"\s+as\s+", item, flags=re.IGNORECASE)
+        expression = parts[0].strip()
+        items.append((expression, (parts[1] if len(parts) > 1 else expression.split(".")[-1]).strip().lower()))
+    return items
+
+
+def _segment_distances(x: np.ndarray, y: np.ndarray, wkt: str) -> np.ndarray:
+    """Planar distance from each point to the nearest segment (or point) in a WKT geometry collection."""
+    result = np.full(len(x), np.inf)
+    for kind, coords in re.findall(r"(LINESTRING|POINT)\(([^)]*)\)", wkt):
+        vertices = np.array([[float(v) for v in pair.split()] for pair in coords.split(",")])
+        if len(vertices) == 1:
+            vertices = np.vstack([vertices, vertices])
+        for (ax, ay), (bx, by) in zip(vertices[:-1], vertices[1:]):
+            dx, dy = bx - ax, by - ay
+            length2 = dx * dx + dy * dy
+            t = np.clip(((x - ax) * dx + (y - ay) * dy) / length2, 0.0, 1.0) if length2 else 0.0
+            result = np.minimum(result, np.hypot(x - ax - t * dx, y - ay - t * dy))
+    return result
+
+
+class LocalCursor:
+    """The subset of the Snowflake cursor API used by snowflake_connection."""
+
+    def __init__(self, warehouse: "LocalWarehouse"):
+        self._warehouse = warehouse
+        self._columns: List[np.ndarray] = []
+        self._position = 0
+        self._rows = 0
+        self.description = None
+        self.rowcount = -1
+
+    def execute(self, query: str, params: Optional[Dict] = None):
+        names, self._columns = self._warehouse.run(query, params or {})
+        self.description = [(name.upper(), None, None, None, None, None, None) for name in names]
+        self._rows = len(self._columns[0]) if self._columns else 0
+        self._position = 0
+        self.rowcount = self._rows
+        return self
+
+    def _take(self, count: int) -> List[Tuple]:
+        end = min(self._rows, self._position + count)
+        chunk = [column[self._position:end].tolist() for column in self._columns]
+        self._warehouse.transfer(end - self._position)
+        self._position = end
+        return list(zip(*chunk))
+
+    def fetchall(self) -> List[Tuple]:
+        return self._take(self._rows - self._position)
+
+    def fetchmany(self, size: int) -> List[Tuple]:
+        return self._take(size)
+
+    def fetchone(self) -> Optional[Tuple]:
+        rows = self._take(1)
+        return rows[0] if rows else None
+
+    def fetch_arrow_batches(self):
+        import pyarrow as pa
+        names = [d[0] for d in self.description]
+        while self._position < self._rows:
+            end = min(self._rows, self._position + self._warehouse.arrow_chunk_rows)
+            arrays = [pa.array(column[self._position:end].tolist()) for column in self._columns]
+            self._warehouse.transfer(end - self._position)
+            self._position = end
+            yield pa.table(arrays, names=names)
+
+    def close(self):
+        self._columns = []
+
+
+class LocalConnection:
+    def __init__(self, warehouse: "LocalWarehouse"):
+        self._warehouse = warehouse
+        self._closed = False
+
+    def cursor(self) -> LocalCursor:
+        if self._closed:
+            raise Exception("Connection is closed")
+        return LocalCursor(self._warehouse)
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        self._closed = True
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class LocalWarehouse:
+    """Synthetic warehouse tables plus simulated latency; see the module docstring."""
+
+    def __init__(self, radon: Dict[str, np.ndarray], tornado: Dict[str, np.ndarray],
+                 neighborhoods: Optional[Dict[str, np.ndarray]] = None, connect_latency: float = 0.0,
+                 query_latency: float = 0.0, rows_per_second: Optional[float] = None,
+                 arrow_chunk_rows: int = 100000):
+        self.radon = radon
+        self.tornado = tornado
+        self.neighborhoods = neighborhoods if neighborhoods is not None else generate_neighborhood_reference()
+        self.connect_latency = connect_latency
+        self.query_latency = query_latency
+        self.rows_per_second = rows_per_second
+        self.arrow_chunk_rows = arrow_chunk_rows
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.queries = 0
+        self.rows_fetched = 0
+
+    def connect(self) -> LocalConnection:
+        """Drop-in for snowflake_connection.get_snowflake_connection."""
+        if self.connect_latency:
+            time.sleep(self.connect_latency)
+        with self._lock:
+            self.connects += 1
+        return LocalConnection(self)
+
+    def execute_snowflake_query(self, query: str, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        """Run query directly (no connection) and return rows as dicts, like snowflake_connection's."""
+        cursor = LocalCursor(self).execute(query, params)
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def transfer(self, rows: int):
+        with self._lock:
+            self.rows_fetched += rows
+        if self.rows_per_second and rows:
+            time.sleep(rows / self.rows_per_second)
+
+    def stats(self) -> Dict[str, int]:
+        return {"connects": self.connects, "queries": self.queries, "rows_fetched": self.rows_fetched}
+
+    def run(self, query: str, params: Dict) -> Tuple[List[str], List[np.ndarray]]:
+        """Evaluate one statement; returns output column names and column arrays."""
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        with self._lock:
+            self.queries += 1
+        sql = " ".join(query.split())
+        upper = sql.upper()
+        if upper == "SELECT 1":
+            return ["1"], [np.array([1])]
+        if "INFORMATION_SCHEMA.COLUMNS" in upper:
+            if params.get("table") != "NOAA_DAT":
+                return ["column_name"], [np.array([], dtype=object)]
+            return ["column_name"], [np.array([c.upper() for c in TORNADO_COLUMNS], dtype=object)]
+        if "GROUP BY N.NEIGHBORHOOD" in upper:
+            return self._neighborhood_aggregates(params)
+        if "RADON_TEST_RESULTS" in upper:
+            return self._select(sql, params, self.radon, self._radon_mask(sql, params))
+        if "NOAA_DAT" in upper:
+            return self._select(sql, params, self.tornado, self._tornado_mask(sql, params))
+        raise Exception(f"SQL compilation error: unsupported statement: {sql[:80]}")
+
+    def _select(self, sql: str, params: Dict, table: Dict[str, np.ndarray],
+                mask: np.ndarray) -> Tuple[List[str], List[np.ndarray]]:
+        rows = np.flatnonzero(mask)
+        limit = params.get("limit")
+        match = re.search(r"\bLIMIT (\d+)\s*$", sql, re.IGNORECASE)
+        if limit is None and match:
+            limit = int(match.group(1))
+        if limit is not None:
+            rows = rows[:int(limit)]
+        names, columns = [], []
+        for expression, name in _split_select_list(sql):
+            source = expression.lower()
+            if source.startswith("geometry_data:x"):
+                source = "x_coord"
+            elif source.startswith("geometry_data:y"):
+                source = "y_coord"
+            if source not in table:
+                raise Exception(f"SQL compilation error: invalid identifier '{expression.upper()}'")
+            names.append(name)
+            columns.append(table[source][rows])
+        return names, columns
+
+    def _radon_mask(self, sql: str, params: Dict) -> np.ndarray:
+        t = self.radon
+        mask = np.ones(len(t["object_id"]), dtype=bool)
+        if "valid_test = 'YES'" in sql:
+            mask &= np.isin(t["valid_test"], ["YES", "Y"])
+        if "city" in params:
+            mask &= t["city"] == params["city"]
+        zips = [v for k, v in params.items() if k.startswith("zip_")]
+        if zips:
+            mask &= np.isin(t["zip_code"], zips)
+        if "start_date" in params:
+            mask &= t["test_date"] >= params["start_date"]
+        if "end_date" in params:
+            mask &= t["test_date"] <= params["end_date"]
+        if "x_min" in params:
+            mask &= (t["x_coord"] >= params["x_min"]) & (t["x_coord"] <= params["x_max"])
+            mask &= (t["y_coord"] >= params["y_min"]) & (t["y_coord"] <= params["y_max"])
+        for key in ("after_id", "after"):
+            if key in params:
+                mask &= t["object_id"] > params[key]
+        if "corridor_wkt" in params:
+            candidates = np.flatnonzero(mask)
+            distances = _segment_distances(t["x_coord"][candidates], t["y_coord"][candidates], params["corridor_wkt"])
+            mask[candidates[distances > params["radius_m"]]] = False
+        return mask
+
+    def _tornado_mask(self, sql: str, params: Dict) -> np.ndarray:
+        t = self.tornado
+        mask = np.ones(len(t["begin_lat"]), dtype=bool)
+        if "event_type = 'TORNADO'" in sql:
+            mask &= t["event_type"] == "TORNADO"
+        match = re.search(r"= '(\d{4}-\d{2}-\d{2})'", sql)
+        if match:
+            mask &= t["begin_date"] == match.group(1)
+        if "start_date" in params:
+            mask &= t["begin_date"] >= params["start_date"]
+        if "end_date" in params:
+            mask &= t["begin_date"] <= params["end_date"]
+        box = None
+        if "lat_min" in params:
+            box = (params["lat_min"], params["lat_max"], params["lon_min"], params["lon_max"])
+        elif "BETWEEN 38.5 AND 38.8" in sql:
+            box = (38.5, 38.8, -90.3, -90.1)
+        if box is not None:
+            def inside(lat, lon):
+                return (lat >= box[0]) & (lat <= box[1]) & (lon >= box[2]) & (lon <= box[3])
+            mask &= inside(t["begin_lat"], t["begin_lon"]) | inside(t["end_lat"], t["end_lon"])
+        return mask
+
+    def _neighborhood_aggregates(self, params: Dict) -> Tuple[List[str], List[np.ndarray]]:
+        t = self.radon
+        mask = np.isin(t["valid_test"], ["YES", "Y"]) & (t["city"] == "St. Louis")
+        mask &= t["object_id"] > params.get("after_id", 0)
+        zip_index = {z: i for i, z in enumerate(ZIP_CODES)}
+        codes = np.array([zip_index.get(z, -1) for z in t["zip_code"][mask]])
+        known = codes >= 0
+        codes = codes[known]
+        results = t["final_result"][mask][known]
+        ids = t["object_id"][mask][known]
+        size = len(ZIP_CODES)
+        count = np.bincount(codes, minlength=size)
+        total = np.bincount(codes, weights=results, minlength=size)
+        high = np.bincount(codes, weights=(results >= 4.0).astype(np.float64), minlength=size)
+        max_id = np.zeros(size, dtype=np.int64)
+        np.maximum.at(max_id, codes, ids)
+
+        n = self.neighborhoods
+        rows = [i for i, z in enumerate(n["zip_code"]) if count[zip_index[z]]]
+        zips = [zip_index[n["zip_code"][i]] for i in rows]
+        names = ["neighborhood", "zip_code", "ward", "test_count", "result_sum", "high_risk_count", "max_object_id"]
+        columns = [
+            n["neighborhood"][rows], n["zip_code"][rows], n["ward"][rows],
+            count[zips], total[zips], high[zips].astype(np.int64), max_id[zips],
+        ]
+        return names, columns
+
+
+def install(warehouse: LocalWarehouse):
+    """Point snowflake_connection at warehouse; any existing pool keeps its old connections until closed."""
+    import snowflake_connection
+    snowflake_connection.USE_SNOWFLAKE = True
+    snowflake_connection.get_snowflake_connection = warehouse.connect
@@ -1,12 +1,144 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import Awaitable, Callable, Iterator, List, Optional, Dict
+from contextlib import asynccontextmanager
+import asyncio
 import json
+import logging
 import os
-from datetime import datetime
+import time
+from datetime import date, datetime
 
-app = FastAPI(title="Radon Canvas App API")
+import numpy as np
+
+from address_import import detect_format, iter_rows
+from cache import ResultCache
+from circuit import CLOSED as CIRCUIT_CLOSED, DegradedMiddleware, mark_degraded
+from columnar import json_response, to_columnar
+from corridor import Corridor
+from health import HealthMonitor
+from hot_neighborhoods import DELTA_QUERY as HOT_NEIGHBORHOODS_DELTA_QUERY, SORT_ORDERS, NeighborhoodSummary
+from export import (
+    FORMATS as EXPORT_FORMATS, ExportUnavailableError, export_query, parse_bbox, radon_batch, radon_schema,
+    require_pyarrow, tornado_batch, tornado_schema,
+)
+from metrics import DISTANCE_SECONDS, MAP_FALLBACKS, MAP_ROWS, TRANSFORM_SECONDS, MetricsMiddleware, registry
+from noaa_schema import NOAA_TABLE, SchemaCache, build_tornado_export_query, query_tornado_rows, resolve_mapping
+from projection import ST_LOUIS_BBOX, bbox_mask, to_float_array, utm_to_latlon
+from radon_query import build_radon_query, build_radon_snapshot_query, decode_cursor, encode_cursor
+from singleflight import SingleFlight, query_key
+from snapshot import (
+    ColumnSnapshot, iter_radon_batches as iter_snapshot_radon_batches, radon_columns as snapshot_radon_columns,
+    radon_page as snapshot_radon_page, refresh_radon_snapshot, refresh_tornado_snapshot,
+    tornado_rows as snapshot_tornado_rows,
+)
+from spatial_index import GridIndex
+from storage import Store, ADDRESS_MUTABLE_FIELDS
+from tiles import MAX_ZOOM, TilePyramid
+from warehouse import warehouse
+
+logger = logging.getLogger(__name__)
+
+# Startup warm-up steps, run in order before /api/ready reports ready:
+# pool (pre-open Snowflake connections), transformer (load pyproj and the
+# Snowflake connector), caches (load the tornado path and radon dataset),
+# tiles (compute or reload the aggregate tile levels for that dataset)
+STARTUP_WARMUP = [s.strip() for s in os.getenv("STARTUP_WARMUP", "pool,transformer,caches,tiles").split(",") if s.strip()]
+STARTUP_WARMUP_TIMEOUT_SECONDS = float(os.getenv("STARTUP_WARMUP_TIMEOUT_SECONDS", "60"))
+
+startup_state = {"ready": False, "startup_seconds": None, "steps": {}}
+
+# Warehouse health is probed in the background so /api/status never logs in itself
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "30"))
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "10"))
+
+async def _probe_warehouse() -> bool:
+    from snowflake_connection import ping_snowflake
+    # Not on the warehouse executor: a backlog of user queries would read as an outage
+    return await asyncio.to_thread(ping_snowflake)
+
+warehouse_health = HealthMonitor(_probe_warehouse, HEALTH_CHECK_INTERVAL_SECONDS, HEALTH_CHECK_TIMEOUT_SECONDS)
+
+def _warm_transformer():
+    from projection import get_transformer
+    get_transformer()
+    get_transformer(inverse=True)
+    from snowflake_connection import snowflake_enabled
+    if snowflake_enabled():
+        import snowflake.connector  # noqa: F401
+
+async def _warm_caches():
+    await get_tornado_segments()
+    await fetch_radon_test_results(False, 2.0)
+    get_sample_radon_index()
+
+async def _warm_pool():
+    from snowflake_connection import init_pool
+    await asyncio.to_thread(init_pool)
+
+async def _warm_tiles():
+    pyramid = await load_tile_pyramid()
+    await asyncio.to_thread(pyramid.build)
+
+WARMUP_STEPS = {
+    "pool": _warm_pool,
+    "transformer": lambda: asyncio.to_thread(_warm_transformer),
+    "caches": _warm_caches,
+    "tiles": _warm_tiles,
+}
+
+async def warm_up(steps: List[str]):
+    """Run the named warm-up steps, recording how long each took; failures are logged, not raised."""
+    started = time.perf_counter()
+    for name in steps:
+        step = WARMUP_STEPS.get(name)
+        if step is None:
+            logger.warning(f"Unknown startup warm-up step: {name}")
+            continue
+        step_started = time.perf_counter()
+        error = None
+        try:
+            await asyncio.wait_for(step(), timeout=STARTUP_WARMUP_TIMEOUT_SECONDS)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            logger.error(f"Startup warm-up step {name} failed: {error}")
+        startup_state["steps"][name] = {"seconds": round(time.perf_counter() - step_started, 3), "error": error}
+    startup_state["startup_seconds"] = round(time.perf_counter() - started, 3)
+    startup_state["ready"] = True
+
+async def _background(loops: List[Callable[[], Awaitable]]):
+    """Warm up, then run the background loops. Requests are served (and /api/ready is 503) meanwhile."""
+    await warm_up(STARTUP_WARMUP)
+    await asyncio.gather(*(loop() for loop in loops))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up (Snowflake pool, transformers, caches) after startup; stop the warehouse executor and close the pool on shutdown."""
+    try:
+        from snowflake_connection import close_pool, snowflake_enabled
+    except ImportError:
+        close_pool = snowflake_enabled = None
+    loops = []
+    if snowflake_enabled and snowflake_enabled():
+        if SNAPSHOT_REFRESH_SECONDS > 0:
+            loops.append(_snapshot_refresh_loop)
+        if HEALTH_CHECK_INTERVAL_SECONDS > 0:
+            loops.append(warehouse_health.run)
+    task = asyncio.create_task(_background(loops))
+    try:
+        yield
+    finally:
+        startup_state["ready"] = False
+        task.cancel()
+        # Drop queued warehouse calls before the pool they would check connections out of closes
+        warehouse.shutdown()
+        if close_pool:
+            await asyncio.to_thread(close_pool)
+
+app = FastAPI(title="Radon Canvas App API", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -17,6 +149,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses for clients that accept gzip (brotli is negotiated per response)
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=6)
+
+# Flags responses served from cached or fallback data while Snowflake is failing
+app.add_middleware(DegradedMiddleware)
+
+# Outermost, so route latency includes compression; also answers X-Profile with Server-Timing
+app.add_middleware(MetricsMiddleware)
+
 # Data models
 class Neighborhood(BaseModel):
     id: str
@@ -25,6 +166,7 @@ class Neighborhood(BaseModel):
     risk_level: str  # "low", "medium", "high"
     messaging_template: str
     created_at: str
+    updated_at: Optional[str] = None
 
 class Address(BaseModel):
     id: str
@@ -34,6 +176,7 @@ class Address(BaseModel):
     notes: Optional[str] = None
     visited_at: Optional[str] = None
     created_at: str
+    updated_at: Optional[str] = None
 
 class NeighborhoodCreate(BaseModel):
     name: str
@@ -45,529 +188,1193 @@ class AddressCreate(BaseModel):
     address: str
     neighborhood_id: Optional[str] = None
 
+class AddressUpdate(BaseModel):
+    id: str
+    address: Optional[str] = None
+    neighborhood_id: Optional[str] = None
+    status: Optional[str] = None
+    notes: Optional[str] = None
+    visited_at: Optional[str] = None
+
+class AddressUpdateResult(BaseModel):
+    id: str
+    ok: bool
+    address: Optional[Address] = None
+    error: Optional[str] = None
+
 # Data storage (in production, use a database)
 DATA_DIR = "data"
 NEIGHBORHOODS_FILE = os.path.join(DATA_DIR, "neighborhoods.json")
 ADDRESSES_FILE = os.path.join(DATA_DIR, "addresses.json")
+DATABASE_FILE = os.path.join(DATA_DIR, "radon_canvas.db")
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def load_neighborhoods() -> List[Dict]:
-    if os.path.exists(NEIGHBORHOODS_FILE):
-        with open(NEIGHBORHOODS_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-def save_neighborhoods(neighborhoods: List[Dict]):
-    with open(NEIGHBORHOODS_FILE, "w") as f:
-        json.dump(neighborhoods, f, indent=2)
-
-def load_addresses() -> List[Dict]:
-    if os.path.exists(ADDRESSES_FILE):
-        with open(ADDRESSES_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-def save_addresses(addresses: List[Dict]):
-    with open(ADDRESSES_FILE, "w") as f:
-        json.dump(addresses, f, indent=2)
+# SQLite store; legacy JSON files are imported on first run
+store = Store(DATABASE_FILE)
+store.import_json(NEIGHBORHOODS_FILE, ADDRESSES_FILE)
 
 @app.get("/")
 async def root():
     return {"message": "Radon Canvas App API"}
 
+@app.get("/api/ready")
+async def get_ready():
+    """Readiness check: 503 until the startup warm-up has finished."""
+    status_code = 200 if startup_state["ready"] else 503
+    return JSONResponse(status_code=status_code, content=startup_state)
+
 @app.get("/api/status")
-async def get_status():
-    """Get API status and data source information."""
+async def get_status(deep: bool = False):
+    """
+    Get API status and data source information.
+
+    Connectivity comes from the background health monitor, so this answers
+    without touching Snowflake (only the very first call waits for a probe).
+    deep=true probes the warehouse now and reports the fresh result.
+    """
     try:
-        from snowflake_connection import USE_SNOWFLAKE, get_snowflake_connection
-        snowflake_enabled = bool(USE_SNOWFLAKE)
-        snowflake_connected = False
-        connection_error = None
-        
-        if snowflake_enabled:
-            try:
-                conn = get_snowflake_connection()
-                snowflake_connected = conn is not None
-                if conn:
-                    conn.close()
-            except Exception as e:
-                connection_error = str(e)
-                logger.error(f"Failed to connect to Snowflake: {e}")
-        
-        return {
-            "status": "running",
-            "data_source": {
-                "snowflake_enabled": snowflake_enabled,
-                "snowflake_connected": snowflake_connected,
-                "using_sample_data": not (snowflake_enabled and snowflake_connected),
-                "error": connection_error
-            }
-        }
-    except Exception as e:
-        return {
-            "status": "running",
-            "data_source": {
-                "snowflake_enabled": False,
-                "snowflake_connected": False,
-                "using_sample_data": True,
-                "error": str(e)
-            }
+        from snowflake_connection import breaker, snowflake_enabled
+        enabled = snowflake_enabled()
+    except ImportError:
+        enabled = False
+    
+    health = circuit = None
+    if enabled:
+        circuit = breaker.stats()
+        # Until the first background probe finishes, wait for it (or run one)
+        if deep or warehouse_health.connected is None:
+            health = await warehouse_health.probe()
+        else:
+            health = warehouse_health.state()
+    connected = bool(health and health["connected"])
+    return {
+        "status": "running",
+        "data_source": {
+            "snowflake_enabled": enabled,
+            "snowflake_connected": connected,
+            "using_sample_data": not connected,
+            "error": health["last_error"] if health and not connected else None,
+            "health": health,
+            "circuit": circuit,
         }
+    }
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or etag.removeprefix("W/") in tags
+
+def collection_response(request: Request, response: Response, collection: str, since: Optional[int],
+                        list_records, filters: Optional[Dict[str, Optional[str]]] = None):
+    """
+    Full listing or delta for a collection, with ETag revalidation.
+
+    The ETag is derived from the collection version, so an unchanged
+    collection answers If-None-Match with 304 and no body. With since, only
+    records changed after that version are returned, plus the ids deleted
+    since (tombstones). A since newer than the current version (e.g. after
+    the database was replaced) returns everything with reset set, so the
+    client starts over.
+    """
+    with store.snapshot():
+        version = store.collection_version(collection)
+        view = "-".join(f"{k}={v}" for k, v in sorted((filters or {}).items()) if v) or "all"
+        etag = f'W/"{collection}-{version}-{view}-{"full" if since is None else since}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Collection-Version": str(version)}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        if since is None:
+            response.headers.update(headers)
+            return list_records()
+        if since > version:
+            delta = {"changed": list_records(), "deleted": [], "reset": True}
+        else:
+            delta = {**store.changes_since(collection, since, filters), "reset": False}
+    return JSONResponse({"version": version, **delta}, headers=headers)
 
+# Store calls are blocking SQLite (fsyncs, busy waits), so these handlers are
+# plain functions: Starlette runs them in its threadpool, off the event loop.
 @app.get("/api/neighborhoods", response_model=List[Neighborhood])
-async def get_neighborhoods():
-    return load_neighborhoods()
+def get_neighborhoods(request: Request, response: Response, since: Optional[int] = Query(None, ge=0)):
+    """All neighborhoods, or with since, only those changed or deleted after that collection version."""
+    return collection_response(request, response, "neighborhoods", since, store.list_neighborhoods)
 
 @app.post("/api/neighborhoods", response_model=Neighborhood)
-async def create_neighborhood(neighborhood: NeighborhoodCreate):
-    neighborhoods = load_neighborhoods()
-    new_id = str(len(neighborhoods) + 1)
-    new_neighborhood = {
-        "id": new_id,
+def create_neighborhood(neighborhood: NeighborhoodCreate):
+    return store.insert_neighborhood({
         **neighborhood.model_dump(),
         "created_at": datetime.now().isoformat()
-    }
-    neighborhoods.append(new_neighborhood)
-    save_neighborhoods(neighborhoods)
-    return new_neighborhood
+    })
 
 @app.put("/api/neighborhoods/{neighborhood_id}", response_model=Neighborhood)
-async def update_neighborhood(neighborhood_id: str, neighborhood: NeighborhoodCreate):
-    neighborhoods = load_neighborhoods()
-    for i, n in enumerate(neighborhoods):
-        if n["id"] == neighborhood_id:
-            updated = {
-                "id": neighborhood_id,
-                **neighborhood.model_dump(),
-                "created_at": neighborhoods[i]["created_at"]
-            }
-            neighborhoods[i] = updated
-            save_neighborhoods(neighborhoods)
-            return updated
-    raise HTTPException(status_code=404, detail="Neighborhood not found")
+def update_neighborhood(neighborhood_id: str, neighborhood: NeighborhoodCreate):
+    updated = store.update_neighborhood(neighborhood_id, neighborhood.model_dump())
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Neighborhood not found")
+    return updated
 
 @app.delete("/api/neighborhoods/{neighborhood_id}")
-async def delete_neighborhood(neighborhood_id: str):
-    neighborhoods = load_neighborhoods()
-    neighborhoods = [n for n in neighborhoods if n["id"] != neighborhood_id]
-    save_neighborhoods(neighborhoods)
+def delete_neighborhood(neighborhood_id: str):
+    store.delete_neighborhood(neighborhood_id)
     return {"message": "Neighborhood deleted"}
 
 @app.get("/api/addresses", response_model=List[Address])
-async def get_addresses(neighborhood_id: Optional[str] = None):
-    addresses = load_addresses()
-    if neighborhood_id:
-        addresses = [a for a in addresses if a.get("neighborhood_id") == neighborhood_id]
-    return addresses
+def get_addresses(request: Request, response: Response, neighborhood_id: Optional[str] = None,
+                        status: Optional[str] = None, since: Optional[int] = Query(None, ge=0)):
+    """Addresses, optionally in one neighborhood and/or status; with since, only those changed or deleted after it."""
+    return collection_response(request, response, "addresses", since,
+                               lambda: store.list_addresses(neighborhood_id, status),
+                               {"neighborhood_id": neighborhood_id, "status": status})
+
+@app.get("/api/addresses/counts")
+def get_address_counts(neighborhood_id: Optional[str] = None, status: Optional[str] = None):
+    """Address counts per neighborhood and status, with totals, for the same filters as /api/addresses."""
+    groups = store.count_addresses(neighborhood_id, status)
+    by_status: Dict[str, int] = {}
+    by_neighborhood: Dict[str, int] = {}
+    for group in groups:
+        by_status[group["status"]] = by_status.get(group["status"], 0) + group["count"]
+        key = group["neighborhood_id"] or "unassigned"
+        by_neighborhood[key] = by_neighborhood.get(key, 0) + group["count"]
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_neighborhood": by_neighborhood,
+        "groups": groups,
+    }
 
 @app.post("/api/addresses", response_model=Address)
-async def create_address(address: AddressCreate):
-    addresses = load_addresses()
-    new_id = str(len(addresses) + 1)
-    new_address = {
-        "id": new_id,
+def create_address(address: AddressCreate):
+    return store.insert_address(new_address_record(address))
+
+def new_address_record(address: AddressCreate) -> Dict:
+    return {
         **address.model_dump(),
         "status": "not_visited",
         "notes": None,
         "visited_at": None,
         "created_at": datetime.now().isoformat()
     }
-    addresses.append(new_address)
-    save_addresses(addresses)
-    return new_address
+
+# Bulk imports in progress (and recently finished), polled via /api/addresses/imports
+address_imports: Dict[str, Dict] = {}
+MAX_REPORTED_IMPORT_ERRORS = 1000
+MAX_FINISHED_IMPORTS = 20
+
+def _record_import_error(job: Dict, row: Optional[int], error: str):
+    job["errors"] += 1
+    if len(job["row_errors"]) < MAX_REPORTED_IMPORT_ERRORS:
+        job["row_errors"].append({"row": row, "error": error})
+
+@app.get("/api/addresses/imports")
+async def get_address_imports():
+    """Progress of running and recently finished bulk imports."""
+    return [{k: v for k, v in job.items() if k != "row_errors"} for job in address_imports.values()]
+
+@app.post("/api/addresses/import")
+async def import_addresses(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    chunk_size: int = Query(1000, ge=1, le=10000),
+):
+    """
+    Bulk import addresses from a streamed CSV or NDJSON upload.
+
+    CSV needs a header row with an address column (neighborhood_id is
+    optional); NDJSON has one object per line. The body is parsed as it
+    arrives and valid rows are committed every chunk_size rows, so memory use
+    does not grow with the upload. Addresses whose normalized text already
+    exists are skipped as duplicates. Progress can be polled on
+    /api/addresses/imports while the upload runs; the response summarizes
+    the import with per-row errors (the first MAX_REPORTED_IMPORT_ERRORS).
+    """
+    fmt = format or detect_format(request.headers.get("content-type"))
+    import_id = f"{int(time.time() * 1000)}-{len(address_imports)}"
+    job = {
+        "id": import_id, "format": fmt, "state": "running", "started_at": datetime.now().isoformat(),
+        "rows": 0, "imported": 0, "duplicates": 0, "errors": 0, "row_errors": [],
+    }
+    address_imports[import_id] = job
+    pending: List[tuple] = []
+
+    async def commit():
+        inserted, duplicates = await asyncio.to_thread(store.insert_addresses, [r for _, r in pending])
+        job["imported"] += len(inserted)
+        job["duplicates"] += len(duplicates)
+        pending.clear()
+
+    try:
+        async for number, row in iter_rows(request.stream(), fmt):
+            job["rows"] += 1
+            if isinstance(row, ValueError):
+                _record_import_error(job, number, str(row))
+                continue
+            try:
+                address = AddressCreate(**row)
+            except ValidationError as e:
+                message = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                _record_import_error(job, number, message)
+                continue
+            pending.append((number, new_address_record(address)))
+            if len(pending) >= chunk_size:
+                await commit()
+        if pending:
+            await commit()
+        job["state"] = "completed"
+    except Exception as e:
+        # Chunks committed before the failure stay committed
+        logger.error(f"Address import {import_id} failed after {job['rows']} rows: {e}")
+        _record_import_error(job, None, str(e))
+        job["state"] = "failed"
+    finally:
+        job["finished_at"] = datetime.now().isoformat()
+        finished = [k for k, j in address_imports.items() if j["state"] != "running"]
+        for k in finished[:-MAX_FINISHED_IMPORTS]:
+            del address_imports[k]
+    logger.info(f"Address import {import_id}: {job['imported']} imported, "
+                f"{job['duplicates']} duplicates, {job['errors']} errors")
+    return job
+
+def apply_address_changes(record: Dict, changes: Dict):
+    """Apply a partial update to an address record, stamping visited_at on the first visit."""
+    record.update({k: v for k, v in changes.items() if k in ADDRESS_MUTABLE_FIELDS})
+    # Judge by the resulting status, so a partial update that only touches notes is not a visit
+    if record.get("status") != "not_visited" and not record.get("visited_at"):
+        record["visited_at"] = datetime.now().isoformat()
 
 @app.put("/api/addresses/{address_id}", response_model=Address)
-async def update_address(address_id: str, address: Dict):
-    addresses = load_addresses()
-    for i, a in enumerate(addresses):
-        if a["id"] == address_id:
-            addresses[i].update(address)
-            if address.get("status") != "not_visited" and not addresses[i].get("visited_at"):
-                addresses[i]["visited_at"] = datetime.now().isoformat()
-            save_addresses(addresses)
-            return addresses[i]
-    raise HTTPException(status_code=404, detail="Address not found")
+def update_address(address_id: str, address: Dict):
+    updated = store.update_address(address_id, lambda record: apply_address_changes(record, address))
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Address not found")
+    return updated
+
+@app.patch("/api/addresses", response_model=List[AddressUpdateResult])
+def update_addresses(updates: List[AddressUpdate]):
+    """
+    Apply partial updates to many addresses in a single transaction.
+
+    Only the fields present in each item are changed, and visited_at is
+    stamped the same way as for a single update. Results come back in
+    request order; ids that do not exist are reported and do not stop the
+    other updates.
+    """
+    changes = [(u.id, u.model_dump(exclude_unset=True, exclude={"id"})) for u in updates]
+    updated = store.update_addresses([
+        (address_id, lambda record, c=c: apply_address_changes(record, c)) for address_id, c in changes
+    ])
+    return [
+        {"id": address_id, "ok": True, "address": record} if record is not None
+        else {"id": address_id, "ok": False, "error": "Address not found"}
+        for (address_id, _), record in zip(changes, updated)
+    ]
 
 @app.delete("/api/addresses/{address_id}")
-async def delete_address(address_id: str):
-    addresses = load_addresses()
-    addresses = [a for a in addresses if a["id"] != address_id]
-    save_addresses(addresses)
+def delete_address(address_id: str):
+    store.delete_address(address_id)
     return {"message": "Address deleted"}
 
-@app.get("/api/map/tornado-path")
-async def get_tornado_path():
+# Tornado path and radon dataset caches; the data is historical, so entries
+# live long and are refreshed in the background once they expire
+tornado_path_cache = ResultCache(
+    "tornado-path",
+    ttl=float(os.getenv("TORNADO_PATH_CACHE_TTL_SECONDS", "86400")),
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "64")),
+)
+radon_results_cache = ResultCache(
+    "radon-results",
+    ttl=float(os.getenv("RADON_RESULTS_CACHE_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "64")),
+)
+CACHES = {cache.name: cache for cache in (tornado_path_cache, radon_results_cache)}
+
+# Remembered NOAA column layout, so each tornado query is a single statement
+noaa_schema_cache = SchemaCache(os.path.join(DATA_DIR, "noaa_schema.json"))
+
+# Local copies of the warehouse rows behind the map. Once a snapshot exists
+# the map is served from it (so cold starts and warehouse outages still show
+# real data) and a background job folds in changes every SNAPSHOT_REFRESH_SECONDS.
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "900"))
+radon_snapshot = ColumnSnapshot(os.path.join(SNAPSHOT_DIR, "radon"), key="object_id")
+tornado_snapshot = ColumnSnapshot(os.path.join(SNAPSHOT_DIR, "tornado"))
+_snapshot_refreshes = SingleFlight("snapshots")
+
+async def refresh_snapshots() -> Dict:
+    """
+    Pull changed radon rows and the current tornado rows into the local snapshots.
+
+    The background job and the admin endpoint share one refresh at a time, so
+    two refreshes never read the same watermark and write competing versions.
+    """
+    return await _snapshot_refreshes.do("refresh", _refresh_snapshots)
+
+async def _refresh_snapshots() -> Dict:
+    from snowflake_connection import execute_snowflake_query, iter_snowflake_query_columns
+    
+    started = time.perf_counter()
+    radon_changed = await warehouse.run(
+        refresh_radon_snapshot, radon_snapshot, iter_snowflake_query_columns, build_radon_snapshot_query
+    )
+    rows = await warehouse.run(query_tornado_rows, execute_snowflake_query, noaa_schema_cache)
+    tornado_changed = await asyncio.to_thread(refresh_tornado_snapshot, tornado_snapshot, rows)
+    # Cached datasets were built from the previous snapshot
+    if radon_changed:
+        radon_results_cache.invalidate()
+    if tornado_changed:
+        tornado_path_cache.invalidate()
+        radon_results_cache.invalidate()
+    logger.info(f"Snapshot refresh: {radon_changed} radon rows changed, tornado "
+                f"{'changed' if tornado_changed else 'unchanged'} ({time.perf_counter() - started:.1f}s)")
+    return {"radon_rows_changed": radon_changed, "tornado_changed": tornado_changed}
+
+async def _snapshot_refresh_loop():
+    while True:
+        try:
+            changed = await refresh_snapshots()
+            if changed["radon_rows_changed"] or changed["tornado_changed"]:
+                # Have the tile levels for the new dataset ready before the map asks for them
+                await _warm_tiles()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Keep serving the last good snapshot
+            logger.error(f"Snapshot refresh failed: {e}")
+        await asyncio.sleep(SNAPSHOT_REFRESH_SECONDS)
+
+async def load_tornado_segments() -> List[List[Dict]]:
     """
-    Get the May 16 tornado path from Snowflake.
+    Query the May 16 tornado path from Snowflake as a list of polylines.
     
     Query from archdata.raw.noaa_dat table for tornado coordinates.
     Filters for May 16 tornado in St. Louis region.
+    Each NOAA segment becomes its own begin/end polyline, so separate
+    segments are never joined into one line.
+    Raises if no known column layout can be queried.
     """
+    from snowflake_connection import execute_snowflake_query
+    
+    if tornado_snapshot.available():
+        results = await asyncio.to_thread(snapshot_tornado_rows, tornado_snapshot)
+    else:
+        # Query Snowflake for tornado path data using the discovered column layout
+        results = await warehouse.run_shared(
+            (NOAA_TABLE, noaa_schema_cache.get(NOAA_TABLE)),
+            query_tornado_rows, execute_snowflake_query, noaa_schema_cache,
+        )
+        logger.debug(f"Queried tornado path with {len(results)} segments")
+    
+    if not results:
+        raise Exception("No tornado path data found")
+    
+    # Convert NOAA format to path segments
+    # For each tornado segment, we'll include both start and end points
+    segments = []
+    for r in results:
+        path_points = []
+        # Try both uppercase and lowercase column names
+        begin_lat = r.get("BEGIN_LAT") or r.get("begin_lat")
+        begin_lon = r.get("BEGIN_LON") or r.get("begin_lon")
+        end_lat = r.get("END_LAT") or r.get("end_lat")
+        end_lon = r.get("END_LON") or r.get("end_lon")
+
+        # Add beginning point if valid
+        if begin_lat is not None and begin_lon is not None:
+            try:
+                path_points.append({
+                    "latitude": float(begin_lat),
+                    "longitude": float(begin_lon)
+                })
+            except (ValueError, TypeError):
+                pass
+
+        # Add ending point if valid and different from beginning
+        if end_lat is not None and end_lon is not None:
+            try:
+                # Only add if different from start point
+                if not (begin_lat == end_lat and begin_lon == end_lon):
+                    path_points.append({
+                        "latitude": float(end_lat),
+                        "longitude": float(end_lon)
+                    })
+            except (ValueError, TypeError):
+                pass
+
+        if path_points:
+            segments.append(path_points)
+
+    return segments
+
+def flag_if_warehouse_down():
+    """Mark the response degraded when it comes from cached data because the Snowflake circuit is open."""
+    from snowflake_connection import breaker
+    if breaker.state != CIRCUIT_CLOSED:
+        mark_degraded("cached")
+
+async def get_tornado_segments() -> List[List[Dict]]:
+    """Get the tornado path polylines, from cache when possible, falling back to sample data."""
     try:
         try:
-            from snowflake_connection import execute_snowflake_query, USE_SNOWFLAKE
+            from snowflake_connection import USE_SNOWFLAKE
             use_snowflake = USE_SNOWFLAKE
         except (ImportError, AttributeError):
             use_snowflake = False
         
         if not use_snowflake:
             # Sample data for development/testing
-            return [
+            return [[
                 {"latitude": 38.6580, "longitude": -90.2310},
                 {"latitude": 38.6620, "longitude": -90.2280},
                 {"latitude": 38.6680, "longitude": -90.2200},
                 {"latitude": 38.6750, "longitude": -90.2150},
                 {"latitude": 38.6820, "longitude": -90.2100},
                 {"latitude": 38.6900, "longitude": -90.2050},
-            ]
-        
-        # Query Snowflake for tornado path data
-        # Try multiple possible column name variations for NOAA tornado data
-        # Common patterns: begin_lat/begin_lon, slat/slon, or geometry columns
-        queries_to_try = [
-            # Try 1: Standard NOAA column names (begin_lat/begin_lon, end_lat/end_lon)
-            """
-            SELECT 
-                begin_lat,
-                begin_lon,
-                end_lat,
-                end_lon,
-                begin_date,
-                event_type
-            FROM archdata.raw.noaa_dat
-            WHERE begin_date = '2024-05-16'
-                AND event_type = 'TORNADO'
-                AND ((begin_lat BETWEEN 38.5 AND 38.8 AND begin_lon BETWEEN -90.3 AND -90.1)
-                     OR (end_lat BETWEEN 38.5 AND 38.8 AND end_lon BETWEEN -90.3 AND -90.1))
-            ORDER BY begin_date
-            """,
-            # Try 2: Alternative column names (slat/slon, elat/elon)
-            """
-            SELECT 
-                slat as begin_lat,
-                slon as begin_lon,
-                elat as end_lat,
-                elon as end_lon,
-                begin_date,
-                event_type
-            FROM archdata.raw.noaa_dat
-            WHERE begin_date = '2024-05-16'
-                AND event_type = 'TORNADO'
-                AND ((slat BETWEEN 38.5 AND 38.8 AND slon BETWEEN -90.3 AND -90.1)
-                     OR (elat BETWEEN 38.5 AND 38.8 AND elon BETWEEN -90.3 AND -90.1))
-            ORDER BY begin_date
-            """,
-            # Try 3: Simple lat/lon columns (if they exist)
-            """
-            SELECT 
-                lat as begin_lat,
-                lon as begin_lon,
-                lat as end_lat,
-                lon as end_lon,
-                event_date as begin_date,
-                event_type
-            FROM archdata.raw.noaa_dat
-            WHERE event_date = '2024-05-16'
-                AND event_type = 'TORNADO'
-                AND lat BETWEEN 38.5 AND 38.8
-                AND lon BETWEEN -90.3 AND -90.1
-            ORDER BY event_date
-            """
-        ]
-        
-        results = []
-        for query in queries_to_try:
-            try:
-                results = execute_snowflake_query(query)
-                if results:
-                    print(f"Successfully queried tornado path with {len(results)} segments")
-                    break
-            except Exception as e:
-                print(f"Query attempt failed: {e}")
-                continue
-        
-        if not results:
-            raise Exception("Could not query tornado path data with any known column name pattern")
-        
-        # Convert NOAA format to path points
-        # For each tornado segment, we'll include both start and end points
-        path_points = []
-        for r in results:
-            # Try both uppercase and lowercase column names
-            begin_lat = r.get("BEGIN_LAT") or r.get("begin_lat")
-            begin_lon = r.get("BEGIN_LON") or r.get("begin_lon")
-            end_lat = r.get("END_LAT") or r.get("end_lat")
-            end_lon = r.get("END_LON") or r.get("end_lon")
-            
-            # Add beginning point if valid
-            if begin_lat is not None and begin_lon is not None:
-                try:
-                    path_points.append({
-                        "latitude": float(begin_lat),
-                        "longitude": float(begin_lon)
-                    })
-                except (ValueError, TypeError):
-                    pass
-            
-            # Add ending point if valid and different from beginning
-            if end_lat is not None and end_lon is not None:
-                try:
-                    # Only add if different from start point
-                    if not (begin_lat == end_lat and begin_lon == end_lon):
-                        path_points.append({
-                            "latitude": float(end_lat),
-                            "longitude": float(end_lon)
-                        })
-                except (ValueError, TypeError):
-                    pass
+            ]]
         
-        return path_points
+        segments = await tornado_path_cache.get("2024-05-16", load_tornado_segments)
+        flag_if_warehouse_down()
+        return segments
         
     except Exception as e:
         # Fallback to sample data on error
-        print(f"Error fetching tornado path: {e}")
-        return [
+        logger.exception(f"Error fetching tornado path: {e}")
+        MAP_FALLBACKS.inc(route="tornado-path")
+        mark_degraded("sample-data")
+        return [[
             {"latitude": 38.6580, "longitude": -90.2310},
             {"latitude": 38.6620, "longitude": -90.2280},
             {"latitude": 38.6680, "longitude": -90.2200},
             {"latitude": 38.6750, "longitude": -90.2150},
-        ]
+        ]]
+
+@app.get("/api/map/tornado-path")
+async def get_tornado_path():
+    """Get the May 16 tornado path as a flat list of points for drawing on the map."""
+    segments = await get_tornado_segments()
+    return [point for segment in segments for point in segment]
+
+# Sample data for development/testing - points across St. Louis
+SAMPLE_RADON_RESULTS = [
+    {"latitude": 38.6580, "longitude": -90.2310, "final_result": 5.2, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
+    {"latitude": 38.6620, "longitude": -90.2280, "final_result": 3.1, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
+    {"latitude": 38.6680, "longitude": -90.2200, "final_result": 6.8, "valid_test": "Y", "city": "St. Louis", "zip_code": "63115"},
+    {"latitude": 38.6750, "longitude": -90.2150, "final_result": 2.9, "valid_test": "Y", "city": "St. Louis", "zip_code": "63115"},
+    {"latitude": 38.6900, "longitude": -90.2050, "final_result": 4.5, "valid_test": "Y", "city": "St. Louis", "zip_code": "63147"},
+    {"latitude": 38.6550, "longitude": -90.2290, "final_result": 5.8, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
+    {"latitude": 38.6610, "longitude": -90.2270, "final_result": 4.3, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
+    {"latitude": 38.6700, "longitude": -90.2220, "final_result": 3.5, "valid_test": "Y", "city": "St. Louis", "zip_code": "63115"},
+    # Add more points across St. Louis
+    {"latitude": 38.6350, "longitude": -90.2000, "final_result": 4.8, "valid_test": "Y", "city": "St. Louis", "zip_code": "63106"},
+    {"latitude": 38.6420, "longitude": -90.2100, "final_result": 3.2, "valid_test": "Y", "city": "St. Louis", "zip_code": "63106"},
+    {"latitude": 38.6490, "longitude": -90.2180, "final_result": 5.5, "valid_test": "Y", "city": "St. Louis", "zip_code": "63112"},
+    {"latitude": 38.6560, "longitude": -90.2250, "final_result": 3.8, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
+    {"latitude": 38.6630, "longitude": -90.2320, "final_result": 6.2, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
+    {"latitude": 38.6700, "longitude": -90.2400, "final_result": 4.1, "valid_test": "Y", "city": "St. Louis", "zip_code": "63112"},
+    {"latitude": 38.6770, "longitude": -90.2480, "final_result": 5.9, "valid_test": "Y", "city": "St. Louis", "zip_code": "63112"},
+    {"latitude": 38.6840, "longitude": -90.2550, "final_result": 3.6, "valid_test": "Y", "city": "St. Louis", "zip_code": "63115"},
+    {"latitude": 38.6910, "longitude": -90.2620, "final_result": 4.7, "valid_test": "Y", "city": "St. Louis", "zip_code": "63115"},
+    {"latitude": 38.6980, "longitude": -90.2680, "final_result": 6.5, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
+    {"latitude": 38.7050, "longitude": -90.2150, "final_result": 3.9, "valid_test": "Y", "city": "St. Louis", "zip_code": "63147"},
+    {"latitude": 38.7120, "longitude": -90.2080, "final_result": 5.1, "valid_test": "Y", "city": "St. Louis", "zip_code": "63147"},
+    {"latitude": 38.6280, "longitude": -90.2380, "final_result": 4.4, "valid_test": "Y", "city": "St. Louis", "zip_code": "63108"},
+    {"latitude": 38.6180, "longitude": -90.2480, "final_result": 6.1, "valid_test": "Y", "city": "St. Louis", "zip_code": "63108"},
+    {"latitude": 38.6080, "longitude": -90.2580, "final_result": 3.4, "valid_test": "Y", "city": "St. Louis", "zip_code": "63110"},
+    {"latitude": 38.5980, "longitude": -90.2380, "final_result": 5.3, "valid_test": "Y", "city": "St. Louis", "zip_code": "63118"},
+    {"latitude": 38.5880, "longitude": -90.2280, "final_result": 4.0, "valid_test": "Y", "city": "St. Louis", "zip_code": "63111"},
+    {"latitude": 38.5780, "longitude": -90.2180, "final_result": 6.7, "valid_test": "Y", "city": "St. Louis", "zip_code": "63111"},
+    {"latitude": 38.6380, "longitude": -90.1980, "final_result": 3.7, "valid_test": "Y", "city": "St. Louis", "zip_code": "63101"},
+    {"latitude": 38.6480, "longitude": -90.2050, "final_result": 5.4, "valid_test": "Y", "city": "St. Louis", "zip_code": "63106"},
+]
+
+_sample_radon_index: Optional[GridIndex] = None
+
+def get_sample_radon_index() -> GridIndex:
+    """Spatial index over SAMPLE_RADON_RESULTS, built on first use."""
+    global _sample_radon_index
+    if _sample_radon_index is None:
+        _sample_radon_index = GridIndex.from_records(SAMPLE_RADON_RESULTS)
+    return _sample_radon_index
+
+def filter_near_corridor(results: List[Dict], index: GridIndex, corridor: Corridor, radius_miles: float) -> List[Dict]:
+    """Return the results within radius_miles of the tornado corridor, with their distance.
+
+    The index must have been built over the same results list, in order.
+    """
+    with DISTANCE_SECONDS.time():
+        hits, distances = corridor.within(index, radius_miles)
+    return [
+        {**results[i], "distance_miles": round(float(d), 3)}
+        for i, d in zip(hits.tolist(), distances.tolist())
+    ]
+
+def radon_columns_to_results(columns: Dict[str, List]):
+    """
+    Convert column-wise radon query output into map results.
+
+    Projected coordinates (UTM Zone 15N) are converted to WGS84 in one batched
+    call and filtered to the St. Louis area with a vectorized mask. Returns the
+    result dicts plus their latitude and longitude arrays.
+    """
+    x = to_float_array(columns.get("x_coord", []))
+    y = to_float_array(columns.get("y_coord", []))
+    # Rows with missing or zero coordinates are skipped
+    has_coords = np.isfinite(x) & np.isfinite(y) & (x != 0) & (y != 0)
+    lat = np.full(len(x), np.nan)
+    lng = np.full(len(x), np.nan)
+    if has_coords.any():
+        with TRANSFORM_SECONDS.time():
+            lat[has_coords], lng[has_coords] = utm_to_latlon(x[has_coords], y[has_coords])
+    keep = np.flatnonzero(has_coords & bbox_mask(lat, lng))
+    
+    final_result = columns.get("final_result", [None] * len(x))
+    valid_test = columns.get("valid_test", [None] * len(x))
+    city = columns.get("city", [None] * len(x))
+    zip_code = columns.get("zip_code", [None] * len(x))
+    
+    results = []
+    converted = []
+    for i, la, lo in zip(keep.tolist(), lat[keep].tolist(), lng[keep].tolist()):
+        try:
+            results.append({
+                "latitude": la,
+                "longitude": lo,
+                "final_result": float(final_result[i] or 0),
+                # Normalize valid_test: convert 'YES' to 'Y' for frontend compatibility
+                "valid_test": "Y" if str(valid_test[i] or "N").upper() in ("YES", "Y") else "N",
+                "city": city[i] or "St. Louis",
+                "zip_code": zip_code[i],
+            })
+        except (ValueError, TypeError):
+            # Skip records with conversion errors
+            continue
+        converted.append(i)
+    return results, lat[converted], lng[converted]
+
+def build_radon_dataset(columns: Dict[str, List]):
+    """Convert column-wise radon query output into map results plus a spatial index over them."""
+    all_results, lat, lng = radon_columns_to_results(columns)
+    return all_results, GridIndex(lat, lng)
+
+async def load_radon_dataset(segments: Optional[List[List[Dict]]] = None, radius_miles: Optional[float] = None):
+    """
+    Query St. Louis radon test results from Snowflake and index them for proximity queries.
+
+    The St. Louis bounding box, and the tornado corridor when segments and
+    radius_miles are given, are evaluated in Snowflake so only matching rows
+    are transferred. If the local snapshot exists it is used instead and the
+    whole St. Louis dataset is returned; callers filter it to the corridor.
+    """
+    from snowflake_connection import execute_snowflake_query_columns
+    
+    if radon_snapshot.available():
+        columns = await asyncio.to_thread(snapshot_radon_columns, radon_snapshot)
+        return await asyncio.to_thread(build_radon_dataset, columns)
+    
+    # Query Snowflake for radon test results
+    # Extract x,y from geometry_data VARIANT field
+    # Try both 'YES' and 'Y' for valid_test filter
+    query, params = await asyncio.to_thread(
+        build_radon_query, ST_LOUIS_BBOX, segments, radius_miles
+    )
+    
+    try:
+        columns = await warehouse.run_shared(query_key(query, params), execute_snowflake_query_columns, query, params)
+        logger.debug(f"Radon query returned {len(columns.get('x_coord', []))} results")
+    except Exception as e:
+        logger.error(f"Radon query failed: {e}")
+        raise Exception(f"Unable to query Snowflake: {e}")
+    
+    # Coordinate conversion and indexing are CPU-bound; keep them off the event loop too
+    return await asyncio.to_thread(build_radon_dataset, columns)
+
+async def get_tornado_corridor():
+    """Tornado path segments and their Corridor, or (None, None) if the path is unavailable."""
+    try:
+        segments = await get_tornado_segments()
+        if segments:
+            return segments, Corridor(segments)
+    except Exception:
+        pass
+    return None, None
+
+def filter_batch_near_corridor(results: List[Dict], lat: np.ndarray, lng: np.ndarray,
+                               corridor: Corridor, radius_miles: float) -> List[Dict]:
+    """Keep the results of one batch within radius_miles of the corridor, adding distance_miles."""
+    with DISTANCE_SECONDS.time():
+        distances = corridor.distance_miles(lat, lng)
+    return [
+        {**r, "distance_miles": round(d, 3)}
+        for r, d in zip(results, distances.tolist())
+        if d <= radius_miles
+    ]
+
+def count_map_rows(route: str, fetched: int, results: List[Dict]) -> List[Dict]:
+    """Record how many rows a map route loaded and how many it returned after filtering."""
+    MAP_ROWS.inc(fetched, route=route, stage="fetched")
+    MAP_ROWS.inc(len(results), route=route, stage="returned")
+    return results
 
 @app.get("/api/map/radon-results")
-async def get_radon_test_results(near_tornado: bool = False, radius_miles: float = 2.0):
+async def get_radon_test_results(
+    request: Request,
+    near_tornado: bool = False,
+    radius_miles: float = 2.0,
+    format: str = Query("rows", pattern="^(rows|columnar)$"),
+):
     """
     Get radon test results for St. Louis region from Snowflake.
+
+    format=columnar returns parallel arrays per field with quantized
+    coordinates instead of one object per result (see columnar.py).
+    """
+    results = await fetch_radon_test_results(near_tornado, radius_miles)
+    return json_response(request, to_columnar(results) if format == "columnar" else results)
+
+async def fetch_radon_test_results(near_tornado: bool, radius_miles: float) -> List[Dict]:
+    """
+    Radon test results for the St. Louis region, from Snowflake or sample data.
     
     Query from archdata.raw.radon_test_results table.
     Filters for valid tests in St. Louis area.
     If near_tornado is True, only returns results within radius_miles of tornado path.
     Returns coordinates and test results for mapping.
     """
-    import math
-    
     try:
         try:
-            from snowflake_connection import execute_snowflake_query, USE_SNOWFLAKE
+            from snowflake_connection import USE_SNOWFLAKE
             use_snowflake = USE_SNOWFLAKE
         except (ImportError, AttributeError):
             use_snowflake = False
         
-        # Helper function to calculate distance between two lat/lng points in miles
-        def haversine_distance(lat1, lon1, lat2, lon2):
-            """Calculate distance between two points in miles using Haversine formula"""
-            R = 3958.8  # Earth radius in miles
-            dlat = math.radians(lat2 - lat1)
-            dlon = math.radians(lon2 - lon1)
-            a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-            c = 2 * math.asin(math.sqrt(a))
-            return R * c
-        
-        def distance_to_path(lat, lon, path_points):
-            """Calculate minimum distance from a point to any point on the tornado path"""
-            if not path_points:
-                return float('inf')
-            min_dist = float('inf')
-            for point in path_points:
-                dist = haversine_distance(lat, lon, point['latitude'], point['longitude'])
-                if dist < min_dist:
-                    min_dist = dist
-            return min_dist
-        
-        # Get tornado path first if filtering by proximity
-        tornado_path = []
-        if near_tornado:
-            try:
-                tornado_response = await get_tornado_path()
-                if tornado_response:
-                    tornado_path = tornado_response
-            except:
-                pass
+        # Get tornado corridor first if filtering by proximity
+        segments, corridor = await get_tornado_corridor() if near_tornado else (None, None)
         
         if not use_snowflake:
-            print("Snowflake not enabled - using sample radon test data")
-            # Sample data for development/testing - generate more points across St. Louis
-            sample_results = []
-            
-            # Generate sample data across St. Louis area
-            base_results = [
-                {"latitude": 38.6580, "longitude": -90.2310, "final_result": 5.2, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
-                {"latitude": 38.6620, "longitude": -90.2280, "final_result": 3.1, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
-                {"latitude": 38.6680, "longitude": -90.2200, "final_result": 6.8, "valid_test": "Y", "city": "St. Louis", "zip_code": "63115"},
-                {"latitude": 38.6750, "longitude": -90.2150, "final_result": 2.9, "valid_test": "Y", "city": "St. Louis", "zip_code": "63115"},
-                {"latitude": 38.6900, "longitude": -90.2050, "final_result": 4.5, "valid_test": "Y", "city": "St. Louis", "zip_code": "63147"},
-                {"latitude": 38.6550, "longitude": -90.2290, "final_result": 5.8, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
-                {"latitude": 38.6610, "longitude": -90.2270, "final_result": 4.3, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
-                {"latitude": 38.6700, "longitude": -90.2220, "final_result": 3.5, "valid_test": "Y", "city": "St. Louis", "zip_code": "63115"},
-                # Add more points across St. Louis
-                {"latitude": 38.6350, "longitude": -90.2000, "final_result": 4.8, "valid_test": "Y", "city": "St. Louis", "zip_code": "63106"},
-                {"latitude": 38.6420, "longitude": -90.2100, "final_result": 3.2, "valid_test": "Y", "city": "St. Louis", "zip_code": "63106"},
-                {"latitude": 38.6490, "longitude": -90.2180, "final_result": 5.5, "valid_test": "Y", "city": "St. Louis", "zip_code": "63112"},
-                {"latitude": 38.6560, "longitude": -90.2250, "final_result": 3.8, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
-                {"latitude": 38.6630, "longitude": -90.2320, "final_result": 6.2, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
-                {"latitude": 38.6700, "longitude": -90.2400, "final_result": 4.1, "valid_test": "Y", "city": "St. Louis", "zip_code": "63112"},
-                {"latitude": 38.6770, "longitude": -90.2480, "final_result": 5.9, "valid_test": "Y", "city": "St. Louis", "zip_code": "63112"},
-                {"latitude": 38.6840, "longitude": -90.2550, "final_result": 3.6, "valid_test": "Y", "city": "St. Louis", "zip_code": "63115"},
-                {"latitude": 38.6910, "longitude": -90.2620, "final_result": 4.7, "valid_test": "Y", "city": "St. Louis", "zip_code": "63115"},
-                {"latitude": 38.6980, "longitude": -90.2680, "final_result": 6.5, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
-                {"latitude": 38.7050, "longitude": -90.2150, "final_result": 3.9, "valid_test": "Y", "city": "St. Louis", "zip_code": "63147"},
-                {"latitude": 38.7120, "longitude": -90.2080, "final_result": 5.1, "valid_test": "Y", "city": "St. Louis", "zip_code": "63147"},
-                {"latitude": 38.6280, "longitude": -90.2380, "final_result": 4.4, "valid_test": "Y", "city": "St. Louis", "zip_code": "63108"},
-                {"latitude": 38.6180, "longitude": -90.2480, "final_result": 6.1, "valid_test": "Y", "city": "St. Louis", "zip_code": "63108"},
-                {"latitude": 38.6080, "longitude": -90.2580, "final_result": 3.4, "valid_test": "Y", "city": "St. Louis", "zip_code": "63110"},
-                {"latitude": 38.5980, "longitude": -90.2380, "final_result": 5.3, "valid_test": "Y", "city": "St. Louis", "zip_code": "63118"},
-                {"latitude": 38.5880, "longitude": -90.2280, "final_result": 4.0, "valid_test": "Y", "city": "St. Louis", "zip_code": "63111"},
-                {"latitude": 38.5780, "longitude": -90.2180, "final_result": 6.7, "valid_test": "Y", "city": "St. Louis", "zip_code": "63111"},
-                {"latitude": 38.6380, "longitude": -90.1980, "final_result": 3.7, "valid_test": "Y", "city": "St. Louis", "zip_code": "63101"},
-                {"latitude": 38.6480, "longitude": -90.2050, "final_result": 5.4, "valid_test": "Y", "city": "St. Louis", "zip_code": "63106"},
-            ]
-            sample_results.extend(base_results)
+            logger.info("Snowflake not enabled - using sample radon test data")
+            sample_results = list(SAMPLE_RADON_RESULTS)
             
             # Filter by proximity to tornado path if requested
-            if near_tornado and tornado_path:
-                filtered_results = []
-                for result in sample_results:
-                    dist = distance_to_path(result['latitude'], result['longitude'], tornado_path)
-                    if dist <= radius_miles:
-                        filtered_results.append(result)
-                return filtered_results
-            return sample_results
-        
-        # Query Snowflake for radon test results
-        # Extract x,y from geometry_data VARIANT field
-        # Try both 'YES' and 'Y' for valid_test filter
-        query = """
-        SELECT 
-            GEOMETRY_DATA:x::FLOAT as x_coord,
-            GEOMETRY_DATA:y::FLOAT as y_coord,
-            final_result,
-            valid_test,
-            city,
-            zip_code
-        FROM archdata.raw.radon_test_results
-        WHERE (valid_test = 'YES' OR valid_test = 'Y')
-            AND city = 'St. Louis'
-        LIMIT 5000
-        """
-        
-        try:
-            results = execute_snowflake_query(query)
-            print(f"Successfully executed Snowflake query, got {len(results)} results")
-        except Exception as e:
-            query_error = str(e)
-            print(f"Query failed: {e}")
-            raise Exception(f"Unable to query Snowflake: {query_error}")
-        
-        # Convert projected coordinates (UTM Zone 15N) to WGS84 lat/long
-        from pyproj import Transformer
-        
-        # UTM Zone 15N (EPSG:32615) to WGS84 (EPSG:4326)
-        transformer = Transformer.from_crs("EPSG:32615", "EPSG:4326", always_xy=True)
+            if near_tornado and corridor:
+                return count_map_rows("radon-results", len(sample_results), filter_near_corridor(
+                    sample_results, get_sample_radon_index(), corridor, radius_miles
+                ))
+            return count_map_rows("radon-results", len(sample_results), sample_results)
         
-        all_results = []
-        for r in results:
-            try:
-                # Get x, y coordinates from query result
-                x_coord = r.get("X_COORD") or r.get("x_coord")
-                y_coord = r.get("Y_COORD") or r.get("y_coord")
-                
-                if x_coord and y_coord:
-                    # Convert from projected to lat/long
-                    lng, lat = transformer.transform(float(x_coord), float(y_coord))
-                    
-                    # Filter to St. Louis area (roughly) - wider range
-                    if 38.4 <= lat <= 38.9 and -90.5 <= lng <= -90.0:
-                        valid_test_val = str(r.get("VALID_TEST") or r.get("valid_test") or "N")
-                        # Normalize valid_test: convert 'YES' to 'Y' for frontend compatibility
-                        if valid_test_val.upper() in ['YES', 'Y']:
-                            valid_test_val = 'Y'
-                        else:
-                            valid_test_val = 'N'
-                        
-                        all_results.append({
-                            "latitude": lat,
-                            "longitude": lng,
-                            "final_result": float(r.get("FINAL_RESULT") or r.get("final_result") or 0),
-                            "valid_test": valid_test_val,
-                            "city": r.get("CITY") or r.get("city") or "St. Louis",
-                            "zip_code": r.get("ZIP_CODE") or r.get("zip_code"),
-                        })
-            except Exception as e:
-                # Skip records with conversion errors
-                continue
-        
-        # Filter by proximity to tornado path if requested
-        if near_tornado and tornado_path:
-            filtered_results = []
-            for result in all_results:
-                dist = distance_to_path(result['latitude'], result['longitude'], tornado_path)
-                if dist <= radius_miles:
-                    filtered_results.append(result)
-            return filtered_results
+        # Filter by proximity to tornado path if requested; Snowflake applies the
+        # corridor filter, then exact distances are computed for what comes back
+        if near_tornado and corridor and not radon_snapshot.available():
+            # Keyed by the corridor too, so a changed (or sample fallback) path never serves another's rows
+            all_results, index = await radon_results_cache.get(
+                ("st-louis", corridor.fingerprint, round(radius_miles, 3)),
+                lambda: load_radon_dataset(segments, radius_miles),
+            )
+            flag_if_warehouse_down()
+            return count_map_rows("radon-results", len(all_results),
+                                  filter_near_corridor(all_results, index, corridor, radius_miles))
         
-        return all_results
+        all_results, index = await radon_results_cache.get(("st-louis",), load_radon_dataset)
+        flag_if_warehouse_down()
+        if near_tornado and corridor:
+            return count_map_rows("radon-results", len(all_results),
+                                  filter_near_corridor(all_results, index, corridor, radius_miles))
+        return count_map_rows("radon-results", len(all_results), all_results)
         
     except Exception as e:
         # Fallback to sample data on error
-        print(f"Error fetching radon test results: {e}")
+        logger.exception(f"Error fetching radon test results: {e}")
+        MAP_FALLBACKS.inc(route="radon-results")
+        mark_degraded("sample-data")
         return [
             {"latitude": 38.6580, "longitude": -90.2310, "final_result": 5.2, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
             {"latitude": 38.6620, "longitude": -90.2280, "final_result": 3.1, "valid_test": "Y", "city": "St. Louis", "zip_code": "63113"},
         ]
 
+# Streams hold a pooled warehouse connection until the client has read them all,
+# so cap them below the pool size to leave connections for ordinary requests
+MAX_CONCURRENT_STREAMS = int(os.getenv(
+    "MAX_CONCURRENT_STREAMS", str(max(1, int(os.getenv("SNOWFLAKE_POOL_MAX_SIZE", "5")) - 1))
+))
+_stream_slots = {"open": 0}
+
+def reserve_stream_slot():
+    """Claim a warehouse stream slot, or raise 503 if MAX_CONCURRENT_STREAMS are already open."""
+    if _stream_slots["open"] >= MAX_CONCURRENT_STREAMS:
+        raise HTTPException(status_code=503, detail="Too many concurrent streams, retry shortly",
+                            headers={"Retry-After": "5"})
+    _stream_slots["open"] += 1
+
+class WarehouseStreamingResponse(StreamingResponse):
+    """StreamingResponse that frees its stream slot once sent, failed or abandoned."""
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _stream_slots["open"] -= 1
+
+async def stream_radon_batches(batches: Iterator[Dict[str, List]], corridor: Optional[Corridor],
+                               radius_miles: float, run=warehouse.run):
+    """
+    Yield NDJSON chunks, one per column-wise batch, so memory stays bounded by the batch size.
+
+    batches is advanced and closed with run: the warehouse pool for a
+    Snowflake cursor, asyncio.to_thread for the local snapshot.
+    """
+    try:
+        while True:
+            columns = await run(next, batches, None)
+            if columns is None:
+                break
+            results, lat, lng = await asyncio.to_thread(radon_columns_to_results, columns)
+            if corridor:
+                results = filter_batch_near_corridor(results, lat, lng, corridor, radius_miles)
+            count_map_rows("radon-results/stream", len(columns.get("x_coord", [])), results)
+            if results:
+                yield "".join(json.dumps(r) + "\n" for r in results)
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        logger.error(f"Error streaming radon test results: {e}")
+        yield json.dumps({"error": str(e)}) + "\n"
+    finally:
+        await run(batches.close)
+
+@app.get("/api/map/radon-results/stream")
+async def stream_radon_test_results(near_tornado: bool = False, radius_miles: float = 2.0,
+                                    batch_size: int = Query(5000, ge=100, le=50000)):
+    """
+    Stream radon test results as NDJSON (one JSON object per line).
+    
+    Rows are read from the local snapshot, or from Snowflake if there is
+    none, in batches of batch_size and written out as each batch arrives,
+    with no limit on the total number of results. At most
+    MAX_CONCURRENT_STREAMS Snowflake streams run at once; beyond that the
+    request gets a 503 with Retry-After.
+    """
+    try:
+        from snowflake_connection import USE_SNOWFLAKE
+        use_snowflake = USE_SNOWFLAKE
+    except (ImportError, AttributeError):
+        use_snowflake = False
+    
+    segments, corridor = await get_tornado_corridor() if near_tornado else (None, None)
+    
+    if not use_snowflake:
+        results = list(SAMPLE_RADON_RESULTS)
+        if corridor:
+            results = filter_near_corridor(results, get_sample_radon_index(), corridor, radius_miles)
+        lines = iter([json.dumps(r) + "\n" for r in results])
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    
+    if radon_snapshot.available():
+        batches = iter_snapshot_radon_batches(radon_snapshot, batch_size)
+        return StreamingResponse(
+            stream_radon_batches(batches, corridor, radius_miles, run=asyncio.to_thread),
+            media_type="application/x-ndjson",
+        )
+    
+    from snowflake_connection import iter_snowflake_query_columns
+    
+    query, params = await asyncio.to_thread(
+        build_radon_query, ST_LOUIS_BBOX, segments, radius_miles if corridor else None
+    )
+    reserve_stream_slot()
+    return WarehouseStreamingResponse(
+        stream_radon_batches(iter_snowflake_query_columns(query, params, batch_size), corridor, radius_miles),
+        media_type="application/x-ndjson",
+    )
+
+@app.get("/api/map/radon-results/page")
+async def get_radon_test_results_page(cursor: Optional[str] = None,
+                                      limit: int = Query(1000, ge=1, le=10000),
+                                      near_tornado: bool = False, radius_miles: float = 2.0):
+    """
+    Get one page of radon test results using keyset pagination.
+    
+    Pass the returned next_cursor to fetch the following page; it is null on
+    the last page. Pages are ordered by object_id, so they stay consistent
+    without OFFSET scans. With near_tornado, a page may hold fewer than limit
+    results because rows are filtered after the page is read. Pages come from
+    the local snapshot when there is one.
+    """
+    try:
+        after_id = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        from snowflake_connection import USE_SNOWFLAKE
+        use_snowflake = USE_SNOWFLAKE
+    except (ImportError, AttributeError):
+        use_snowflake = False
+    
+    segments, corridor = await get_tornado_corridor() if near_tornado else (None, None)
+    
+    if not use_snowflake:
+        # Sample rows are paged by position
+        try:
+            start = int(after_id) + 1 if after_id is not None else 0
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+        page = SAMPLE_RADON_RESULTS[start:start + limit]
+        next_cursor = encode_cursor(start + limit - 1) if start + limit < len(SAMPLE_RADON_RESULTS) else None
+        if corridor and page:
+            page = filter_near_corridor(page, GridIndex.from_records(page), corridor, radius_miles)
+        return {"results": page, "next_cursor": next_cursor}
+    
+    if radon_snapshot.available():
+        try:
+            after = int(after_id) if after_id is not None else None
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+        columns = await asyncio.to_thread(snapshot_radon_page, radon_snapshot, after, limit)
+    else:
+        from snowflake_connection import execute_snowflake_query_columns
+        
+        query, params = await asyncio.to_thread(
+            build_radon_query, ST_LOUIS_BBOX, segments, radius_miles if corridor else None,
+            "St. Louis", True, after_id, limit,
+        )
+        try:
+            columns = await warehouse.run_shared(query_key(query, params), execute_snowflake_query_columns, query, params)
+        except Exception as e:
+            logger.error(f"Error fetching radon test results page: {e}")
+            raise HTTPException(status_code=503, detail="Unable to query Snowflake")
+    
+    results, lat, lng = await asyncio.to_thread(radon_columns_to_results, columns)
+    if corridor:
+        results = filter_batch_near_corridor(results, lat, lng, corridor, radius_miles)
+    count_map_rows("radon-results/page", len(columns.get("x_coord", [])), results)
+    object_ids = columns.get("object_id", [])
+    next_cursor = encode_cursor(object_ids[-1]) if len(object_ids) == limit else None
+    return {"results": results, "next_cursor": next_cursor}
+
+TILE_CACHE_DIR = os.path.join(DATA_DIR, "tiles")
+_tile_pyramid = None  # (source results list, TilePyramid)
+
+def get_tile_pyramid(results: List[Dict], index: GridIndex) -> TilePyramid:
+    """Tile pyramid for a radon dataset, rebuilt only when the dataset changes."""
+    global _tile_pyramid
+    if _tile_pyramid is None or _tile_pyramid[0] is not results:
+        pyramid = TilePyramid(
+            index.latitudes, index.longitudes, [r["final_result"] for r in results],
+            records=results, cache_dir=TILE_CACHE_DIR,
+        )
+        _tile_pyramid = (results, pyramid)
+    return _tile_pyramid[1]
+
+async def load_tile_pyramid() -> TilePyramid:
+    """Tile pyramid for the current radon dataset (Snowflake, or the sample data)."""
+    try:
+        from snowflake_connection import USE_SNOWFLAKE
+        use_snowflake = USE_SNOWFLAKE
+    except (ImportError, AttributeError):
+        use_snowflake = False
+    
+    if use_snowflake:
+        results, index = await radon_results_cache.get(("st-louis",), load_radon_dataset)
+    else:
+        results, index = SAMPLE_RADON_RESULTS, get_sample_radon_index()
+    return await asyncio.to_thread(get_tile_pyramid, results, index)
+
+@app.get("/api/map/tiles/{z}/{x}/{y}")
+async def get_radon_tile(z: int, x: int, y: int):
+    """
+    Get a web-mercator map tile of radon test results.
+    
+    Below the full-resolution zoom the tile holds binned aggregates (count,
+    mean result and share at or above 4.0 pCi/L); at deeper zooms it holds
+    the individual results inside the tile.
+    """
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    
+    try:
+        pyramid = await load_tile_pyramid()
+    except Exception as e:
+        logger.error(f"Error fetching radon test results for tiles: {e}")
+        raise HTTPException(status_code=503, detail="Unable to query Snowflake")
+    return await asyncio.to_thread(pyramid.tile, z, x, y)
+
+async def export_response(name: str, fmt: str, build_query, convert, schema) -> StreamingResponse:
+    """
+    Stream an Arrow/Parquet export of a warehouse query.
+
+    build_query runs on the warehouse pool and returns (sql, params). The
+    first chunk is fetched before the response starts, so query errors
+    become a 503 instead of a truncated download. Exports count towards
+    MAX_CONCURRENT_STREAMS.
+    """
+    try:
+        from snowflake_connection import USE_SNOWFLAKE, iter_snowflake_arrow_batches
+    except ImportError:
+        USE_SNOWFLAKE = False
+    if not USE_SNOWFLAKE:
+        raise HTTPException(status_code=503, detail="Snowflake is not configured")
+
+    reserve_stream_slot()
+    chunks = None
+    try:
+        query, params = await warehouse.run(build_query)
+        chunks = export_query(iter_snowflake_arrow_batches, query, params, convert, schema, fmt)
+        first = await warehouse.run(next, chunks, None)
+    except BaseException as e:
+        # No response to free the slot: the query failed or the client went away
+        _stream_slots["open"] -= 1
+        if chunks is not None:
+            await warehouse.run(chunks.close)
+        if not isinstance(e, Exception):
+            raise
+        logger.error(f"Error exporting {name}: {e}")
+        raise HTTPException(status_code=503, detail="Unable to query Snowflake")
+
+    async def body():
+        try:
+            chunk = first
+            while chunk is not None:
+                yield chunk
+                chunk = await warehouse.run(next, chunks, None)
+        except Exception as e:
+            # Headers are already sent; the client sees a truncated file
+            logger.error(f"Error streaming {name} export: {e}")
+        finally:
+            await warehouse.run(chunks.close)
+
+    media_type, extension = EXPORT_FORMATS[fmt]
+    return WarehouseStreamingResponse(
+        body(), media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'},
+    )
+
+def export_filters(bbox: Optional[str], start_date, end_date):
+    try:
+        require_pyarrow()
+    except ExportUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date is after end_date")
+    try:
+        return parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/export/radon-results")
+async def export_radon_results(
+    format: str = Query("arrow", pattern="^(arrow|parquet)$"),
+    bbox: Optional[str] = Query(None, description="lat_min,lat_max,lon_min,lon_max"),
+    zip_code: Optional[List[str]] = Query(None),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+):
+    """
+    Export valid St. Louis radon test results as an Arrow IPC stream or Parquet file.
+
+    Rows carry object_id, latitude/longitude, the UTM coordinates,
+    final_result, valid_test, city and zip_code. bbox defaults to the St.
+    Louis area; zip_code may be repeated; dates filter on the test date.
+    """
+    box = export_filters(bbox, start_date, end_date) or ST_LOUIS_BBOX
+    return await export_response(
+        "radon-results", format,
+        lambda: build_radon_query(bbox=box, keyset=True, zip_codes=zip_code,
+                                  start_date=start_date, end_date=end_date),
+        lambda table: radon_batch(table, box), radon_schema(),
+    )
+
+@app.get("/api/export/tornado-path")
+async def export_tornado_path(
+    format: str = Query("arrow", pattern="^(arrow|parquet)$"),
+    bbox: Optional[str] = Query(None, description="lat_min,lat_max,lon_min,lon_max"),
+    start_date: Optional[date] = date(2024, 5, 16),
+    end_date: Optional[date] = date(2024, 5, 16),
+):
+    """
+    Export NOAA tornado segments as an Arrow IPC stream or Parquet file.
+
+    Defaults to the May 16, 2024 tornado; a segment matches bbox if either
+    end lies inside it.
+    """
+    box = export_filters(bbox, start_date, end_date)
+
+    def build_query():
+        from snowflake_connection import execute_snowflake_query
+        mapping_name = resolve_mapping(execute_snowflake_query, noaa_schema_cache, NOAA_TABLE)
+        return build_tornado_export_query(mapping_name, NOAA_TABLE, box, start_date, end_date)
+
+    return await export_response("tornado-path", format, build_query, tornado_batch, tornado_schema())
+
+# Sample neighborhood data for development/testing
+SAMPLE_HOT_NEIGHBORHOODS = [
+    {"neighborhood": "The Ville", "zip_code": 63113, "ward": 19, "test_count": 45, "average_radon_level": 6.8, "high_risk_count": 32, "percent_above_action_level": 71.1},
+    {"neighborhood": "Walnut Park", "zip_code": 63113, "ward": 21, "test_count": 38, "average_radon_level": 6.2, "high_risk_count": 26, "percent_above_action_level": 68.4},
+    {"neighborhood": "Penrose", "zip_code": 63113, "ward": 21, "test_count": 52, "average_radon_level": 5.9, "high_risk_count": 35, "percent_above_action_level": 67.3},
+    {"neighborhood": "College Hill", "zip_code": 63115, "ward": 21, "test_count": 28, "average_radon_level": 5.7, "high_risk_count": 18, "percent_above_action_level": 64.3},
+    {"neighborhood": "Mark Twain", "zip_code": 63113, "ward": 19, "test_count": 33, "average_radon_level": 5.5, "high_risk_count": 20, "percent_above_action_level": 60.6},
+    {"neighborhood": "Fairground Neighborhood", "zip_code": 63106, "ward": 19, "test_count": 41, "average_radon_level": 5.3, "high_risk_count": 24, "percent_above_action_level": 58.5},
+    {"neighborhood": "O'Fallon", "zip_code": 63106, "ward": 19, "test_count": 36, "average_radon_level": 5.1, "high_risk_count": 21, "percent_above_action_level": 58.3},
+    {"neighborhood": "Fountain Park", "zip_code": 63106, "ward": 19, "test_count": 29, "average_radon_level": 4.9, "high_risk_count": 16, "percent_above_action_level": 55.2},
+    {"neighborhood": "North Pointe", "zip_code": 63147, "ward": 2, "test_count": 31, "average_radon_level": 4.8, "high_risk_count": 17, "percent_above_action_level": 54.8},
+    {"neighborhood": "Baden", "zip_code": 63147, "ward": 2, "test_count": 27, "average_radon_level": 4.7, "high_risk_count": 14, "percent_above_action_level": 51.9},
+]
+
+HOT_NEIGHBORHOODS_REFRESH_SECONDS = float(os.getenv("HOT_NEIGHBORHOODS_REFRESH_SECONDS", "300"))
+
+# Summary maintained from Snowflake, and one seeded from the sample data
+neighborhood_summary = NeighborhoodSummary()
+_neighborhood_summary_refresh = {"refreshed_at": None, "task": None}
+# One refresh at a time: the initial load and background refreshes share the in-flight one
+_summary_refreshes = SingleFlight("hot-neighborhoods")
+_sample_neighborhood_summary: Optional[NeighborhoodSummary] = None
+
+def get_sample_neighborhood_summary() -> NeighborhoodSummary:
+    global _sample_neighborhood_summary
+    if _sample_neighborhood_summary is None:
+        summary = NeighborhoodSummary()
+        summary.merge([
+            {**n, "result_sum": n["average_radon_level"] * n["test_count"]}
+            for n in SAMPLE_HOT_NEIGHBORHOODS
+        ])
+        _sample_neighborhood_summary = summary
+    return _sample_neighborhood_summary
+
+async def refresh_neighborhood_summary():
+    """Fold radon tests newer than the summary's watermark into the neighborhood summary (coalesced)."""
+    await _summary_refreshes.do("summary", _refresh_neighborhood_summary)
+
+async def _refresh_neighborhood_summary():
+    from snowflake_connection import execute_snowflake_query
+    
+    watermark = neighborhood_summary.watermark
+    rows = await warehouse.run(execute_snowflake_query, HOT_NEIGHBORHOODS_DELTA_QUERY, {"after_id": watermark})
+    if not neighborhood_summary.merge([{k.lower(): v for k, v in r.items()} for r in rows], after=watermark):
+        logger.warning("Discarded a hot neighborhood delta queried from an outdated watermark")
+        return
+    _neighborhood_summary_refresh["refreshed_at"] = time.monotonic()
+    if rows:
+        logger.info(f"Merged {len(rows)} neighborhood aggregates into hot neighborhood summary")
+
+async def _background_summary_refresh():
+    try:
+        await refresh_neighborhood_summary()
+    except Exception as e:
+        logger.error(f"Error refreshing hot neighborhood summary: {e}")
+
 @app.get("/api/radon/hot-neighborhoods")
 async def get_hot_neighborhoods(minTests: int = 5, sortBy: str = "average"):
     """
     Get neighborhoods with elevated radon levels.
     
-    In production, this would query your Snowflake RADON_TEST_RESULTS table:
-    
-    SELECT 
-        n.neighborhood,
-        n.zip_code,
-        n.ward,
-        COUNT(*) as test_count,
-        AVG(r.final_result) as average_radon_level,
-        SUM(CASE WHEN r.final_result >= 4.0 THEN 1 ELSE 0 END) as high_risk_count,
-        (SUM(CASE WHEN r.final_result >= 4.0 THEN 1 ELSE 0 END) * 100.0 / COUNT(*)) as percent_above_action_level
-    FROM RADON_TEST_RESULTS r
-    JOIN neighborhood_reference n ON r.zip_code::STRING = n.zip_code::STRING
-    WHERE r.valid_test = 'Y' AND r.city = 'St. Louis'
-    GROUP BY n.neighborhood, n.zip_code, n.ward
-    HAVING COUNT(*) >= :minTests
-    ORDER BY 
-        CASE WHEN :sortBy = 'average' THEN AVG(r.final_result) END DESC,
-        CASE WHEN :sortBy = 'count' THEN COUNT(*) END DESC,
-        CASE WHEN :sortBy = 'percent' THEN percent_above_action_level END DESC
-    """
-    
-    # Sample data structure - replace with Snowflake query in production
-    # TODO: Connect to Snowflake and execute the query above
-    sample_data = [
-        {"neighborhood": "The Ville", "zip_code": 63113, "ward": 19, "test_count": 45, "average_radon_level": 6.8, "high_risk_count": 32, "percent_above_action_level": 71.1},
-        {"neighborhood": "Walnut Park", "zip_code": 63113, "ward": 21, "test_count": 38, "average_radon_level": 6.2, "high_risk_count": 26, "percent_above_action_level": 68.4},
-        {"neighborhood": "Penrose", "zip_code": 63113, "ward": 21, "test_count": 52, "average_radon_level": 5.9, "high_risk_count": 35, "percent_above_action_level": 67.3},
-        {"neighborhood": "College Hill", "zip_code": 63115, "ward": 21, "test_count": 28, "average_radon_level": 5.7, "high_risk_count": 18, "percent_above_action_level": 64.3},
-        {"neighborhood": "Mark Twain", "zip_code": 63113, "ward": 19, "test_count": 33, "average_radon_level": 5.5, "high_risk_count": 20, "percent_above_action_level": 60.6},
-        {"neighborhood": "Fairground Neighborhood", "zip_code": 63106, "ward": 19, "test_count": 41, "average_radon_level": 5.3, "high_risk_count": 24, "percent_above_action_level": 58.5},
-        {"neighborhood": "O'Fallon", "zip_code": 63106, "ward": 19, "test_count": 36, "average_radon_level": 5.1, "high_risk_count": 21, "percent_above_action_level": 58.3},
-        {"neighborhood": "Fountain Park", "zip_code": 63106, "ward": 19, "test_count": 29, "average_radon_level": 4.9, "high_risk_count": 16, "percent_above_action_level": 55.2},
-        {"neighborhood": "North Pointe", "zip_code": 63147, "ward": 2, "test_count": 31, "average_radon_level": 4.8, "high_risk_count": 17, "percent_above_action_level": 54.8},
-        {"neighborhood": "Baden", "zip_code": 63147, "ward": 2, "test_count": 27, "average_radon_level": 4.7, "high_risk_count": 14, "percent_above_action_level": 51.9},
-    ]
+    Served from a per-neighborhood summary (test count, result sum and count
+    at or above 4.0 pCi/L) of RADON_TEST_RESULTS joined to
+    neighborhood_reference. The first request loads it; afterwards only
+    tests with a newer object_id are aggregated and merged in, in the
+    background once the summary is older than HOT_NEIGHBORHOODS_REFRESH_SECONDS.
+    sortBy is one of "average", "count" or "percent".
+    """
+    if sortBy not in SORT_ORDERS:
+        raise HTTPException(status_code=422, detail=f"sortBy must be one of: {', '.join(SORT_ORDERS)}")
     
-    # Filter by minimum tests
-    filtered = [n for n in sample_data if n["test_count"] >= minTests]
+    try:
+        from snowflake_connection import USE_SNOWFLAKE
+        use_snowflake = USE_SNOWFLAKE
+    except (ImportError, AttributeError):
+        use_snowflake = False
     
-    # Sort
-    if sortBy == "average":
-        filtered.sort(key=lambda x: x["average_radon_level"], reverse=True)
-    elif sortBy == "count":
-        filtered.sort(key=lambda x: x["test_count"], reverse=True)
-    elif sortBy == "percent":
-        filtered.sort(key=lambda x: x["percent_above_action_level"], reverse=True)
+    if not use_snowflake:
+        return get_sample_neighborhood_summary().query(minTests, sortBy)
     
-    return filtered
+    refreshed_at = _neighborhood_summary_refresh["refreshed_at"]
+    if refreshed_at is None:
+        try:
+            await refresh_neighborhood_summary()
+        except Exception as e:
+            # Fallback to sample data on error
+            logger.error(f"Error loading hot neighborhood summary: {e}")
+            mark_degraded("sample-data")
+            return get_sample_neighborhood_summary().query(minTests, sortBy)
+    elif time.monotonic() - refreshed_at > HOT_NEIGHBORHOODS_REFRESH_SECONDS and not len(_summary_refreshes):
+        _neighborhood_summary_refresh["task"] = asyncio.create_task(_background_summary_refresh())
+    
+    flag_if_warehouse_down()
+    return neighborhood_summary.query(minTests, sortBy)
+
+@registry.collector
+def _cache_metrics():
+    """Hit ratios and sizes of the in-process caches, read at scrape time."""
+    counts = {name: (s["hits"] + s["stale_hits"], s["misses"], s["entries"])
+              for name, s in ((name, cache.stats()) for name, cache in CACHES.items())}
+    summaries = [s for s in (neighborhood_summary, _sample_neighborhood_summary) if s is not None]
+    counts["hot-neighborhoods"] = (sum(s.memo_hits for s in summaries), sum(s.memo_misses for s in summaries), None)
+    for name, (hits, misses, entries) in counts.items():
+        labels = {"cache": name}
+        yield "cache_hits_total", "counter", "Cache lookups answered from a cached entry", labels, hits
+        yield "cache_misses_total", "counter", "Cache lookups that had to compute the value", labels, misses
+        yield "cache_hit_ratio", "gauge", "Share of cache lookups answered from a cached entry", \
+            labels, hits / (hits + misses) if hits + misses else 0.0
+        if entries is not None:
+            yield "cache_entries", "gauge", "Entries currently held in the cache", labels, entries
+
+@registry.collector
+def _warehouse_metrics():
+    """Warehouse thread pool and connection pool usage, read at scrape time."""
+    stats = warehouse.stats()
+    for key in ("active", "queued"):
+        yield f"warehouse_calls_{key}", "gauge", f"Warehouse calls currently {key}", {}, stats[key]
+    for key in ("completed", "failed", "rejected", "coalesced"):
+        yield f"warehouse_calls_{key}_total", "counter", f"Warehouse calls {key}", {}, stats[key]
+    from snowflake_connection import breaker, get_pool
+    circuit = breaker.stats()
+    for state in ("closed", "half_open", "open"):
+        yield "warehouse_circuit_state", "gauge", "1 for the Snowflake circuit breaker's current state", \
+            {"state": state}, 1 if circuit["state"] == state else 0
+    yield "warehouse_circuit_opened_total", "counter", "Times the Snowflake circuit opened", {}, circuit["opened"]
+    yield "warehouse_circuit_rejected_total", "counter", "Calls failed fast while the Snowflake circuit was open", \
+        {}, circuit["rejected"]
+    pool = get_pool()
+    if pool is not None:
+        yield "warehouse_pool_connections", "gauge", "Open Snowflake connections in the pool", {}, pool.size
+        yield "warehouse_pool_idle_connections", "gauge", "Idle Snowflake connections in the pool", {}, \
+            pool.idle_count
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Prometheus text-format metrics: route latencies, warehouse and store timings, row counts, cache hit ratios."""
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/admin/cache")
+async def get_cache_stats():
+    """Get entry counts and hit ratios for the map data caches."""
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+@app.get("/api/admin/warehouse")
+async def get_warehouse_stats():
+    """Get concurrency and queue-depth counters for the Snowflake thread pool, and the circuit breaker state."""
+    from snowflake_connection import breaker
+    return {**warehouse.stats(), "circuit": breaker.stats()}
+
+@app.get("/api/admin/snapshots")
+async def get_snapshot_stats():
+    """Get version, row count, watermark and refresh time of the local warehouse snapshots."""
+    return {"radon": radon_snapshot.stats(), "tornado": tornado_snapshot.stats()}
+
+@app.post("/api/admin/snapshots/refresh")
+async def refresh_snapshots_now():
+    """Fold warehouse changes into the local snapshots now instead of waiting for the background job."""
+    try:
+        return await refresh_snapshots()
+    except Exception as e:
+        logger.error(f"Snapshot refresh failed: {e}")
+        raise HTTPException(status_code=503, detail="Unable to query Snowflake")
+
+@app.post("/api/admin/cache/invalidate")
+async def invalidate_cache(name: Optional[str] = None):
+    """Drop cached map data so the next request reloads it. Invalidates every cache if no name is given."""
+    if name and name not in CACHES:
+        raise HTTPException(status_code=404, detail=f"Unknown cache: {name}")
+    targets = [CACHES[name]] if name else list(CACHES.values())
+    return {"invalidated": {cache.name: cache.invalidate() for cache in targets}}
 
 if __name__ == "__main__":
     import uvicorn
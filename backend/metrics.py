@@ -0,0 +1,255 @@
+"""
+Lightweight instrumentation exported in the Prometheus text format.
+
+Counters and histograms live in a process-wide registry and are rendered by
+render() for GET /api/metrics; values owned by other components (cache hit
+ratios, warehouse pool usage) are added at render time by collector
+callbacks. MetricsMiddleware records a latency histogram per route.
+
+A request sent with "X-Profile: 1" also gets a Server-Timing response header
+breaking its time down by instrumented stage (warehouse connect/query,
+coordinate transforms, distance filtering, store access). Stages are summed
+per request through a context variable, so work done on worker threads is
+attributed to the request that started it (see warehouse.WarehouseExecutor).
+For streaming responses the breakdown covers the work done before the
+first byte.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+PROFILE_HEADER = b"x-profile"
+
+# Upper bounds in seconds, from sub-millisecond handlers to multi-second warehouse loads
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+# Per-request stage timings (name -> seconds) while a profiled request is running
+_profile: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("profile", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations (or any non-negative value)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, stage: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Name under which observations are added to a profiled request's breakdown
+        self.stage = stage
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts, then sum and count
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+        if self.stage:
+            add_stage(self.stage, value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.labels + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labels + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {_format_value(state[-1])}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, help, labels, **kwargs))
+
+    def collector(self, fn: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]):
+        """Register fn() yielding (name, type, help, labels, value) samples computed at scrape time."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+        for fn in self._collectors:
+            for name, kind, help, labels, value in fn():
+                family = families.setdefault(name, (kind, help, []))
+                family[2].append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        for name, (kind, help, samples) in families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Time to serve a request, by route template", ["method", "route", "status"]
+)
+WAREHOUSE_CONNECT_SECONDS = registry.histogram(
+    "warehouse_connect_seconds", "Time to open a Snowflake connection", stage="warehouse_connect"
+)
+WAREHOUSE_QUERY_SECONDS = registry.histogram(
+    "warehouse_query_seconds", "Time to execute a Snowflake query and fetch its rows", ["operation"],
+    stage="warehouse_query",
+)
+WAREHOUSE_ROWS = registry.counter("warehouse_rows_fetched_total", "Rows fetched from Snowflake", ["operation"])
+MAP_ROWS = registry.counter(
+    "map_rows_total", "Radon rows loaded (fetched) and sent to clients after filtering (returned)",
+    ["route", "stage"],
+)
+TRANSFORM_SECONDS = registry.histogram(
+    "coordinate_transform_seconds", "Time spent converting UTM coordinates to latitude/longitude",
+    stage="transform",
+)
+DISTANCE_SECONDS = registry.histogram(
+    "distance_filter_seconds", "Time spent filtering results by distance to the tornado corridor",
+    stage="distance",
+)
+MAP_FALLBACKS = registry.counter(
+    "map_fallbacks_total", "Map requests answered with sample data after an error loading the real data", ["route"],
+)
+STORE_SECONDS = registry.histogram(
+    "store_operation_seconds", "Time spent in the SQLite store", ["operation"], stage="store",
+)
+
+
+def add_stage(name: str, seconds: float):
+    """Add seconds to the named stage of the current profiled request, if any."""
+    timings = _profile.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in sorted(timings.items())]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording REQUEST_SECONDS and answering X-Profile with a Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        profiled = any(k == PROFILE_HEADER and v not in (b"", b"0") for k, v in scope.get("headers", []))
+        timings: Optional[Dict[str, float]] = {} if profiled else None
+        token = _profile.set(timings)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings is not None:
+                    headers = list(message.get("headers", []))
+                    value = server_timing(timings, time.perf_counter() - started)
+                    headers.append((b"server-timing", value.encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _profile.reset(token)
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"], route=getattr(route, "path", "unmatched"), status=status,
+            )
@@ -0,0 +1,240 @@
+"""
+Column-layout discovery for NOAA storm event tables.
+
+Different loads of the NOAA data name the coordinate columns differently
+(begin_lat/begin_lon, slat/slon or a single lat/lon pair). Instead of trying
+every known SQL variant on each request, the layout is discovered once from
+INFORMATION_SCHEMA, remembered in a small JSON file that survives restarts,
+and only re-probed when a query with the remembered layout fails.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from circuit import CircuitOpenError
+from snowflake_connection import is_outage_error
+
+logger = logging.getLogger(__name__)
+
+NOAA_TABLE = "archdata.raw.noaa_dat"
+
+# Known column layouts, in the order they are tried
+COLUMN_MAPPINGS: Dict[str, Dict[str, str]] = {
+    # Standard NOAA column names (begin_lat/begin_lon, end_lat/end_lon)
+    "begin_end": {
+        "begin_lat": "begin_lat", "begin_lon": "begin_lon",
+        "end_lat": "end_lat", "end_lon": "end_lon",
+        "date": "begin_date",
+    },
+    # Alternative column names (slat/slon, elat/elon)
+    "slat_slon": {
+        "begin_lat": "slat", "begin_lon": "slon",
+        "end_lat": "elat", "end_lon": "elon",
+        "date": "begin_date",
+    },
+    # Simple lat/lon columns
+    "lat_lon": {
+        "begin_lat": "lat", "begin_lon": "lon",
+        "end_lat": "lat", "end_lon": "lon",
+        "date": "event_date",
+    },
+}
+
+QueryFn = Callable[..., List[Dict]]
+
+
+class SchemaCache:
+    """Remembers the working column layout per table in a JSON file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mappings: Dict[str, str] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self._mappings = {
+                        table: name for table, name in json.load(f).items() if name in COLUMN_MAPPINGS
+                    }
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable schema cache {path}: {e}")
+
+    def get(self, table: str) -> Optional[str]:
+        return self._mappings.get(table)
+
+    def set(self, table: str, mapping_name: str):
+        with self._lock:
+            self._mappings[table] = mapping_name
+            self._save()
+
+    def forget(self, table: str):
+        with self._lock:
+            if self._mappings.pop(table, None) is not None:
+                self._save()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._mappings, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def build_tornado_query(mapping_name: str, table: str = NOAA_TABLE) -> str:
+    """SQL for May 16 tornado segments in the St. Louis area using the given column layout."""
+    c = COLUMN_MAPPINGS[mapping_name]
+    return f"""
+    SELECT
+        {c['begin_lat']} as begin_lat,
+        {c['begin_lon']} as begin_lon,
+        {c['end_lat']} as end_lat,
+        {c['end_lon']} as end_lon,
+        {c['date']} as begin_date,
+        event_type
+    FROM {table}
+    WHERE {c['date']} = '2024-05-16'
+        AND event_type = 'TORNADO'
+        AND (({c['begin_lat']} BETWEEN 38.5 AND 38.8 AND {c['begin_lon']} BETWEEN -90.3 AND -90.1)
+             OR ({c['end_lat']} BETWEEN 38.5 AND 38.8 AND {c['end_lon']} BETWEEN -90.3 AND -90.1))
+    ORDER BY {c['date']}
+    """
+
+
+def build_tornado_export_query(mapping_name: str, table: str = NOAA_TABLE, bbox=None,
+                               start_date=None, end_date=None) -> Tuple[str, Dict]:
+    """
+    SQL and parameters for tornado segments, optionally limited to a date range and bbox.
+
+    bbox is (lat_min, lat_max, lon_min, lon_max); a segment matches if either
+    end lies inside it.
+    """
+    c = COLUMN_MAPPINGS[mapping_name]
+    conditions = ["event_type = 'TORNADO'"]
+    params: Dict = {}
+    if start_date is not None:
+        conditions.append(f"{c['date']} >= %(start_date)s")
+        params["start_date"] = str(start_date)
+    if end_date is not None:
+        conditions.append(f"{c['date']} <= %(end_date)s")
+        params["end_date"] = str(end_date)
+    if bbox is not None:
+        params.update(dict(zip(("lat_min", "lat_max", "lon_min", "lon_max"), bbox)))
+        conditions.append(
+            f"(({c['begin_lat']} BETWEEN %(lat_min)s AND %(lat_max)s"
+            f" AND {c['begin_lon']} BETWEEN %(lon_min)s AND %(lon_max)s)"
+            f" OR ({c['end_lat']} BETWEEN %(lat_min)s AND %(lat_max)s"
+            f" AND {c['end_lon']} BETWEEN %(lon_min)s AND %(lon_max)s))"
+        )
+    where = "\n        AND ".join(conditions)
+    query = f"""
+    SELECT
+        {c['begin_lat']} as begin_lat,
+        {c['begin_lon']} as begin_lon,
+        {c['end_lat']} as end_lat,
+        {c['end_lon']} as end_lon,
+        {c['date']} as begin_date,
+        event_type
+    FROM {table}
+    WHERE {where}
+    ORDER BY {c['date']}
+    """
+    return query, params
+
+
+def _table_columns(execute: QueryFn, table: str) -> set:
+    database, schema, name = table.split(".")
+    rows = execute(
+        f"""
+        SELECT column_name
+        FROM {database}.INFORMATION_SCHEMA.COLUMNS
+        WHERE table_schema = %(schema)s AND table_name = %(table)s
+        """,
+        {"schema": schema.upper(), "table": name.upper()},
+    )
+    return {str(r.get("COLUMN_NAME") or r.get("column_name")).lower() for r in rows}
+
+
+def _is_outage(error: BaseException) -> bool:
+    """The warehouse could not be reached, which says nothing about the column layout."""
+    return isinstance(error, CircuitOpenError) or is_outage_error(error)
+
+
+def _probe(execute: QueryFn, table: str) -> Tuple[str, bool]:
+    """The column layout for table, and whether the warehouse actually confirmed it."""
+    try:
+        columns = _table_columns(execute, table)
+    except Exception as e:
+        if _is_outage(e):
+            raise
+        logger.warning(f"INFORMATION_SCHEMA lookup for {table} failed: {e}")
+        columns = set()
+
+    if columns:
+        for name, mapping in COLUMN_MAPPINGS.items():
+            needed = set(mapping.values()) | {"event_type"}
+            if needed <= columns:
+                return name, True
+        raise Exception(f"No known column layout matches {table}")
+
+    # No metadata access: fall back to trying each layout once. A layout that
+    # runs but returns nothing (or Snowflake being disabled) is used, not trusted.
+    unconfirmed = None
+    for name in COLUMN_MAPPINGS:
+        try:
+            rows = execute(build_tornado_query(name, table) + " LIMIT 1")
+        except Exception as e:
+            if _is_outage(e):
+                # The warehouse is down, not the layout wrong; don't try the others
+                raise
+            logger.debug(f"Layout '{name}' does not match {table}: {e}")
+            continue
+        if rows:
+            return name, True
+        unconfirmed = unconfirmed or name
+    if unconfirmed is not None:
+        return unconfirmed, False
+    raise Exception("Could not query tornado path data with any known column name pattern")
+
+
+def probe_mapping(execute: QueryFn, table: str = NOAA_TABLE) -> str:
+    """Find the column layout for table. Raises if none of the known layouts match.
+
+    Outage errors are re-raised as they are rather than read as a layout mismatch.
+    """
+    return _probe(execute, table)[0]
+
+
+def resolve_mapping(execute: QueryFn, cache: SchemaCache, table: str = NOAA_TABLE) -> str:
+    """The remembered column layout for table, probing it if there is none.
+
+    Only a layout the warehouse confirmed is remembered.
+    """
+    mapping_name = cache.get(table)
+    if mapping_name is None:
+        mapping_name, confirmed = _probe(execute, table)
+        if confirmed:
+            cache.set(table, mapping_name)
+    return mapping_name
+
+
+def query_tornado_rows(execute: QueryFn, cache: SchemaCache, table: str = NOAA_TABLE) -> List[Dict]:
+    """Run the tornado path query with the remembered layout, probing first if there is none.
+
+    If the remembered layout stops working the table is probed again and the
+    query retried once. Outage errors are re-raised and the layout kept.
+    """
+    mapping_name = cache.get(table)
+    if mapping_name is not None:
+        try:
+            return execute(build_tornado_query(mapping_name, table))
+        except Exception as e:
+            if _is_outage(e):
+                # Keep the layout; the warehouse being down doesn't make it wrong
+                raise
+            logger.warning(f"Tornado query with remembered layout '{mapping_name}' failed, re-probing: {e}")
+            cache.forget(table)
+
+    mapping_name = resolve_mapping(execute, cache, table)
+    return execute(build_tornado_query(mapping_name, table))
@@ -0,0 +1,52 @@
+"""
+Batched coordinate conversion for radon test locations.
+
+Radon results store positions in UTM Zone 15N (EPSG:32615). Building a pyproj
+Transformer is expensive, so one is built per worker thread on first use and
+reused afterwards (pyproj Transformer objects must not be shared between
+threads). Whole coordinate arrays are converted in a single call.
+"""
+
+import threading
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+UTM_15N = "EPSG:32615"
+WGS84 = "EPSG:4326"
+
+# Rough St. Louis area (lat_min, lat_max, lon_min, lon_max)
+ST_LOUIS_BBOX = (38.4, 38.9, -90.5, -90.0)
+
+_local = threading.local()
+
+
+def get_transformer(inverse: bool = False):
+    """Cached UTM 15N -> WGS84 transformer for the calling thread (WGS84 -> UTM if inverse)."""
+    cache = getattr(_local, "transformers", None)
+    if cache is None:
+        cache = _local.transformers = {}
+    transformer = cache.get(inverse)
+    if transformer is None:
+        from pyproj import Transformer
+        src, dst = (WGS84, UTM_15N) if inverse else (UTM_15N, WGS84)
+        transformer = cache[inverse] = Transformer.from_crs(src, dst, always_xy=True)
+    return transformer
+
+
+def to_float_array(values: Sequence) -> np.ndarray:
+    """Convert a column of numbers (None for missing) to a float array with NaN for missing."""
+    return np.array(values, dtype=np.float64)
+
+
+def utm_to_latlon(x: Sequence[float], y: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert UTM 15N easting/northing arrays to (latitude, longitude) arrays in one call."""
+    lon, lat = get_transformer().transform(to_float_array(x), to_float_array(y))
+    return np.asarray(lat), np.asarray(lon)
+
+
+def bbox_mask(lat: np.ndarray, lon: np.ndarray,
+              bbox: Optional[Tuple[float, float, float, float]] = ST_LOUIS_BBOX) -> np.ndarray:
+    """Boolean mask of points inside (lat_min, lat_max, lon_min, lon_max); NaNs are excluded."""
+    lat_min, lat_max, lon_min, lon_max = bbox
+    return (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
@@ -0,0 +1,207 @@
+"""
+SQL builder for the radon test results query.
+
+Radon locations are stored as UTM Zone 15N easting/northing in the
+GEOMETRY_DATA variant. Rather than pulling every St. Louis row and filtering
+in Python, the lat/lon bounding box is converted to UTM ranges and the
+tornado corridor to a planar GEOMETRY in the same projection, so Snowflake
+only returns rows that can actually match. UTM distances are within a
+fraction of a percent of true ground distance in the zone.
+"""
+
+import base64
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from projection import ST_LOUIS_BBOX, get_transformer
+
+RADON_TABLE = "archdata.raw.radon_test_results"
+X_EXPR = "GEOMETRY_DATA:x::FLOAT"
+Y_EXPR = "GEOMETRY_DATA:y::FLOAT"
+
+# Column holding the test date, used only when a date filter is requested
+RADON_DATE_COLUMN = os.getenv("RADON_DATE_COLUMN", "test_date")
+
+METERS_PER_MILE = 1609.344
+
+Bbox = Tuple[float, float, float, float]
+
+
+def bbox_to_utm_ranges(bbox: Bbox = ST_LOUIS_BBOX, samples: int = 32) -> Tuple[float, float, float, float]:
+    """UTM (x_min, x_max, y_min, y_max) covering a (lat_min, lat_max, lon_min, lon_max) box.
+
+    Edges are sampled because lat/lon lines are curved in UTM; the result is a
+    slight superset of the box, and the exact lat/lon test is applied later.
+    """
+    lat_min, lat_max, lon_min, lon_max = bbox
+    t = np.linspace(0.0, 1.0, samples)
+    lats = np.concatenate([np.full(samples, lat_min), np.full(samples, lat_max),
+                           lat_min + t * (lat_max - lat_min), lat_min + t * (lat_max - lat_min)])
+    lons = np.concatenate([lon_min + t * (lon_max - lon_min), lon_min + t * (lon_max - lon_min),
+                           np.full(samples, lon_min), np.full(samples, lon_max)])
+    x, y = get_transformer(inverse=True).transform(lons, lats)
+    return float(np.min(x)), float(np.max(x)), float(np.min(y)), float(np.max(y))
+
+
+def polylines_to_utm(polylines: List[List[Dict]]) -> List[np.ndarray]:
+    """Project tornado polylines to arrays of UTM (x, y) vertices."""
+    transformer = get_transformer(inverse=True)
+    projected = []
+    for line in polylines:
+        if not line:
+            continue
+        x, y = transformer.transform(
+            np.array([p["longitude"] for p in line], dtype=np.float64),
+            np.array([p["latitude"] for p in line], dtype=np.float64),
+        )
+        projected.append(np.column_stack([np.atleast_1d(x), np.atleast_1d(y)]))
+    return projected
+
+
+def utm_polylines_to_wkt(lines: List[np.ndarray]) -> str:
+    """WKT for projected polylines; single-vertex lines become points."""
+    parts = []
+    for line in lines:
+        coords = ", ".join(f"{x:.2f} {y:.2f}" for x, y in line)
+        parts.append(f"LINESTRING({coords})" if len(line) > 1 else f"POINT({coords})")
+    return f"GEOMETRYCOLLECTION({', '.join(parts)})"
+
+
+def build_radon_query(
+    bbox: Optional[Bbox] = ST_LOUIS_BBOX,
+    polylines: Optional[List[List[Dict]]] = None,
+    radius_miles: Optional[float] = None,
+    city: Optional[str] = "St. Louis",
+    keyset: bool = False,
+    after_id=None,
+    limit: Optional[int] = None,
+    zip_codes: Optional[List[str]] = None,
+    start_date=None,
+    end_date=None,
+) -> Tuple[str, Dict]:
+    """
+    Build the radon results query with location filters evaluated in Snowflake.
+
+    bbox limits rows to a lat/lon box (via UTM ranges). If polylines and
+    radius_miles are given, rows must also lie within radius_miles of the
+    corridor; its expanded extent is added as a range predicate too so
+    Snowflake can prune micro-partitions before evaluating distances.
+    With keyset set, rows also carry object_id and are ordered by it, starting
+    after after_id and stopping at limit rows, for cursor pagination.
+    zip_codes and start_date/end_date (inclusive, on RADON_DATE_COLUMN)
+    narrow the rows further.
+    Returns the SQL and its bind parameters.
+    """
+    conditions = ["(valid_test = 'YES' OR valid_test = 'Y')"]
+    params: Dict = {}
+    if city:
+        conditions.append("city = %(city)s")
+        params["city"] = city
+    if zip_codes:
+        names = [f"zip_{i}" for i in range(len(zip_codes))]
+        conditions.append(f"zip_code::STRING IN ({', '.join(f'%({n})s' for n in names)})")
+        params.update({n: str(z) for n, z in zip(names, zip_codes)})
+    if start_date is not None:
+        conditions.append(f"{RADON_DATE_COLUMN} >= %(start_date)s")
+        params["start_date"] = str(start_date)
+    if end_date is not None:
+        conditions.append(f"{RADON_DATE_COLUMN} <= %(end_date)s")
+        params["end_date"] = str(end_date)
+
+    x_min, x_max, y_min, y_max = -np.inf, np.inf, -np.inf, np.inf
+    if bbox is not None:
+        x_min, x_max, y_min, y_max = bbox_to_utm_ranges(bbox)
+
+    corridor_condition = None
+    lines = polylines_to_utm(polylines) if polylines and radius_miles is not None else []
+    if lines:
+        radius_m = radius_miles * METERS_PER_MILE
+        vertices = np.vstack(lines)
+        x_min = max(x_min, float(vertices[:, 0].min()) - radius_m)
+        x_max = min(x_max, float(vertices[:, 0].max()) + radius_m)
+        y_min = max(y_min, float(vertices[:, 1].min()) - radius_m)
+        y_max = min(y_max, float(vertices[:, 1].max()) + radius_m)
+        corridor_condition = (
+            f"ST_DISTANCE(ST_MAKEGEOMPOINT({X_EXPR}, {Y_EXPR}), TO_GEOMETRY(%(corridor_wkt)s)) <= %(radius_m)s"
+        )
+        params["corridor_wkt"] = utm_polylines_to_wkt(lines)
+        params["radius_m"] = radius_m
+
+    if np.isfinite(x_min):
+        conditions.append(f"{X_EXPR} BETWEEN %(x_min)s AND %(x_max)s")
+        conditions.append(f"{Y_EXPR} BETWEEN %(y_min)s AND %(y_max)s")
+        params.update({"x_min": x_min, "x_max": x_max, "y_min": y_min, "y_max": y_max})
+    if corridor_condition:
+        conditions.append(corridor_condition)
+    if keyset and after_id is not None:
+        conditions.append("object_id > %(after_id)s")
+        params["after_id"] = after_id
+
+    where = "\n        AND ".join(conditions)
+    id_column = "object_id,\n        " if keyset else ""
+    query = f"""
+    SELECT
+        {id_column}{X_EXPR} as x_coord,
+        {Y_EXPR} as y_coord,
+        final_result,
+        valid_test,
+        city,
+        zip_code
+    FROM {RADON_TABLE}
+    WHERE {where}
+    """
+    if keyset:
+        query += "ORDER BY object_id\n"
+        if limit is not None:
+            query += "    LIMIT %(limit)s\n"
+            params["limit"] = int(limit)
+    return query, params
+
+
+def build_radon_snapshot_query(change_column: str, after=None, bbox: Bbox = ST_LOUIS_BBOX) -> Tuple[str, Dict]:
+    """
+    Query for the local snapshot: every radon row in bbox, with its change_column value.
+
+    With after set, only rows whose change_column is greater are returned.
+    valid_test and city are not filtered here, so a row that stops being
+    valid is still picked up and replaced in the snapshot.
+    """
+    x_min, x_max, y_min, y_max = bbox_to_utm_ranges(bbox)
+    params: Dict = {"x_min": x_min, "x_max": x_max, "y_min": y_min, "y_max": y_max}
+    conditions = [f"{X_EXPR} BETWEEN %(x_min)s AND %(x_max)s", f"{Y_EXPR} BETWEEN %(y_min)s AND %(y_max)s"]
+    if after is not None:
+        conditions.append(f"{change_column} > %(after)s")
+        params["after"] = after
+    where = "\n        AND ".join(conditions)
+    query = f"""
+    SELECT
+        object_id,
+        {X_EXPR} as x_coord,
+        {Y_EXPR} as y_coord,
+        final_result,
+        valid_test,
+        city,
+        zip_code,
+        {change_column} as change_value
+    FROM {RADON_TABLE}
+    WHERE {where}
+    """
+    return query, params
+
+
+def encode_cursor(after_id) -> str:
+    """Opaque page cursor for the last object_id returned."""
+    return base64.urlsafe_b64encode(json.dumps({"after": after_id}).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]):
+    """object_id to resume after, or None for the first page. Raises ValueError if malformed."""
+    if not cursor:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))["after"]
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,50 @@
+"""
+Single-flight coalescing of identical in-flight calls.
+
+When many requests ask for the same thing at once (a team opening the map at
+shift start), only the first caller runs the load; the others await the same
+in-flight execution and share its result or exception. Nothing is kept once
+the call finishes, so this only removes concurrent duplicates; caching is
+ResultCache's job.
+"""
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+def query_key(query: str, params: Optional[Any] = None) -> Hashable:
+    """Key for a SQL statement and its bind parameters, ignoring whitespace and parameter order."""
+    return " ".join(query.split()), json.dumps(params, sort_keys=True, default=str)
+
+
+class SingleFlight:
+    """Runs at most one load per key at a time and shares it with concurrent callers."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn(), or the call already running for key."""
+        call = self._calls.get(key)
+        if call is None:
+            self.executions += 1
+            # Run as its own task, so a caller that disconnects does not cancel the others
+            call = self._calls[key] = asyncio.ensure_future(fn())
+            call.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(call)
+
+    def _forget(self, key: Hashable, call: asyncio.Future):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            call.exception()
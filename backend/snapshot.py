@@ -0,0 +1,248 @@
+"""
+Local on-disk snapshots of warehouse tables.
+
+A snapshot is a set of equal-length columns saved as .npy files and opened
+memory-mapped, so loading one after a restart costs a few page faults rather
+than a warehouse round trip. Each refresh writes a new version directory and
+then swaps meta.json, so readers always see a complete version.
+
+Radon results are refreshed incrementally: only rows whose change column
+(RADON_SNAPSHOT_CHANGE_COLUMN, object_id unless the table has a proper
+modification timestamp) is past the stored watermark are queried, and they
+replace rows with the same object_id. An incremental refresh cannot see
+deleted rows, nor rows updated in place when the change column is object_id,
+so every RADON_SNAPSHOT_RESYNC_SECONDS the whole table is re-queried and the
+snapshot replaced instead. The tornado rows are few, so they are re-queried
+in full and only rewritten when they differ.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RADON_CHANGE_COLUMN = os.getenv("RADON_SNAPSHOT_CHANGE_COLUMN", "object_id")
+RADON_RESYNC_SECONDS = float(os.getenv("RADON_SNAPSHOT_RESYNC_SECONDS", "86400"))
+
+RADON_COLUMNS = ["object_id", "x_coord", "y_coord", "final_result", "valid_test", "city", "zip_code"]
+TORNADO_COLUMNS = ["begin_lat", "begin_lon", "end_lat", "end_lon", "begin_date", "event_type"]
+TEXT_COLUMNS = {"valid_test", "city", "zip_code", "begin_date", "event_type"}
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def to_column_array(name: str, values) -> np.ndarray:
+    """Numpy array for a snapshot column: fixed-width text (None as "") or float64/int64."""
+    if name in TEXT_COLUMNS:
+        return np.array(["" if v is None else str(v) for v in values], dtype=str)
+    if name == "object_id":
+        return np.array(values, dtype=np.int64)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+class ColumnSnapshot:
+    """Columns stored under directory as memory-mapped .npy files, with a refresh watermark."""
+
+    def __init__(self, directory: str, key: Optional[str] = None):
+        self.directory = directory
+        self.key = key
+        self._lock = threading.Lock()
+        self._loaded_version = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self.meta: Dict[str, Any] = {}
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            try:
+                with open(meta_path, "r") as f:
+                    self.meta = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable snapshot metadata {meta_path}: {e}")
+
+    def available(self) -> bool:
+        return bool(self.meta.get("version"))
+
+    @property
+    def watermark(self):
+        return self.meta.get("watermark")
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """The current columns, memory-mapped from disk."""
+        with self._lock:
+            version = self.meta.get("version")
+            if version and version != self._loaded_version:
+                path = os.path.join(self.directory, f"v{version}")
+                self._columns = {
+                    name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                    for name in self.meta["columns"]
+                }
+                self._loaded_version = version
+            return self._columns
+
+    def replace(self, columns: Dict[str, np.ndarray], watermark=None, resynced: bool = False):
+        """Write columns as the new version of the snapshot; resynced marks a full reload."""
+        with self._lock:
+            version = int(self.meta.get("version") or 0) + 1
+            path = os.path.join(self.directory, f"v{version}")
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+            for name, values in columns.items():
+                np.save(os.path.join(path, f"{name}.npy"), values)
+            meta = {
+                "version": version,
+                "columns": list(columns),
+                "rows": len(next(iter(columns.values()))) if columns else 0,
+                "watermark": _json_value(watermark),
+                "refreshed_at": datetime.now().isoformat(),
+                "resynced_at": time.time() if resynced else self.meta.get("resynced_at"),
+            }
+            tmp_path = os.path.join(self.directory, "meta.json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(meta, f, indent=2)
+            os.replace(tmp_path, os.path.join(self.directory, "meta.json"))
+            self.meta = meta
+            # Older versions may still be memory-mapped by readers; unlinking is safe on POSIX
+            for name in os.listdir(self.directory):
+                if name.startswith("v") and name != f"v{version}":
+                    shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def upsert(self, changes: Dict[str, np.ndarray], watermark):
+        """Merge changed rows in, replacing existing rows with the same key, and advance the watermark."""
+        current = self.columns() if self.available() else {}
+        if current:
+            keep = ~np.isin(current[self.key], changes[self.key])
+            merged = {}
+            for name, values in changes.items():
+                old = np.asarray(current[name])[keep]
+                if old.dtype.kind == "U" or values.dtype.kind == "U":
+                    old, values = old.astype(str), values.astype(str)
+                merged[name] = np.concatenate([old, values])
+        else:
+            merged = changes
+        self.replace(merged, watermark)
+
+    def stats(self) -> Dict[str, Any]:
+        return {k: self.meta.get(k) for k in ("version", "rows", "watermark", "refreshed_at", "resynced_at")}
+
+
+def resync_due(snapshot: ColumnSnapshot) -> bool:
+    """Whether the next radon refresh should reload the whole table."""
+    return not snapshot.available() or time.time() - (snapshot.meta.get("resynced_at") or 0) >= RADON_RESYNC_SECONDS
+
+
+def refresh_radon_snapshot(snapshot: ColumnSnapshot, fetch_batches: Callable[..., Iterator[Dict[str, List]]],
+                           build_query: Callable[..., Any], batch_size: int = 50000) -> int:
+    """
+    Fold radon rows changed since the snapshot watermark into the snapshot.
+
+    When a resync is due the whole table is queried and replaces the
+    snapshot, dropping deleted rows. fetch_batches(query, params, batch_size)
+    yields column-wise batches; build_query(change_column, after) returns the
+    (sql, params) to run. Returns the number of changed (or reloaded) rows.
+    """
+    resync = resync_due(snapshot)
+    query, params = build_query(RADON_CHANGE_COLUMN, None if resync else snapshot.watermark)
+    parts: Dict[str, List[np.ndarray]] = {name: [] for name in RADON_COLUMNS + ["change_value"]}
+    for batch in fetch_batches(query, params, batch_size):
+        for name in parts:
+            values = batch.get(name, [])
+            parts[name].append(to_column_array(name, values) if name != "change_value" else np.array(values))
+    if not parts["object_id"] or not sum(len(p) for p in parts["object_id"]):
+        return 0
+    changes = {name: np.concatenate(parts[name]) for name in RADON_COLUMNS}
+    change_values = np.concatenate(parts["change_value"])
+    watermark = max(change_values.tolist())
+    if resync:
+        snapshot.replace(changes, watermark, resynced=True)
+    else:
+        snapshot.upsert(changes, watermark)
+    return len(changes["object_id"])
+
+
+def refresh_tornado_snapshot(snapshot: ColumnSnapshot, rows: List[Dict]) -> bool:
+    """Store the tornado rows if they differ from the snapshot. Returns True if it changed."""
+    if not rows:
+        return False
+    columns = {
+        name: to_column_array(name, [r.get(name.upper(), r.get(name)) for r in rows])
+        for name in TORNADO_COLUMNS
+    }
+    if snapshot.available():
+        current = snapshot.columns()
+        if all(name in current and np.array_equal(current[name], columns[name], equal_nan=columns[name].dtype.kind == "f")
+               for name in TORNADO_COLUMNS):
+            return False
+    snapshot.replace(columns, watermark=time.time())
+    return True
+
+
+def tornado_rows(snapshot: ColumnSnapshot) -> List[Dict]:
+    """Tornado rows as stored in the snapshot, in the shape the NOAA query returns."""
+    columns = snapshot.columns()
+    if not columns:
+        return []
+    lists = {name: np.asarray(values).tolist() for name, values in columns.items()}
+    return [dict(zip(lists, values)) for values in zip(*lists.values())]
+
+
+def _valid_rows(columns: Dict[str, np.ndarray], city: Optional[str]) -> np.ndarray:
+    """Indices of valid radon rows, optionally in one city."""
+    valid = np.isin(np.char.upper(np.asarray(columns["valid_test"])), ["YES", "Y"])
+    if city:
+        valid &= np.asarray(columns["city"]) == city
+    return np.flatnonzero(valid)
+
+
+def _column_lists(columns: Dict[str, np.ndarray], rows: np.ndarray) -> Dict[str, List]:
+    result = {name: np.asarray(values)[rows].tolist() for name, values in columns.items()}
+    result["zip_code"] = [z or None for z in result["zip_code"]]
+    return result
+
+
+def radon_columns(snapshot: ColumnSnapshot, city: Optional[str] = "St. Louis") -> Dict[str, List]:
+    """Valid radon rows (optionally in one city) as column lists, like execute_snowflake_query_columns."""
+    columns = snapshot.columns()
+    if not columns:
+        return {}
+    return _column_lists(columns, _valid_rows(columns, city))
+
+
+def radon_page(snapshot: ColumnSnapshot, after_id: Optional[int], limit: int,
+               city: Optional[str] = "St. Louis") -> Dict[str, List]:
+    """Up to limit valid radon rows with object_id past after_id, in object_id order, as column lists."""
+    columns = snapshot.columns()
+    if not columns:
+        return {}
+    rows = _valid_rows(columns, city)
+    ids = np.asarray(columns["object_id"])[rows]
+    if after_id is not None:
+        rows, ids = rows[ids > after_id], ids[ids > after_id]
+    if len(rows) > limit:
+        first = np.argpartition(ids, limit - 1)[:limit]
+        rows, ids = rows[first], ids[first]
+    return _column_lists(columns, rows[np.argsort(ids, kind="stable")])
+
+
+def iter_radon_batches(snapshot: ColumnSnapshot, batch_size: int,
+                       city: Optional[str] = "St. Louis") -> Iterator[Dict[str, List]]:
+    """Valid radon rows in column-wise batches of up to batch_size, like iter_snowflake_query_columns."""
+    columns = snapshot.columns()
+    if not columns:
+        return
+    rows = _valid_rows(columns, city)
+    for start in range(0, len(rows), batch_size):
+        yield _column_lists(columns, rows[start:start + batch_size])
@@ -9,40 +9,59 @@ To use Snowflake instead of JSON file storage:
 """
 
 import os
-from typing import Optional, List, Dict, Any
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any, Iterator
 import logging
 
+from circuit import CircuitBreaker, mark_degraded
+from metrics import WAREHOUSE_CONNECT_SECONDS, WAREHOUSE_QUERY_SECONDS, WAREHOUSE_ROWS
+
 logger = logging.getLogger(__name__)
 
-# Auto-enable Snowflake if credentials are available, or use environment variable
-USE_SNOWFLAKE_ENV = os.getenv('USE_SNOWFLAKE', '').lower() == 'true'
+def _detect_snowflake() -> bool:
+    """Auto-enable Snowflake if credentials are available, or use the USE_SNOWFLAKE environment variable."""
+    use_snowflake_env = os.getenv('USE_SNOWFLAKE', '').lower() == 'true'
+    try:
+        from snowflake_config import (
+            SNOWFLAKE_ACCOUNT, SNOWFLAKE_USER, SNOWFLAKE_PASSWORD, SNOWFLAKE_PAT
+        )
+        # If we can import credentials and have either password or PAT, enable Snowflake
+        has_credentials = (
+            SNOWFLAKE_ACCOUNT and SNOWFLAKE_USER and 
+            (bool(SNOWFLAKE_PASSWORD and SNOWFLAKE_PASSWORD.strip()) or bool(SNOWFLAKE_PAT and SNOWFLAKE_PAT.strip()))
+        )
+        return bool(use_snowflake_env or has_credentials)
+    except ImportError:
+        # Check environment variables
+        has_credentials = (
+            os.getenv('SNOWFLAKE_ACCOUNT') and os.getenv('SNOWFLAKE_USER') and 
+            (os.getenv('SNOWFLAKE_PASSWORD') or os.getenv('SNOWFLAKE_PAT'))
+        )
+        return bool(use_snowflake_env or has_credentials)
+    except Exception as e:
+        logger.warning(f"Error checking Snowflake credentials: {e}")
+        return use_snowflake_env
 
-# Try to auto-detect if credentials are configured
-USE_SNOWFLAKE = False
-try:
-    from snowflake_config import (
-        SNOWFLAKE_ACCOUNT, SNOWFLAKE_USER, SNOWFLAKE_PASSWORD, SNOWFLAKE_PAT
-    )
-    # If we can import credentials and have either password or PAT, enable Snowflake
-    has_credentials = (
-        SNOWFLAKE_ACCOUNT and SNOWFLAKE_USER and 
-        (bool(SNOWFLAKE_PASSWORD and SNOWFLAKE_PASSWORD.strip()) or bool(SNOWFLAKE_PAT and SNOWFLAKE_PAT.strip()))
-    )
-    USE_SNOWFLAKE = USE_SNOWFLAKE_ENV if USE_SNOWFLAKE_ENV else has_credentials
-except ImportError:
-    # Check environment variables
-    has_credentials = (
-        os.getenv('SNOWFLAKE_ACCOUNT') and os.getenv('SNOWFLAKE_USER') and 
-        (os.getenv('SNOWFLAKE_PASSWORD') or os.getenv('SNOWFLAKE_PAT'))
-    )
-    USE_SNOWFLAKE = USE_SNOWFLAKE_ENV if USE_SNOWFLAKE_ENV else has_credentials
-except Exception as e:
-    logger.warning(f"Error checking Snowflake credentials: {e}")
-    USE_SNOWFLAKE = USE_SNOWFLAKE_ENV
+
+def snowflake_enabled() -> bool:
+    """Whether Snowflake is configured. Credentials are checked on first use, not at import time."""
+    if "USE_SNOWFLAKE" not in globals():
+        globals()["USE_SNOWFLAKE"] = _detect_snowflake()
+    return globals()["USE_SNOWFLAKE"]
+
+
+def __getattr__(name: str):
+    # USE_SNOWFLAKE is resolved lazily so importing this module stays cheap;
+    # assigning the attribute (e.g. in scripts) overrides detection
+    if name == "USE_SNOWFLAKE":
+        return snowflake_enabled()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_snowflake_connection():
     """Get a Snowflake connection if configured. Supports password or PAT authentication."""
-    if not USE_SNOWFLAKE:
+    if not snowflake_enabled():
         return None
     
     try:
@@ -145,55 +164,503 @@ def get_snowflake_connection():
         logger.debug(traceback.format_exc())
         return None
 
+class PoolTimeoutError(TimeoutError):
+    """Raised when every pooled connection stays checked out past checkout_timeout."""
+
+
+class SnowflakeConnectionPool:
+    """
+    Bounded pool of reusable Snowflake connections shared across requests.
+
+    Connections are health-checked on checkout, evicted after sitting idle for
+    longer than max_idle (down to min_size) and recycled once they are older
+    than max_lifetime, so long-lived sessions never outlive their auth token.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 5,
+        max_idle: float = 300.0,
+        max_lifetime: float = 3600.0,
+        checkout_timeout: float = 30.0,
+        health_check_after: float = 60.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self.health_check_after = health_check_after
+        # Idle connections as [conn, created_at, last_used_at]; most recently used last
+        self._idle: List[list] = []
+        self._created_at: Dict[int, float] = {}
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    def fill(self):
+        """Open connections until min_size is reached."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            conn = self._connect()
+            if conn is None:
+                return
+            with self._cond:
+                self._idle.append([conn, self._created_at[id(conn)], time.monotonic()])
+                self._cond.notify()
+
+    def _connect(self):
+        """Open a new connection for a slot already reserved in _size."""
+        try:
+            with WAREHOUSE_CONNECT_SECONDS.time():
+                conn = get_snowflake_connection()
+        except Exception:
+            conn = None
+        if conn is None:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return None
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+            self._size -= 1
+            self._cond.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, created_at: float, last_used: float) -> bool:
+        now = time.monotonic()
+        if now - created_at > self.max_lifetime:
+            return False
+        try:
+            if conn.is_closed():
+                return False
+        except Exception:
+            return False
+        if now - last_used > self.health_check_after:
+            cursor = None
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            except Exception:
+                return False
+            finally:
+                if cursor is not None:
+                    try:
+                        cursor.close()
+                    except Exception:
+                        pass
+        return True
+
+    def _evict_idle(self) -> List[Any]:
+        """Pop idle connections past max_idle while keeping min_size. Caller holds the lock."""
+        now = time.monotonic()
+        evicted = []
+        # Oldest-used connections sit at the front of the list
+        while self._idle and self._size - len(evicted) > self.min_size:
+            conn, _, last_used = self._idle[0]
+            if now - last_used <= self.max_idle:
+                break
+            self._idle.pop(0)
+            evicted.append(conn)
+        return evicted
+
+    def acquire(self):
+        """Check out a healthy connection, opening one if below max_size. Returns None if unavailable."""
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    return None
+                for conn in self._evict_idle():
+                    self._created_at.pop(id(conn), None)
+                    self._size -= 1
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                entry = None
+                if self._idle:
+                    entry = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"Timed out waiting for a Snowflake connection (pool max_size={self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+                    continue
+
+            if entry is None:
+                return self._connect()
+
+            conn, created_at, last_used = entry
+            if self._is_healthy(conn, created_at, last_used):
+                return conn
+            logger.info("Recycling stale Snowflake connection")
+            self._discard(conn)
+
+    def release(self, conn, discard: bool = False):
+        """Return a connection to the pool, or close it if discard is set or the pool is closed."""
+        if conn is None:
+            return
+        with self._cond:
+            created_at = self._created_at.get(id(conn))
+            keep = not discard and not self._closed and created_at is not None
+            if keep:
+                self._idle.append([conn, created_at, time.monotonic()])
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and returns it afterwards.
+
+        The connection is discarded instead of reused if the block raises
+        or is abandoned part way through.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            # Includes GeneratorExit from an abandoned streaming query
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """Close all idle connections; checked-out connections close on release."""
+        with self._cond:
+            self._closed = True
+            idle = [entry[0] for entry in self._idle]
+            self._idle = []
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+
+_pool: Optional[SnowflakeConnectionPool] = None
+# The health probe keeps a connection of its own, so a pool saturated by
+# user traffic is not reported as an outage
+_probe_pool: Optional[SnowflakeConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def init_pool() -> Optional[SnowflakeConnectionPool]:
+    """Open min_size connections in the shared pool ahead of the first query."""
+    if not snowflake_enabled():
+        return None
+    pool = _shared_pool()
+    pool.fill()
+    return pool
+
+
+def _shared_pool() -> SnowflakeConnectionPool:
+    """The shared connection pool (sized from environment), created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SnowflakeConnectionPool(
+                min_size=int(os.getenv('SNOWFLAKE_POOL_MIN_SIZE', '1')),
+                max_size=int(os.getenv('SNOWFLAKE_POOL_MAX_SIZE', '5')),
+                max_idle=float(os.getenv('SNOWFLAKE_POOL_MAX_IDLE_SECONDS', '300')),
+                max_lifetime=float(os.getenv('SNOWFLAKE_POOL_MAX_LIFETIME_SECONDS', '3600')),
+                checkout_timeout=float(os.getenv('SNOWFLAKE_POOL_TIMEOUT_SECONDS', '30')),
+            )
+        return _pool
+
+
+def _shared_probe_pool() -> SnowflakeConnectionPool:
+    """The health probe's single-connection pool, created on first use."""
+    global _probe_pool
+    with _pool_lock:
+        if _probe_pool is None:
+            _probe_pool = SnowflakeConnectionPool(
+                min_size=0,
+                max_size=1,
+                max_lifetime=float(os.getenv('SNOWFLAKE_POOL_MAX_LIFETIME_SECONDS', '3600')),
+            )
+        return _probe_pool
+
+
+def close_pool():
+    """Close the shared connection pool and the health probe's connection."""
+    global _pool, _probe_pool
+    with _pool_lock:
+        pools = [_pool, _probe_pool]
+        _pool = _probe_pool = None
+    for pool in pools:
+        if pool is not None:
+            pool.close()
+
+
+def get_pool() -> Optional[SnowflakeConnectionPool]:
+    return _pool
+
+
+# Opens after repeated connect/query failures so callers fall back at once instead of timing out
+breaker = CircuitBreaker(
+    "snowflake",
+    failure_threshold=int(os.getenv('SNOWFLAKE_BREAKER_FAILURES', '5')),
+    reset_timeout=float(os.getenv('SNOWFLAKE_BREAKER_RESET_SECONDS', '30')),
+    max_reset_timeout=float(os.getenv('SNOWFLAKE_BREAKER_MAX_RESET_SECONDS', '300')),
+)
+
+
+class SnowflakeUnavailableError(Exception):
+    """Raised when Snowflake is enabled but no connection could be opened."""
+
+
+def is_outage_error(error: BaseException) -> bool:
+    """True for errors suggesting Snowflake is unreachable, as opposed to a bad query or a bug."""
+    if isinstance(error, PoolTimeoutError):
+        # The pool is busy, which says nothing about the warehouse
+        return False
+    if isinstance(error, (SnowflakeUnavailableError, OSError)):
+        return True
+    try:
+        from snowflake.connector import errors
+    except ImportError:
+        return False
+    return isinstance(error, errors.Error) and not isinstance(
+        error, (errors.ProgrammingError, errors.DataError, errors.IntegrityError, errors.NotSupportedError)
+    )
+
+
+@contextmanager
+def snowflake_connection(pool: Optional[SnowflakeConnectionPool] = None):
+    """
+    Yield a connection from pool (the shared pool by default), through the circuit breaker.
+
+    While the breaker is open this raises CircuitOpenError without trying to
+    connect, and a failed connect raises SnowflakeUnavailableError, so an
+    outage is never mistaken for an empty result. Those and outage errors
+    raised in the block count as failures; anything else as a success. A
+    pool checkout timeout counts as neither: a busy pool is not an outage.
+    None is yielded only when Snowflake is disabled.
+    """
+    if not snowflake_enabled():
+        yield None
+        return
+    breaker.before_call()
+    failure = None
+    counted = True
+    try:
+        with _checkout(pool) as conn:
+            if conn is None:
+                mark_degraded("warehouse-unavailable")
+                raise SnowflakeUnavailableError("Unable to connect to Snowflake")
+            yield conn
+    except PoolTimeoutError:
+        counted = False
+        raise
+    except Exception as e:
+        if is_outage_error(e):
+            failure = e
+        raise
+    finally:
+        if not counted:
+            breaker.cancel_call()
+        elif failure is not None:
+            breaker.record_failure(failure)
+        else:
+            breaker.record_success()
+
+
+@contextmanager
+def _checkout(pool: Optional[SnowflakeConnectionPool] = None):
+    """Yield a connection from pool, or the shared pool (created here if the warm-up did not)."""
+    with (pool or _shared_pool()).connection() as conn:
+        yield conn
+
+
+def ping_snowflake() -> bool:
+    """Round-trip a trivial query on the health probe's own connection; True if the warehouse answered."""
+    with snowflake_connection(_shared_probe_pool()) as conn:
+        if not conn:
+            return False
+        cursor = conn.cursor()
+        try:
+            with WAREHOUSE_QUERY_SECONDS.time(operation="ping"):
+                cursor.execute("SELECT 1")
+                return cursor.fetchone() is not None
+        finally:
+            cursor.close()
+
+
 def execute_snowflake_query(query: str, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
     """Execute a Snowflake query and return results as list of dicts."""
-    conn = get_snowflake_connection()
-    if not conn:
-        return []
-    
-    try:
+    with snowflake_connection() as conn:
+        if not conn:
+            return []
+        
         cursor = conn.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
+        try:
+            with WAREHOUSE_QUERY_SECONDS.time(operation="rows"):
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                
+                # Get column names
+                columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                
+                # Fetch results and convert to list of dicts
+                results = []
+                for row in cursor.fetchall():
+                    results.append(dict(zip(columns, row)))
+            WAREHOUSE_ROWS.inc(len(results), operation="rows")
+            
+            return results
+        except Exception as e:
+            logger.error(f"Snowflake query error: {e}")
+            raise
+        finally:
+            cursor.close()
+
+def execute_snowflake_query_columns(query: str, params: Optional[Dict] = None) -> Dict[str, List[Any]]:
+    """Execute a Snowflake query and return results column-wise, keyed by lowercase column name.
+
+    Avoids building a dict per row for large result sets.
+    """
+    with snowflake_connection() as conn:
+        if not conn:
+            return {}
         
-        # Get column names
-        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        cursor = conn.cursor()
+        try:
+            with WAREHOUSE_QUERY_SECONDS.time(operation="columns"):
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                
+                columns = [desc[0].lower() for desc in cursor.description] if cursor.description else []
+                rows = cursor.fetchall()
+                values = list(zip(*rows)) if rows else [()] * len(columns)
+                result = {name: list(col) for name, col in zip(columns, values)}
+            WAREHOUSE_ROWS.inc(len(rows), operation="columns")
+            return result
+        except Exception as e:
+            logger.error(f"Snowflake query error: {e}")
+            raise
+        finally:
+            cursor.close()
+
+def iter_snowflake_query_columns(query: str, params: Optional[Dict] = None,
+                                 batch_size: int = 10000) -> Iterator[Dict[str, List[Any]]]:
+    """Execute a Snowflake query and yield results in column-wise batches of up to batch_size rows.
+
+    The connection is held until the generator is exhausted or closed.
+    """
+    with snowflake_connection() as conn:
+        if not conn:
+            return
         
-        # Fetch results and convert to list of dicts
-        results = []
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
+        cursor = conn.cursor()
+        # Time in the warehouse only, not while the consumer holds a batch
+        elapsed = 0.0
+        try:
+            started = time.perf_counter()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            
+            columns = [desc[0].lower() for desc in cursor.description] if cursor.description else []
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                elapsed += time.perf_counter() - started
+                if not rows:
+                    break
+                WAREHOUSE_ROWS.inc(len(rows), operation="batches")
+                yield {name: list(col) for name, col in zip(columns, zip(*rows))}
+                started = time.perf_counter()
+        except Exception as e:
+            logger.error(f"Snowflake query error: {e}")
+            raise
+        finally:
+            WAREHOUSE_QUERY_SECONDS.observe(elapsed, operation="batches")
+            cursor.close()
+
+def iter_snowflake_arrow_batches(query: str, params: Optional[Dict] = None) -> Iterator[Any]:
+    """Execute a Snowflake query and yield its result as pyarrow Tables, one per result chunk.
+
+    Rows are never converted to Python objects. Requires pyarrow. The
+    connection is held until the generator is exhausted or closed.
+    """
+    with snowflake_connection() as conn:
+        if not conn:
+            return
         
-        return results
-    except Exception as e:
-        logger.error(f"Snowflake query error: {e}")
-        raise
-    finally:
-        cursor.close()
-        conn.close()
+        cursor = conn.cursor()
+        elapsed = 0.0
+        try:
+            started = time.perf_counter()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            
+            for table in cursor.fetch_arrow_batches():
+                elapsed += time.perf_counter() - started
+                WAREHOUSE_ROWS.inc(table.num_rows, operation="arrow")
+                yield table
+                started = time.perf_counter()
+            elapsed += time.perf_counter() - started
+        except Exception as e:
+            logger.error(f"Snowflake query error: {e}")
+            raise
+        finally:
+            WAREHOUSE_QUERY_SECONDS.observe(elapsed, operation="arrow")
+            cursor.close()
 
 def execute_snowflake_dml(query: str, params: Optional[Dict] = None) -> int:
     """Execute a DML query (INSERT, UPDATE, DELETE) and return affected rows."""
-    conn = get_snowflake_connection()
-    if not conn:
-        return 0
-    
-    try:
-        cursor = conn.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
+    with snowflake_connection() as conn:
+        if not conn:
+            return 0
         
-        affected_rows = cursor.rowcount
-        conn.commit()
-        return affected_rows
-    except Exception as e:
-        logger.error(f"Snowflake DML error: {e}")
-        conn.rollback()
-        raise
-    finally:
-        cursor.close()
-        conn.close()
+        cursor = conn.cursor()
+        try:
+            with WAREHOUSE_QUERY_SECONDS.time(operation="dml"):
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+            
+            affected_rows = cursor.rowcount
+            conn.commit()
+            return affected_rows
+        except Exception as e:
+            logger.error(f"Snowflake DML error: {e}")
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
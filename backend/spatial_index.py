@@ -0,0 +1,103 @@
+"""
+Grid spatial index for proximity queries over lat/lon points.
+
+Points are projected onto a local equirectangular plane (in miles) and bucketed
+into square cells. A radius query only looks at the cells that can possibly
+contain a match and returns those candidates for the caller's exact distance
+test (corridor.Corridor), so the cost depends on the number of nearby points
+rather than the size of the whole dataset.
+"""
+
+import math
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE = math.pi * EARTH_RADIUS_MILES / 180.0
+
+# The local projection under-estimates distances by well under 1% across a
+# metro area; widen the candidate search so no true match is pruned.
+PROJECTION_MARGIN = 1.02
+
+
+class GridIndex:
+    """Uniform-grid index over a fixed set of points. Build once per dataset, query many times."""
+
+    def __init__(self, latitudes: Sequence[float], longitudes: Sequence[float], cell_miles: float = 0.25):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        if self.latitudes.shape != self.longitudes.shape:
+            raise ValueError("latitudes and longitudes must have the same length")
+        self.cell_miles = cell_miles
+
+        if len(self.latitudes):
+            self.lat0 = float(self.latitudes.mean())
+            self.lon0 = float(self.longitudes.mean())
+        else:
+            self.lat0 = self.lon0 = 0.0
+        self._x_scale = MILES_PER_DEGREE * math.cos(math.radians(self.lat0))
+
+        ix, iy = self._cells(self.latitudes, self.longitudes)
+        keys = self._keys(ix, iy)
+        # Points sorted by cell; each occupied cell is a contiguous run in _order
+        self._order = np.argsort(keys, kind="stable")
+        self._cell_keys, self._cell_starts, self._cell_counts = np.unique(
+            keys[self._order], return_index=True, return_counts=True
+        )
+
+    @classmethod
+    def from_records(cls, records: List[Dict], cell_miles: float = 0.25) -> "GridIndex":
+        """Build an index over dicts with 'latitude' and 'longitude' keys."""
+        return cls(
+            [r["latitude"] for r in records],
+            [r["longitude"] for r in records],
+            cell_miles=cell_miles,
+        )
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    def _cells(self, latitudes, longitudes):
+        x = (np.asarray(longitudes) - self.lon0) * self._x_scale
+        y = (np.asarray(latitudes) - self.lat0) * MILES_PER_DEGREE
+        return (
+            np.floor(x / self.cell_miles).astype(np.int64),
+            np.floor(y / self.cell_miles).astype(np.int64),
+        )
+
+    @staticmethod
+    def _keys(ix, iy):
+        # Pack signed cell coordinates into one int64 key
+        return (ix << 32) + (iy & 0xFFFFFFFF)
+
+    def candidates_near(self, latitudes: Sequence[float], longitudes: Sequence[float], radius_miles: float) -> np.ndarray:
+        """Indices of points in any grid cell within radius_miles of any query location.
+
+        A superset of the true matches; callers apply the exact distance test.
+        """
+        if not len(self) or not len(latitudes):
+            return np.empty(0, dtype=np.int64)
+        reach = int(math.ceil(radius_miles * PROJECTION_MARGIN / self.cell_miles))
+        ix, iy = self._cells(latitudes, longitudes)
+        offsets = np.arange(-reach, reach + 1, dtype=np.int64)
+        dx, dy = np.meshgrid(offsets, offsets, indexing="ij")
+        query_keys = np.unique(self._keys(
+            (ix[:, None] + dx.ravel()[None, :]).ravel(),
+            (iy[:, None] + dy.ravel()[None, :]).ravel(),
+        ))
+
+        # Keep only query cells that are actually occupied
+        pos = np.searchsorted(self._cell_keys, query_keys)
+        valid = pos < len(self._cell_keys)
+        valid[valid] = self._cell_keys[pos[valid]] == query_keys[valid]
+        pos = pos[valid]
+        if not len(pos):
+            return np.empty(0, dtype=np.int64)
+
+        starts = self._cell_starts[pos]
+        counts = self._cell_counts[pos]
+        # Expand [start, start + count) runs into one flat index array
+        run_offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        flat = np.arange(counts.sum(), dtype=np.int64) + run_offsets
+        return np.sort(self._order[flat])
@@ -0,0 +1,485 @@
+"""
+SQLite-backed storage for neighborhoods and addresses.
+
+Replaces the whole-file JSON storage: every read and write is a keyed lookup
+against an indexed table, updates run in transactions against a WAL journal
+(so readers never block the writer), and ids come from a persisted sequence
+so they keep increasing after deletes.
+
+Every write stamps the changed rows with updated_at and the next value of a
+per-collection version counter, and deletes leave a tombstone carrying the
+version they happened at, so clients can ask for just the changes since a
+version they already have.
+
+Existing data/neighborhoods.json and data/addresses.json files are imported
+the first time the database is opened.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import STORE_SECONDS
+
+NEIGHBORHOOD_FIELDS = ["id", "name", "description", "risk_level", "messaging_template", "created_at"]
+ADDRESS_FIELDS = ["id", "address", "neighborhood_id", "status", "notes", "visited_at", "created_at"]
+
+# Fields a client may change through update_address; id and created_at are fixed
+ADDRESS_MUTABLE_FIELDS = {"address", "neighborhood_id", "status", "notes", "visited_at"}
+
+# Columns returned to callers; version and normalized_address stay internal
+NEIGHBORHOOD_COLUMNS = ", ".join(NEIGHBORHOOD_FIELDS + ["updated_at"])
+ADDRESS_COLUMNS = ", ".join(ADDRESS_FIELDS + ["updated_at"])
+
+COLLECTIONS = ("neighborhoods", "addresses")
+
+# Columns added after the tables were first created, migrated in place on open
+ADDED_COLUMNS = {
+    "neighborhoods": {"updated_at": "TEXT", "version": "INTEGER NOT NULL DEFAULT 0"},
+    "addresses": {"normalized_address": "TEXT", "updated_at": "TEXT", "version": "INTEGER NOT NULL DEFAULT 0"},
+}
+
+ADDRESS_INSERT = (
+    "INSERT INTO addresses (id, address, neighborhood_id, status, notes, visited_at, created_at, "
+    "normalized_address, updated_at, version) "
+    "VALUES (:id, :address, :neighborhood_id, :status, :notes, :visited_at, :created_at, "
+    ":normalized_address, :updated_at, :version)"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS neighborhoods (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    risk_level TEXT NOT NULL,
+    messaging_template TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_neighborhoods_version ON neighborhoods(version);
+
+CREATE TABLE IF NOT EXISTS addresses (
+    id TEXT PRIMARY KEY,
+    address TEXT NOT NULL,
+    neighborhood_id TEXT,
+    status TEXT NOT NULL,
+    notes TEXT,
+    visited_at TEXT,
+    created_at TEXT NOT NULL,
+    normalized_address TEXT,
+    updated_at TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_addresses_normalized ON addresses(normalized_address);
+CREATE INDEX IF NOT EXISTS idx_addresses_version ON addresses(version);
+-- Neighborhood lookups, alone or combined with a status filter, and status-only lookups
+CREATE INDEX IF NOT EXISTS idx_addresses_neighborhood ON addresses(neighborhood_id, status);
+CREATE INDEX IF NOT EXISTS idx_addresses_status ON addresses(status);
+
+CREATE TABLE IF NOT EXISTS tombstones (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    deleted_at TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_tombstones_version ON tombstones(collection, version);
+
+CREATE TABLE IF NOT EXISTS id_sequences (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _timed_load(method):
+    """Record a read method's duration as a store load."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._timed("load"):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class Store:
+    """Repository over a SQLite database in WAL mode, with one connection per thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        for table, added in ADDED_COLUMNS.items():
+            columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if not columns:
+                continue
+            for column, definition in added.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            if table == "addresses" and "normalized_address" not in columns:
+                conn.create_function("normalize_address", 1, normalize_address)
+                conn.execute("UPDATE addresses SET normalized_address = normalize_address(address)")
+        conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _timed(self, operation: str):
+        """Observe STORE_SECONDS for the outermost timed block on this thread (nested reads are not counted twice)."""
+        depth = getattr(self._local, "timed_depth", 0)
+        self._local.timed_depth = depth + 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.timed_depth = depth
+            if depth == 0:
+                STORE_SECONDS.observe(time.perf_counter() - started, operation=operation)
+
+    @contextmanager
+    def transaction(self):
+        """Run a block inside a write transaction, committing on success and rolling back on error."""
+        with self._timed("save"):
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def next_id(self, conn: sqlite3.Connection, sequence: str) -> str:
+        """Allocate the next id from a persisted sequence. Must be called inside a transaction."""
+        return str(self.reserve_ids(conn, sequence, 1))
+
+    def reserve_ids(self, conn: sqlite3.Connection, sequence: str, count: int) -> int:
+        """Allocate count consecutive ids and return the first. Must be called inside a transaction."""
+        row = conn.execute("SELECT value FROM id_sequences WHERE name = ?", (sequence,)).fetchone()
+        first = (row["value"] if row else 0) + 1
+        if count > 0:
+            conn.execute(
+                "INSERT INTO id_sequences (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (sequence, first + count - 1),
+            )
+        return first
+
+    def _next_version(self, conn: sqlite3.Connection, collection: str) -> int:
+        """Advance a collection's version counter. Must be called inside a transaction."""
+        return self.reserve_ids(conn, f"{collection}_version", 1)
+
+    def _stamp(self, conn: sqlite3.Connection, collection: str, record: Dict, version: Optional[int] = None) -> Dict:
+        record["updated_at"] = datetime.now().isoformat()
+        record["version"] = version if version is not None else self._next_version(conn, collection)
+        return record
+
+    def _tombstone(self, conn: sqlite3.Connection, collection: str, record_id: str):
+        conn.execute(
+            "INSERT OR REPLACE INTO tombstones (collection, id, version, deleted_at) VALUES (?, ?, ?, ?)",
+            (collection, record_id, self._next_version(conn, collection), datetime.now().isoformat()),
+        )
+
+    @contextmanager
+    def snapshot(self):
+        """Run several reads against one consistent view of the database."""
+        with self._timed("load"):
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                conn.execute("COMMIT")
+
+    @_timed_load
+    def collection_version(self, collection: str) -> int:
+        """Version of the latest change to collection; 0 if it was never written."""
+        row = self._connection().execute(
+            "SELECT value FROM id_sequences WHERE name = ?", (f"{collection}_version",)
+        ).fetchone()
+        return row["value"] if row else 0
+
+    @_timed_load
+    def changes_since(self, collection: str, since: int, filters: Optional[Dict[str, str]] = None) -> Dict:
+        """
+        Records of collection changed after version since, and ids deleted after it.
+
+        With filters (column -> value, e.g. neighborhood_id or status),
+        changed records that no longer match are reported as deleted, so a
+        client holding the filtered view drops them.
+        """
+        conn = self._connection()
+        columns = NEIGHBORHOOD_COLUMNS if collection == "neighborhoods" else ADDRESS_COLUMNS
+        changed = [dict(r) for r in conn.execute(
+            f"SELECT {columns} FROM {collection} WHERE version > ? ORDER BY version", (since,)
+        )]
+        deleted = [r["id"] for r in conn.execute(
+            "SELECT id FROM tombstones WHERE collection = ? AND version > ? ORDER BY version", (collection, since)
+        )]
+        filters = {k: v for k, v in (filters or {}).items() if v}
+        if filters:
+            matches = [all(r[k] == v for k, v in filters.items()) for r in changed]
+            deleted += [r["id"] for r, match in zip(changed, matches) if not match]
+            changed = [r for r, match in zip(changed, matches) if match]
+        return {"changed": changed, "deleted": deleted}
+
+    def _bump_sequence(self, conn: sqlite3.Connection, sequence: str, ids: List[str]):
+        """Advance a sequence past any numeric ids that were inserted directly."""
+        numeric = [int(i) for i in ids if str(i).isdigit()]
+        if not numeric:
+            return
+        conn.execute(
+            "INSERT INTO id_sequences (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)",
+            (sequence, max(numeric)),
+        )
+
+    # Neighborhoods
+
+    @_timed_load
+    def list_neighborhoods(self) -> List[Dict]:
+        rows = self._connection().execute(f"SELECT {NEIGHBORHOOD_COLUMNS} FROM neighborhoods ORDER BY rowid")
+        return [dict(r) for r in rows]
+
+    @_timed_load
+    def get_neighborhood(self, neighborhood_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            f"SELECT {NEIGHBORHOOD_COLUMNS} FROM neighborhoods WHERE id = ?", (neighborhood_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def insert_neighborhood(self, data: Dict) -> Dict:
+        with self.transaction() as conn:
+            record = self._stamp(conn, "neighborhoods", {"id": self.next_id(conn, "neighborhoods"), **data})
+            conn.execute(
+                "INSERT INTO neighborhoods "
+                "(id, name, description, risk_level, messaging_template, created_at, updated_at, version) "
+                "VALUES (:id, :name, :description, :risk_level, :messaging_template, :created_at, :updated_at, :version)",
+                record,
+            )
+        return record
+
+    def update_neighborhood(self, neighborhood_id: str, data: Dict) -> Optional[Dict]:
+        with self.transaction() as conn:
+            row = conn.execute(
+                f"SELECT {NEIGHBORHOOD_COLUMNS} FROM neighborhoods WHERE id = ?", (neighborhood_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            record = {**dict(row), **data, "id": neighborhood_id, "created_at": row["created_at"]}
+            self._stamp(conn, "neighborhoods", record)
+            conn.execute(
+                "UPDATE neighborhoods SET name = :name, description = :description, risk_level = :risk_level, "
+                "messaging_template = :messaging_template, updated_at = :updated_at, version = :version "
+                "WHERE id = :id",
+                record,
+            )
+        return record
+
+    def delete_neighborhood(self, neighborhood_id: str) -> bool:
+        with self.transaction() as conn:
+            cursor = conn.execute("DELETE FROM neighborhoods WHERE id = ?", (neighborhood_id,))
+            if cursor.rowcount:
+                self._tombstone(conn, "neighborhoods", neighborhood_id)
+        return cursor.rowcount > 0
+
+    # Addresses
+
+    @_timed_load
+    def list_addresses(self, neighborhood_id: Optional[str] = None, status: Optional[str] = None) -> List[Dict]:
+        """Addresses in insertion order, optionally limited to a neighborhood and/or status (index lookups)."""
+        where, params = _address_filters(neighborhood_id, status)
+        rows = self._connection().execute(f"SELECT {ADDRESS_COLUMNS} FROM addresses{where} ORDER BY rowid", params)
+        return [dict(r) for r in rows]
+
+    @_timed_load
+    def count_addresses(self, neighborhood_id: Optional[str] = None, status: Optional[str] = None) -> List[Dict]:
+        """Address counts per (neighborhood_id, status) pair, optionally filtered, answered from the indexes."""
+        where, params = _address_filters(neighborhood_id, status)
+        rows = self._connection().execute(
+            f"SELECT neighborhood_id, status, COUNT(*) AS count FROM addresses{where} "
+            "GROUP BY neighborhood_id, status ORDER BY neighborhood_id, status",
+            params,
+        )
+        return [dict(r) for r in rows]
+
+    @_timed_load
+    def get_address(self, address_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            f"SELECT {ADDRESS_COLUMNS} FROM addresses WHERE id = ?", (address_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def insert_address(self, data: Dict) -> Dict:
+        with self.transaction() as conn:
+            record = self._stamp(conn, "addresses", {"id": self.next_id(conn, "addresses"), **data})
+            self._insert_address_row(conn, record)
+        return record
+
+    def _insert_address_row(self, conn: sqlite3.Connection, record: Dict):
+        conn.execute(
+            ADDRESS_INSERT,
+            {**record, "normalized_address": normalize_address(record["address"])},
+        )
+
+    def insert_addresses(self, records: List[Dict]) -> Tuple[List[Dict], List[int]]:
+        """
+        Insert many addresses in one transaction, skipping duplicates.
+
+        An address is a duplicate if its normalized text matches an existing
+        address or an earlier record in the batch. Ids are allocated as one
+        contiguous block. Returns the inserted records and the positions of
+        the skipped duplicates.
+        """
+        keys = [normalize_address(r["address"]) for r in records]
+        with self.transaction() as conn:
+            existing = set()
+            unique_keys = list(set(keys))
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT normalized_address FROM addresses WHERE normalized_address IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                existing.update(r[0] for r in rows)
+
+            fresh, duplicates = [], []
+            for position, (record, key) in enumerate(zip(records, keys)):
+                if key in existing:
+                    duplicates.append(position)
+                else:
+                    existing.add(key)
+                    fresh.append(record)
+
+            first_id = self.reserve_ids(conn, "addresses", len(fresh))
+            version = self._next_version(conn, "addresses")
+            inserted = [
+                self._stamp(conn, "addresses", {"id": str(first_id + i), **record}, version)
+                for i, record in enumerate(fresh)
+            ]
+            conn.executemany(
+                ADDRESS_INSERT, [{**r, "normalized_address": normalize_address(r["address"])} for r in inserted]
+            )
+        return inserted, duplicates
+
+    def _apply_address_update(
+        self, conn: sqlite3.Connection, address_id: str, updater: Callable[[Dict], None], version: Optional[int] = None
+    ) -> Optional[Dict]:
+        row = conn.execute(f"SELECT {ADDRESS_COLUMNS} FROM addresses WHERE id = ?", (address_id,)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        updater(record)
+        record["id"] = address_id
+        record["created_at"] = row["created_at"]
+        self._stamp(conn, "addresses", record, version)
+        conn.execute(
+            "UPDATE addresses SET address = :address, neighborhood_id = :neighborhood_id, status = :status, "
+            "notes = :notes, visited_at = :visited_at, normalized_address = :normalized_address, "
+            "updated_at = :updated_at, version = :version WHERE id = :id",
+            {**record, "normalized_address": normalize_address(record["address"])},
+        )
+        return record
+
+    def update_address(self, address_id: str, updater: Callable[[Dict], None]) -> Optional[Dict]:
+        """Load an address, let updater modify the dict in place, and write it back atomically."""
+        with self.transaction() as conn:
+            return self._apply_address_update(conn, address_id, updater)
+
+    def update_addresses(self, updates: List[Tuple[str, Callable[[Dict], None]]]) -> List[Optional[Dict]]:
+        """Apply several (address_id, updater) pairs in one transaction; None marks ids that were not found."""
+        with self.transaction() as conn:
+            version = self._next_version(conn, "addresses")
+            return [self._apply_address_update(conn, address_id, updater, version) for address_id, updater in updates]
+
+    def delete_address(self, address_id: str) -> bool:
+        with self.transaction() as conn:
+            cursor = conn.execute("DELETE FROM addresses WHERE id = ?", (address_id,))
+            if cursor.rowcount:
+                self._tombstone(conn, "addresses", address_id)
+        return cursor.rowcount > 0
+
+    # Migration
+
+    def import_json(self, neighborhoods_file: str, addresses_file: str):
+        """Import the legacy JSON files into empty tables, once per database."""
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM id_sequences WHERE name = 'json_import'").fetchone():
+                return
+            conn.execute("INSERT INTO id_sequences (name, value) VALUES ('json_import', 1)")
+            if os.path.exists(neighborhoods_file):
+                if conn.execute("SELECT COUNT(*) FROM neighborhoods").fetchone()[0] == 0:
+                    with open(neighborhoods_file, "r") as f:
+                        neighborhoods = json.load(f)
+                    version = self._next_version(conn, "neighborhoods")
+                    for n in neighborhoods:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO neighborhoods "
+                            "(id, name, description, risk_level, messaging_template, created_at, version) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            [_to_text(n.get(field)) if field == "id" else n.get(field) for field in NEIGHBORHOOD_FIELDS]
+                            + [version],
+                        )
+                    self._bump_sequence(conn, "neighborhoods", [str(n.get("id")) for n in neighborhoods])
+            if os.path.exists(addresses_file):
+                if conn.execute("SELECT COUNT(*) FROM addresses").fetchone()[0] == 0:
+                    with open(addresses_file, "r") as f:
+                        addresses = json.load(f)
+                    version = self._next_version(conn, "addresses")
+                    for a in addresses:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO addresses "
+                            "(id, address, neighborhood_id, status, notes, visited_at, created_at, "
+                            "normalized_address, version) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            [_to_text(a.get(field)) if field == "id" else a.get(field) for field in ADDRESS_FIELDS]
+                            + [normalize_address(a.get("address") or ""), version],
+                        )
+                    self._bump_sequence(conn, "addresses", [str(a.get("id")) for a in addresses])
+
+
+def normalize_address(address: str) -> str:
+    """Comparison key for an address: lowercase, punctuation dropped, whitespace collapsed."""
+    return " ".join(re.sub(r"[^\w\s]", " ", address.lower()).split())
+
+
+def _address_filters(neighborhood_id: Optional[str], status: Optional[str]) -> Tuple[str, List[str]]:
+    conditions, params = [], []
+    if neighborhood_id:
+        conditions.append("neighborhood_id = ?")
+        params.append(neighborhood_id)
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+def _to_text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
@@ -0,0 +1,149 @@
+"""
+Address API: bulk import de-duplication, batch status updates, and delta
+sync with conditional GETs.
+
+Run with: python -m pytest test_addresses.py
+"""
+
+import asyncio
+import json
+
+
+def import_csv(client, text: str, **params):
+    response = client.post("/api/addresses/import", params=params, content=text.encode(),
+                           headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_import_skips_addresses_that_normalize_the_same(client):
+    job = import_csv(client, 'address,neighborhood_id\n12 Oak St.,1\n"12  oak st",1\n12 OAK ST,2\n14 Oak St,1\n')
+    assert (job["state"], job["rows"], job["imported"], job["duplicates"]) == ("completed", 4, 2, 2)
+
+    addresses = [a["address"] for a in client.get("/api/addresses").json()]
+    assert addresses.count("12 Oak St.") == 1
+    assert "12 OAK ST" not in addresses
+
+
+def test_import_skips_addresses_already_stored(client):
+    client.post("/api/addresses", json={"address": "40 Pine Ave"})
+    body = "\n".join(json.dumps({"address": a}) for a in ["40, Pine Ave", "40 pine ave.", "42 Pine Ave"])
+    response = client.post("/api/addresses/import", content=body.encode(),
+                           headers={"Content-Type": "application/x-ndjson"})
+    job = response.json()
+    assert (job["imported"], job["duplicates"]) == (1, 2)
+
+
+def test_duplicates_across_chunks_are_skipped(client):
+    job = import_csv(client, "address\n7 Elm St\n8 Elm St\n7 elm st\n8 ELM ST.\n", chunk_size=2)
+    assert (job["imported"], job["duplicates"]) == (2, 2)
+
+
+def test_invalid_rows_are_reported_and_skipped(client):
+    job = import_csv(client, "address,neighborhood_id\n90 Ash St,1\n91 Ash St,1,extra\n,1\n")
+    assert (job["imported"], job["errors"]) == (1, 2)
+    assert [e["row"] for e in job["row_errors"]] == [2, 3]
+
+
+def new_address(client, text: str) -> str:
+    return client.post("/api/addresses", json={"address": text}).json()["id"]
+
+
+def test_patch_stamps_visited_at_on_the_first_visit(client):
+    first, second, missing = new_address(client, "1 Visit Ln"), new_address(client, "2 Visit Ln"), "999999"
+    response = client.patch("/api/addresses", json=[
+        {"id": first, "status": "visited", "notes": "nobody home"},
+        {"id": missing, "status": "visited"},
+        {"id": second, "notes": "dog in yard"},
+    ])
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["ok"] for r in results] == [True, False, True]
+    visited, _, untouched = (r.get("address") for r in results)
+    assert visited["status"] == "visited" and visited["notes"] == "nobody home"
+    assert visited["visited_at"] is not None
+    # Only notes changed: still not visited, and the address is unchanged
+    assert untouched["status"] == "not_visited" and untouched["visited_at"] is None
+    assert untouched["address"] == "2 Visit Ln"
+
+    # A later status change keeps the first visit time
+    again = client.patch("/api/addresses", json=[{"id": first, "status": "interested"}]).json()[0]["address"]
+    assert again["visited_at"] == visited["visited_at"]
+    assert again["notes"] == "nobody home"
+
+
+def test_since_returns_changes_and_tombstones(client):
+    keep, drop = new_address(client, "1 Sync Ct"), new_address(client, "2 Sync Ct")
+    version = int(client.get("/api/addresses").headers["x-collection-version"])
+
+    client.patch("/api/addresses", json=[{"id": keep, "status": "visited"}])
+    client.delete(f"/api/addresses/{drop}")
+    delta = client.get("/api/addresses", params={"since": version}).json()
+    assert [r["id"] for r in delta["changed"]] == [keep]
+    assert delta["deleted"] == [drop]
+    assert delta["reset"] is False
+    assert delta["version"] > version
+
+    # Nothing new since the latest version
+    latest = client.get("/api/addresses", params={"since": delta["version"]}).json()
+    assert (latest["changed"], latest["deleted"]) == ([], [])
+
+
+def test_filtered_delta_drops_records_that_left_the_view(client):
+    address_id = new_address(client, "3 Sync Ct")
+    version = int(client.get("/api/addresses").headers["x-collection-version"])
+    client.patch("/api/addresses", json=[{"id": address_id, "status": "visited"}])
+    delta = client.get("/api/addresses", params={"since": version, "status": "not_visited"}).json()
+    assert address_id in delta["deleted"]
+    assert address_id not in [r["id"] for r in delta["changed"]]
+
+
+def test_since_past_the_current_version_resets(client):
+    version = int(client.get("/api/addresses").headers["x-collection-version"])
+    delta = client.get("/api/addresses", params={"since": version + 1000}).json()
+    assert delta["reset"] is True
+    assert len(delta["changed"]) == len(client.get("/api/addresses").json())
+
+
+def test_unchanged_collection_answers_304(client):
+    first = client.get("/api/addresses")
+    etag = first.headers["etag"]
+    cached = client.get("/api/addresses", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    # Another view of the collection has its own tag
+    assert client.get("/api/addresses", params={"status": "visited"}, headers={"If-None-Match": etag}).status_code == 200
+
+    new_address(client, "4 Sync Ct")
+    changed = client.get("/api/addresses", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_neighborhood_deletes_leave_tombstones(client):
+    neighborhood = client.post("/api/neighborhoods", json={
+        "name": "Sync Test", "risk_level": "high", "messaging_template": "Hello",
+    }).json()
+    version = int(client.get("/api/neighborhoods").headers["x-collection-version"])
+    client.delete(f"/api/neighborhoods/{neighborhood['id']}")
+    delta = client.get("/api/neighborhoods", params={"since": version}).json()
+    assert delta["deleted"] == [neighborhood["id"]]
+    etag = client.get("/api/neighborhoods").headers["etag"]
+    assert client.get("/api/neighborhoods", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_store_calls_run_off_the_event_loop(main_module, client, monkeypatch):
+    loops = []
+
+    def list_addresses(*args):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return []
+
+    monkeypatch.setattr(main_module.store, "list_addresses", list_addresses)
+    assert client.get("/api/addresses").json() == []
+    assert loops == [None]
@@ -0,0 +1,84 @@
+"""
+Result cache: failed loads must not be cached, concurrent misses share one load,
+and corridor results are keyed by the tornado path they were computed for.
+
+Run with: python -m pytest test_cache.py
+"""
+
+import asyncio
+
+import pytest
+
+import snowflake_connection
+from cache import ResultCache
+from metrics import MAP_FALLBACKS
+
+
+def test_failed_load_is_not_cached():
+    cache = ResultCache("test", ttl=60)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise RuntimeError("warehouse down")
+
+    async def loading():
+        calls.append(1)
+        return "value"
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await cache.get("key", failing)
+        return await cache.get("key", loading)
+
+    assert asyncio.run(run()) == "value"
+    assert len(calls) == 2
+
+
+def test_concurrent_misses_share_one_load():
+    cache = ResultCache("test", ttl=60)
+    calls = []
+
+    async def loading():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*[cache.get("key", loading) for _ in range(5)])
+
+    assert asyncio.run(run()) == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced_misses"] == 4
+
+
+def test_failed_login_is_not_cached_as_empty_dataset(main_module, client, warehouse, monkeypatch):
+    fallbacks = MAP_FALLBACKS._values.get(("radon-results",), 0)
+    monkeypatch.setattr(snowflake_connection, "get_snowflake_connection", lambda: None)
+    response = client.get("/api/map/radon-results")
+    assert response.status_code == 200
+    assert "warehouse-unavailable" in response.headers["x-data-degraded"]
+    assert len(main_module.radon_results_cache) == 0
+    assert MAP_FALLBACKS._values[("radon-results",)] == fallbacks + 1
+
+    monkeypatch.setattr(snowflake_connection, "get_snowflake_connection", warehouse.connect)
+    response = client.get("/api/map/radon-results")
+    assert "x-data-degraded" not in response.headers
+    # Real data, not the handful of fallback rows
+    assert len(response.json()) > len(main_module.SAMPLE_RADON_RESULTS)
+
+
+def test_corridor_results_are_cached_per_tornado_path(main_module, client, warehouse, monkeypatch):
+    paths = {
+        "sample": [[{"latitude": 38.658, "longitude": -90.231}, {"latitude": 38.690, "longitude": -90.205}]],
+        "moved": [[{"latitude": 38.600, "longitude": -90.250}, {"latitude": 38.620, "longitude": -90.240}]],
+    }
+    results = {}
+    for name, segments in paths.items():
+        async def get_segments(segments=segments):
+            return segments
+        monkeypatch.setattr(main_module, "get_tornado_segments", get_segments)
+        response = client.get("/api/map/radon-results", params={"near_tornado": True, "radius_miles": 0.5})
+        results[name] = sorted((r["latitude"], r["longitude"]) for r in response.json())
+    assert len(main_module.radon_results_cache) == 2
+    assert results["sample"] != results["moved"]
@@ -0,0 +1,131 @@
+"""
+Snowflake circuit breaker: state transitions, what counts as a failure, and
+the X-Data-Degraded flag on fallback responses.
+
+Run with: python -m pytest test_circuit.py
+"""
+
+import time
+
+import pytest
+
+import snowflake_connection
+from circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from snowflake_connection import PoolTimeoutError, SnowflakeConnectionPool
+
+
+def open_breaker(reset_timeout: float = 0.05) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=reset_timeout, max_reset_timeout=1.0)
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure("down")
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure("down")
+    assert breaker.state == CLOSED
+    # A success in between resets the count
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure("down")
+    assert breaker.state == CLOSED
+    breaker.record_failure("down")
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_with_longer_backoff():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure("still down")
+    assert breaker.state == OPEN
+    # Backoff doubled to 0.1s: still open after the original 0.05s
+    time.sleep(0.06)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    time.sleep(0.05)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+
+
+def test_cancelled_probe_frees_the_slot():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.cancel_call()
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+
+
+def test_failed_connects_open_the_circuit(warehouse, monkeypatch):
+    breaker = CircuitBreaker("snowflake", failure_threshold=3, reset_timeout=60)
+    monkeypatch.setattr(snowflake_connection, "breaker", breaker)
+    monkeypatch.setattr(snowflake_connection, "get_snowflake_connection", lambda: None)
+    for _ in range(3):
+        with pytest.raises(snowflake_connection.SnowflakeUnavailableError):
+            snowflake_connection.execute_snowflake_query("SELECT 1")
+    assert breaker.state == OPEN
+    connects = warehouse.connects
+    with pytest.raises(CircuitOpenError):
+        snowflake_connection.execute_snowflake_query("SELECT 1")
+    assert warehouse.connects == connects
+
+
+def test_sql_errors_do_not_count(warehouse, monkeypatch):
+    breaker = CircuitBreaker("snowflake", failure_threshold=1)
+    monkeypatch.setattr(snowflake_connection, "breaker", breaker)
+    with pytest.raises(Exception, match="SQL compilation error"):
+        snowflake_connection.execute_snowflake_query("SELECT nonsense FROM nowhere")
+    assert breaker.state == CLOSED
+
+
+def test_pool_exhaustion_does_not_open_the_circuit(warehouse, monkeypatch):
+    breaker = CircuitBreaker("snowflake", failure_threshold=2)
+    pool = SnowflakeConnectionPool(min_size=0, max_size=1, checkout_timeout=0.05)
+    monkeypatch.setattr(snowflake_connection, "breaker", breaker)
+    monkeypatch.setattr(snowflake_connection, "_pool", pool)
+    held = pool.acquire()
+    try:
+        for _ in range(3):
+            with pytest.raises(PoolTimeoutError):
+                snowflake_connection.execute_snowflake_query("SELECT 1")
+    finally:
+        pool.release(held)
+        assert breaker.state == CLOSED
+    assert snowflake_connection.execute_snowflake_query("SELECT 1")
+    pool.close()
+
+
+def test_open_circuit_flags_degraded_responses(client, warehouse, monkeypatch):
+    monkeypatch.setattr(snowflake_connection, "breaker", open_breaker(reset_timeout=60))
+    started = time.perf_counter()
+    response = client.get("/api/map/tornado-path")
+    assert response.status_code == 200
+    assert time.perf_counter() - started < 1.0
+    assert response.headers["x-data-degraded"].split(",") == ["circuit-open", "sample-data"]
+    assert warehouse.connects == 0
+
+
+def test_healthy_responses_are_not_flagged(client, warehouse):
+    response = client.get("/api/map/tornado-path")
+    assert response.status_code == 200
+    assert "x-data-degraded" not in response.headers
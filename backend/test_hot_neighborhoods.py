@@ -0,0 +1,74 @@
+"""
+Hot neighborhood summary: concurrent loads must not count the same tests twice.
+
+Run with: python -m pytest test_hot_neighborhoods.py
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from hot_neighborhoods import DELTA_QUERY, NeighborhoodSummary
+
+
+@pytest.fixture
+def summary(main_module, warehouse, monkeypatch):
+    summary = NeighborhoodSummary()
+    monkeypatch.setattr(main_module, "neighborhood_summary", summary)
+    monkeypatch.setattr(main_module, "_neighborhood_summary_refresh", {"refreshed_at": None, "task": None})
+    return summary
+
+
+def expected_tests(warehouse) -> int:
+    return sum(int(r["TEST_COUNT"]) for r in warehouse.execute_snowflake_query(DELTA_QUERY, {"after_id": 0}))
+
+
+def test_concurrent_cold_requests_load_once(main_module, warehouse, summary):
+    warehouse.query_latency = 0.2
+
+    async def burst():
+        transport = httpx.ASGITransport(app=main_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[
+                client.get("/api/radon/hot-neighborhoods", params={"minTests": 0}) for _ in range(5)
+            ])
+
+    responses = asyncio.run(burst())
+    assert all(r.status_code == 200 for r in responses)
+    assert warehouse.queries == 1
+    total = sum(r["test_count"] for r in responses[0].json())
+    assert total == expected_tests(warehouse)
+    assert all(r.json() == responses[0].json() for r in responses)
+
+
+def test_stale_delta_is_discarded():
+    summary = NeighborhoodSummary()
+    row = {"neighborhood": "A", "zip_code": "63113", "ward": 1, "test_count": 2, "result_sum": 9.0,
+           "high_risk_count": 1, "max_object_id": 10}
+    assert summary.merge([row], after=0)
+    # A second delta queried from watermark 0 overlaps the first one
+    assert not summary.merge([row], after=0)
+    assert summary.query(0)[0]["test_count"] == 2
+    assert summary.merge([{**row, "max_object_id": 12}], after=10)
+    assert summary.query(0)[0]["test_count"] == 4
+
+
+def test_memo_holds_one_list_per_sort_order():
+    summary = NeighborhoodSummary()
+    summary.merge([
+        {"neighborhood": name, "zip_code": "63113", "ward": 1, "test_count": count, "result_sum": count * level,
+         "high_risk_count": 0, "max_object_id": i}
+        for i, (name, count, level) in enumerate([("A", 10, 2.0), ("B", 3, 8.0), ("C", 6, 5.0)], start=1)
+    ])
+    for min_tests in range(20):
+        summary.query(min_tests, "average")
+    assert len(summary._memo) == 1
+    assert [r["neighborhood"] for r in summary.query(5, "average")] == ["C", "A"]
+    assert [r["neighborhood"] for r in summary.query(0, "count")] == ["A", "C", "B"]
+    assert summary.memo_misses == 2
+
+
+def test_unknown_sort_order_is_rejected(client):
+    response = client.get("/api/radon/hot-neighborhoods", params={"sortBy": "bogus"})
+    assert response.status_code == 422
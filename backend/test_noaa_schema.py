@@ -0,0 +1,87 @@
+"""
+NOAA column-layout discovery: an outage must never be read as a wrong layout.
+
+Run with: python -m pytest test_noaa_schema.py
+"""
+
+import pytest
+
+from circuit import CircuitOpenError
+from noaa_schema import NOAA_TABLE, SchemaCache, probe_mapping, query_tornado_rows, resolve_mapping
+from snowflake_connection import SnowflakeUnavailableError
+
+SEGMENT = {"BEGIN_LAT": 38.6, "BEGIN_LON": -90.2, "END_LAT": 38.7, "END_LON": -90.1,
+           "BEGIN_DATE": "2024-05-16", "EVENT_TYPE": "TORNADO"}
+
+
+class FakeWarehouse:
+    """execute() stand-in with slat/slon columns and no INFORMATION_SCHEMA access."""
+
+    def __init__(self):
+        self.error = None
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if self.error is not None:
+            raise self.error
+        if "INFORMATION_SCHEMA" in query:
+            raise Exception("SQL access control error: insufficient privileges")
+        if "slat" not in query:
+            raise Exception("SQL compilation error: invalid identifier 'BEGIN_LAT'")
+        return [SEGMENT]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SchemaCache(str(tmp_path / "noaa_schema.json"))
+
+
+def test_probe_falls_back_to_trying_layouts(cache):
+    fake = FakeWarehouse()
+    assert query_tornado_rows(fake.execute, cache) == [SEGMENT]
+    assert cache.get(NOAA_TABLE) == "slat_slon"
+    assert SchemaCache(cache.path).get(NOAA_TABLE) == "slat_slon"
+
+
+@pytest.mark.parametrize("error", [
+    SnowflakeUnavailableError("Unable to connect to Snowflake"),
+    ConnectionResetError("connection reset"),
+    CircuitOpenError("snowflake circuit is open"),
+])
+def test_outage_keeps_remembered_layout(cache, error):
+    cache.set(NOAA_TABLE, "slat_slon")
+    fake = FakeWarehouse()
+    fake.error = error
+    with pytest.raises(type(error)):
+        query_tornado_rows(fake.execute, cache)
+    assert cache.get(NOAA_TABLE) == "slat_slon"
+    # No re-probe against a warehouse that is down
+    assert len(fake.queries) == 1
+
+
+def test_query_error_forgets_layout_and_reprobes(cache):
+    cache.set(NOAA_TABLE, "begin_end")
+    fake = FakeWarehouse()
+    assert query_tornado_rows(fake.execute, cache) == [SEGMENT]
+    assert cache.get(NOAA_TABLE) == "slat_slon"
+
+
+@pytest.mark.parametrize("error", [
+    SnowflakeUnavailableError("Unable to connect to Snowflake"),
+    CircuitOpenError("snowflake circuit is open"),
+])
+def test_probe_during_outage_raises(cache, error):
+    fake = FakeWarehouse()
+    fake.error = error
+    with pytest.raises(type(error)):
+        probe_mapping(fake.execute)
+    # The metadata lookup failed; no layouts were tried
+    assert len(fake.queries) == 1
+    assert cache.get(NOAA_TABLE) is None
+
+
+def test_unconfirmed_layout_is_not_remembered(cache):
+    # What execute_snowflake_query returns while Snowflake is disabled
+    assert resolve_mapping(lambda query, params=None: [], cache) == "begin_end"
+    assert cache.get(NOAA_TABLE) is None
@@ -0,0 +1,168 @@
+"""
+Snowflake connection pool: reuse, checkout timeouts, and recycling of stale,
+expired and broken connections, and the health probe's own connection.
+
+Run with: python -m pytest test_pool.py
+"""
+
+import threading
+import time
+
+import pytest
+
+import snowflake_connection
+from snowflake_connection import PoolTimeoutError, SnowflakeConnectionPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+        self.pings = 0
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    description = [("ONE",)]
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query):
+        self.conn.pings += 1
+        if not self.conn.healthy:
+            raise OSError("connection reset")
+
+    def fetchone(self):
+        return (1,)
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Connections opened through the pool, in order."""
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(snowflake_connection, "get_snowflake_connection", connect)
+    return opened
+
+
+def test_connections_are_reused(opened):
+    pool = SnowflakeConnectionPool(min_size=1, max_size=2)
+    pool.fill()
+    assert (pool.size, pool.idle_count) == (1, 1)
+    for _ in range(3):
+        with pool.connection() as conn:
+            assert conn is opened[0]
+    assert len(opened) == 1
+
+    with pool.connection() as first, pool.connection() as second:
+        assert first is not second
+    assert (pool.size, pool.idle_count) == (2, 2)
+    pool.close()
+    assert all(conn.closed for conn in opened)
+
+
+def test_checkout_times_out_when_exhausted(opened):
+    pool = SnowflakeConnectionPool(min_size=0, max_size=1, checkout_timeout=0.05)
+    held = pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.05
+
+    # A waiting checkout gets the connection as soon as it is released
+    threading.Timer(0.02, pool.release, args=(held,)).start()
+    pool.checkout_timeout = 1.0
+    assert pool.acquire() is held
+    assert len(opened) == 1
+
+
+def test_expired_connections_are_recycled(opened):
+    pool = SnowflakeConnectionPool(min_size=0, max_size=1, max_lifetime=0.05)
+    with pool.connection():
+        pass
+    time.sleep(0.06)
+    with pool.connection() as conn:
+        assert conn is opened[1]
+    assert opened[0].closed
+    assert pool.size == 1
+
+
+def test_broken_idle_connections_are_recycled(opened):
+    pool = SnowflakeConnectionPool(min_size=0, max_size=1, health_check_after=0.0)
+    with pool.connection():
+        pass
+    opened[0].healthy = False
+    with pool.connection() as conn:
+        assert conn is opened[1]
+    assert opened[0].pings == 1 and opened[0].closed
+
+
+def test_idle_connections_above_min_size_are_closed(opened):
+    pool = SnowflakeConnectionPool(min_size=1, max_size=3, max_idle=0.05)
+    with pool.connection(), pool.connection(), pool.connection():
+        pass
+    assert pool.size == 3
+    time.sleep(0.06)
+    with pool.connection():
+        assert pool.size == 1
+    assert sum(conn.closed for conn in opened) == 2
+
+
+def test_connection_is_discarded_if_the_block_raises(opened):
+    pool = SnowflakeConnectionPool(min_size=0, max_size=1)
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            raise RuntimeError("query failed mid-stream")
+    assert opened[0].closed
+    assert (pool.size, pool.idle_count) == (0, 0)
+
+
+def test_queries_share_a_pool_without_warm_up(opened, monkeypatch):
+    monkeypatch.setattr(snowflake_connection, "USE_SNOWFLAKE", True, raising=False)
+    monkeypatch.setattr(snowflake_connection, "breaker", snowflake_connection.CircuitBreaker("test"))
+    monkeypatch.setattr(snowflake_connection, "_pool", None)
+    try:
+        for _ in range(2):
+            assert snowflake_connection.execute_snowflake_query("SELECT 1") == [{"ONE": 1}]
+        assert len(opened) == 1 and not opened[0].closed
+        assert snowflake_connection.get_pool().size == 1
+    finally:
+        snowflake_connection.close_pool()
+
+
+def test_health_probe_does_not_wait_for_a_saturated_pool(opened, monkeypatch):
+    monkeypatch.setattr(snowflake_connection, "USE_SNOWFLAKE", True, raising=False)
+    monkeypatch.setattr(snowflake_connection, "breaker", snowflake_connection.CircuitBreaker("test"))
+    pool = SnowflakeConnectionPool(min_size=0, max_size=1, checkout_timeout=0.05)
+    monkeypatch.setattr(snowflake_connection, "_pool", pool)
+    monkeypatch.setattr(snowflake_connection, "_probe_pool", None)
+    try:
+        held = pool.acquire()
+        with pytest.raises(PoolTimeoutError):
+            snowflake_connection.execute_snowflake_query("SELECT 1")
+        assert snowflake_connection.ping_snowflake()
+        assert snowflake_connection.ping_snowflake()
+        # The probe reuses its own connection, separate from the held one
+        assert len(opened) == 2 and opened[1] is not held
+        pool.release(held)
+    finally:
+        snowflake_connection.close_pool()
@@ -0,0 +1,103 @@
+"""
+Local snapshots: refreshes are serialized, resyncs drop deleted rows, and the
+paged and streamed map routes read the snapshot instead of Snowflake.
+
+Run with: python -m pytest test_snapshot.py
+"""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from radon_query import encode_cursor
+from snapshot import ColumnSnapshot, refresh_radon_snapshot, resync_due
+
+
+@pytest.fixture
+def snapshots(main_module, warehouse, tmp_path, monkeypatch):
+    monkeypatch.setattr(main_module, "radon_snapshot", ColumnSnapshot(str(tmp_path / "radon"), key="object_id"))
+    monkeypatch.setattr(main_module, "tornado_snapshot", ColumnSnapshot(str(tmp_path / "tornado")))
+    return main_module
+
+
+def all_pages(client, **params):
+    results, cursor = [], None
+    while True:
+        page = client.get("/api/map/radon-results/page", params={**params, "cursor": cursor, "limit": 700}).json()
+        results.extend(page["results"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return results
+
+
+def test_concurrent_refreshes_run_once(snapshots, warehouse):
+    async def both():
+        return await asyncio.gather(snapshots.refresh_snapshots(), snapshots.refresh_snapshots())
+
+    executions = snapshots._snapshot_refreshes.executions
+    first, second = asyncio.run(both())
+    assert first == second
+    assert first["radon_rows_changed"] > 0
+    assert snapshots._snapshot_refreshes.executions == executions + 1
+    assert snapshots.radon_snapshot.stats()["version"] == 1
+
+
+def test_resync_drops_deleted_rows(tmp_path):
+    snapshot = ColumnSnapshot(str(tmp_path / "radon"), key="object_id")
+    table = {"object_id": [1, 2, 3], "x_coord": [0.0] * 3, "y_coord": [0.0] * 3, "final_result": [1.0, 5.0, 2.0],
+             "valid_test": ["Y"] * 3, "city": ["St. Louis"] * 3, "zip_code": ["63113"] * 3}
+
+    def fetch_batches(query, params, batch_size):
+        after = params.get("after")
+        rows = [i for i, object_id in enumerate(table["object_id"]) if after is None or object_id > after]
+        if rows:
+            batch = {name: [values[i] for i in rows] for name, values in table.items()}
+            yield {**batch, "change_value": batch["object_id"]}
+
+    def build_query(change_column, after=None):
+        return "", {"after": after}
+
+    assert refresh_radon_snapshot(snapshot, fetch_batches, build_query) == 3
+    assert not resync_due(snapshot)
+    # Object 2 is deleted: an incremental refresh has nothing to fetch
+    table = {name: [v for i, v in enumerate(values) if i != 1] for name, values in table.items()}
+    assert refresh_radon_snapshot(snapshot, fetch_batches, build_query) == 0
+    assert snapshot.columns()["object_id"].tolist() == [1, 2, 3]
+
+    snapshot.meta["resynced_at"] = 0
+    assert resync_due(snapshot)
+    assert refresh_radon_snapshot(snapshot, fetch_batches, build_query) == 2
+    assert snapshot.columns()["object_id"].tolist() == [1, 3]
+    assert not resync_due(snapshot)
+
+
+def test_page_and_stream_read_the_snapshot(snapshots, client, warehouse):
+    from_warehouse = all_pages(client)
+    assert len(from_warehouse) > 1000
+    assert client.post("/api/admin/snapshots/refresh").status_code == 200
+    queries = warehouse.queries
+
+    from_snapshot = all_pages(client)
+    assert [(r["latitude"], r["longitude"]) for r in from_snapshot] == \
+        [(r["latitude"], r["longitude"]) for r in from_warehouse]
+
+    response = client.get("/api/map/radon-results/stream", params={"batch_size": 1000})
+    streamed = [json.loads(line) for line in response.text.splitlines()]
+    assert "error" not in streamed[0]
+    assert sorted(r["latitude"] for r in streamed) == sorted(r["latitude"] for r in from_warehouse)
+    assert warehouse.queries == queries
+
+
+def test_snapshot_page_rejects_non_numeric_cursor(snapshots, client):
+    client.post("/api/admin/snapshots/refresh")
+    response = client.get("/api/map/radon-results/page", params={"cursor": encode_cursor("abc")})
+    assert response.status_code == 400
+
+
+def test_resync_state_survives_restart(tmp_path):
+    snapshot = ColumnSnapshot(str(tmp_path / "radon"), key="object_id")
+    snapshot.replace({"object_id": np.array([1])}, watermark=1, resynced=True)
+    snapshot.upsert({"object_id": np.array([2])}, watermark=2)
+    assert not resync_due(ColumnSnapshot(str(tmp_path / "radon"), key="object_id"))
@@ -0,0 +1,121 @@
+"""
+Startup-time budget.
+
+Importing the app must stay cheap (no credential checks, no pyarrow, pyproj
+or Snowflake connector at import time), the app must serve requests (with
+/api/ready answering 503) while it warms up in the background, and it must
+report ready within the budget when running on sample data.
+
+Run with: python -m pytest test_startup.py  (or python test_startup.py)
+Budgets can be adjusted with STARTUP_IMPORT_BUDGET_SECONDS and
+STARTUP_READY_BUDGET_SECONDS.
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+IMPORT_BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "3.0"))
+READY_BUDGET_SECONDS = float(os.getenv("STARTUP_READY_BUDGET_SECONDS", "5.0"))
+LAZY_MODULES = ["pyarrow", "pyproj", "snowflake.connector"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+READY_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import main
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    response = client.get("/api/ready")
+    while response.status_code == 503 and time.perf_counter() - started < 30:
+        time.sleep(0.01)
+        response = client.get("/api/ready")
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "status": response.status_code, "state": response.json()}))
+"""
+
+
+def _run(script: str) -> dict:
+    """Run script in a fresh interpreter, in an empty data directory, with Snowflake disabled."""
+    env = {k: v for k, v in os.environ.items() if not k.startswith("SNOWFLAKE_")}
+    env.update({"USE_SNOWFLAKE": "false", "PYTHONPATH": BACKEND_DIR, "SNAPSHOT_REFRESH_SECONDS": "0"})
+    with tempfile.TemporaryDirectory() as cwd:
+        output = subprocess.run(
+            [sys.executable, "-c", script], cwd=cwd, env=env,
+            capture_output=True, text=True, check=True, timeout=60,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_is_fast_and_lazy():
+    result = _run(IMPORT_SCRIPT)
+    assert result["loaded"] == [], f"Heavy modules loaded at import time: {result['loaded']}"
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS, (
+        f"import main took {result['seconds']:.2f}s (budget {IMPORT_BUDGET_SECONDS}s)"
+    )
+
+
+def test_ready_after_warm_up():
+    result = _run(READY_SCRIPT)
+    assert result["status"] == 200, result
+    assert result["state"]["ready"] is True
+    assert all(step["error"] is None for step in result["state"]["steps"].values()), result["state"]
+    assert result["seconds"] < READY_BUDGET_SECONDS, (
+        f"Startup to ready took {result['seconds']:.2f}s (budget {READY_BUDGET_SECONDS}s)"
+    )
+
+
+def test_not_ready_until_warm_up_finishes(main_module, monkeypatch):
+    release = threading.Event()
+
+    async def slow_step():
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+
+    monkeypatch.setitem(main_module.WARMUP_STEPS, "slow", slow_step)
+    monkeypatch.setattr(main_module, "STARTUP_WARMUP", ["slow"])
+    with TestClient(main_module.app) as client:
+        response = client.get("/api/ready")
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+        # Other routes are served while warming up
+        assert client.get("/api/status").status_code == 200
+
+        release.set()
+        deadline = time.perf_counter() + 5
+        while response.status_code == 503 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+            response = client.get("/api/ready")
+        assert response.status_code == 200
+        assert response.json()["steps"]["slow"]["error"] is None
+
+
+def test_shutdown_stops_the_warehouse_executor(main_module):
+    with TestClient(main_module.app):
+        executor = main_module.warehouse._executor
+    assert executor._shutdown
+    # A restarted app gets a working executor
+    with TestClient(main_module.app) as client:
+        assert client.portal.call(main_module.warehouse.run, sum, [1, 2]) == 3
+        assert main_module.warehouse._executor is not executor
+
+
+if __name__ == "__main__":
+    for name, check in [("import", test_import_is_fast_and_lazy), ("ready", test_ready_after_warm_up)]:
+        check()
+        print(f"{name}: ok")
@@ -0,0 +1,63 @@
+"""
+SQLite store: ids come from a persisted sequence and are never reused, and
+the legacy JSON files are imported once.
+
+Run with: python -m pytest test_store.py
+"""
+
+import json
+
+import pytest
+
+from storage import Store
+
+
+def address(text: str) -> dict:
+    return {"address": text, "neighborhood_id": None, "status": "not_visited", "notes": None,
+            "visited_at": None, "created_at": "2024-05-16T00:00:00"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = Store(str(tmp_path / "radon.db"))
+    yield store
+    store.close()
+
+
+def test_ids_are_not_reused_after_delete(store):
+    ids = [store.insert_address(address(f"{n} Main St"))["id"] for n in range(3)]
+    assert ids == ["1", "2", "3"]
+    assert store.delete_address("3")
+    assert store.insert_address(address("4 Main St"))["id"] == "4"
+
+    assert store.delete_address("2")
+    inserted, _ = store.insert_addresses([address("5 Main St"), address("6 Main St")])
+    assert [r["id"] for r in inserted] == ["5", "6"]
+
+
+def test_id_sequence_survives_reopening(store):
+    store.insert_address(address("1 Main St"))
+    store.insert_address(address("2 Main St"))
+    store.delete_address("2")
+    store.close()
+
+    reopened = Store(store.path)
+    assert reopened.insert_address(address("3 Main St"))["id"] == "3"
+    reopened.close()
+
+
+def test_json_import_runs_once_and_advances_the_sequence(tmp_path):
+    neighborhoods_file = tmp_path / "neighborhoods.json"
+    addresses_file = tmp_path / "addresses.json"
+    neighborhoods_file.write_text(json.dumps([]))
+    addresses_file.write_text(json.dumps([{**address("7 Elm St"), "id": 7}, {**address("9 Elm St"), "id": "9"}]))
+
+    store = Store(str(tmp_path / "radon.db"))
+    store.import_json(str(neighborhoods_file), str(addresses_file))
+    assert [a["id"] for a in store.list_addresses()] == ["7", "9"]
+    assert store.insert_address(address("10 Elm St"))["id"] == "10"
+
+    store.delete_address("7")
+    store.import_json(str(neighborhoods_file), str(addresses_file))
+    assert [a["id"] for a in store.list_addresses()] == ["9", "10"]
+    store.close()
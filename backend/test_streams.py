@@ -0,0 +1,39 @@
+"""
+Paged and streamed radon results: malformed cursors are a 400, and warehouse
+streams are capped so they can't take every pooled connection.
+
+Run with: python -m pytest test_streams.py
+"""
+
+import json
+
+from radon_query import encode_cursor
+
+
+def test_sample_page_rejects_non_numeric_cursor(client):
+    response = client.get("/api/map/radon-results/page", params={"cursor": encode_cursor("abc")})
+    assert response.status_code == 400
+    assert client.get("/api/map/radon-results/page", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_stream_slot_is_released_after_the_response(main_module, client, warehouse):
+    response = client.get("/api/map/radon-results/stream", params={"batch_size": 1000})
+    assert response.status_code == 200
+    assert "error" not in json.loads(response.text.splitlines()[0])
+    assert main_module._stream_slots["open"] == 0
+
+
+def test_streams_beyond_the_cap_are_rejected(main_module, client, warehouse, monkeypatch):
+    monkeypatch.setattr(main_module, "MAX_CONCURRENT_STREAMS", 2)
+    monkeypatch.setitem(main_module._stream_slots, "open", 2)
+    connects = warehouse.connects
+    response = client.get("/api/map/radon-results/stream")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+    assert warehouse.connects == connects
+    assert main_module._stream_slots["open"] == 2
+
+    monkeypatch.setitem(main_module._stream_slots, "open", 1)
+    assert client.get("/api/map/radon-results/stream").status_code == 200
+    assert main_module._stream_slots["open"] == 1
+
@@ -0,0 +1,24 @@
+"""
+Tile pyramid: the warm-up precomputes every aggregate level, and a restart
+with unchanged data reloads them from disk.
+
+Run with: python -m pytest test_tiles.py
+"""
+
+import asyncio
+import os
+
+from tiles import FULL_RESOLUTION_ZOOM, TilePyramid
+
+
+def test_warm_up_builds_every_aggregate_level(main_module, monkeypatch):
+    monkeypatch.setattr(main_module, "_tile_pyramid", None)
+    asyncio.run(main_module._warm_tiles())
+    pyramid = main_module._tile_pyramid[1]
+    assert sorted(pyramid._levels) == list(range(FULL_RESOLUTION_ZOOM))
+    assert all(os.path.exists(pyramid._level_path(z)) for z in range(FULL_RESOLUTION_ZOOM))
+
+    reloaded = TilePyramid(pyramid.latitudes, pyramid.longitudes, pyramid.results,
+                           cache_dir=main_module.TILE_CACHE_DIR)
+    level = reloaded.level(10)
+    assert (level["count"] == pyramid.level(10)["count"]).all()
@@ -0,0 +1,190 @@
+"""
+Zoom-aware aggregate tiles for radon test results.
+
+Tiles use the standard web-mercator z/x/y scheme (256px tiles). Below
+FULL_RESOLUTION_ZOOM each tile is split into square bins of BIN_PIXELS, and
+each non-empty bin is served as one aggregate: test count, mean result and
+share of results at or above the 4.0 pCi/L action level. At deeper zooms the
+individual points in the tile are served instead.
+
+Each zoom level of the pyramid is computed for the whole dataset in one
+vectorized pass and saved as a .npz file under a directory named after a
+fingerprint of the dataset, so a restart with unchanged data reloads the
+pyramid from disk instead of recomputing it.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import shutil
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = 256
+BIN_PIXELS = 32
+BINS_PER_TILE = TILE_SIZE // BIN_PIXELS
+FULL_RESOLUTION_ZOOM = int(os.getenv("TILES_FULL_RESOLUTION_ZOOM", "16"))
+MAX_ZOOM = 22
+ACTION_LEVEL = 4.0
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def lonlat_to_world(lat: np.ndarray, lon: np.ndarray):
+    """Normalized web-mercator coordinates in [0, 1), origin at the top-left."""
+    lat = np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    x = (np.asarray(lon) + 180.0) / 360.0
+    lat_rad = np.radians(lat)
+    y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / math.pi) / 2.0
+    return np.clip(x, 0.0, np.nextafter(1.0, 0)), np.clip(y, 0.0, np.nextafter(1.0, 0))
+
+
+def _tile_key(tx, ty):
+    return (np.asarray(tx, dtype=np.int64) << 32) | np.asarray(ty, dtype=np.int64)
+
+
+class TilePyramid:
+    """Per-zoom bin aggregates over one radon dataset, persisted under cache_dir."""
+
+    def __init__(self, latitudes, longitudes, results, records: Optional[List[Dict]] = None,
+                 cache_dir: Optional[str] = None):
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.results = np.asarray(results, dtype=np.float64)
+        self.records = records
+        self._wx, self._wy = lonlat_to_world(self.latitudes, self.longitudes)
+        self.fingerprint = self._fingerprint()
+        self.cache_dir = os.path.join(cache_dir, self.fingerprint) if cache_dir else None
+        if cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._remove_stale(cache_dir)
+        self._levels: Dict[int, Dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._point_order = None
+        self._point_keys = None
+
+    def _fingerprint(self) -> str:
+        digest = hashlib.sha1()
+        for array in (self.latitudes, self.longitudes, self.results):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return f"{len(self.latitudes)}-{digest.hexdigest()[:16]}"
+
+    def _remove_stale(self, cache_dir: str):
+        """Delete pyramids built for older versions of the dataset."""
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if name != self.fingerprint and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _level_path(self, z: int) -> Optional[str]:
+        return os.path.join(self.cache_dir, f"z{z}.npz") if self.cache_dir else None
+
+    def _build_level(self, z: int) -> Dict[str, np.ndarray]:
+        scale = (TILE_SIZE // BIN_PIXELS) * (1 << z)
+        bx = (self._wx * scale).astype(np.int64)
+        by = (self._wy * scale).astype(np.int64)
+        tile_keys = _tile_key(bx // BINS_PER_TILE, by // BINS_PER_TILE)
+        bin_ids = bx * scale + by
+        # Sort bins by tile first so a tile's bins form one contiguous run
+        order = np.lexsort((bin_ids, tile_keys))
+        sorted_bins = bin_ids[order]
+        if not len(sorted_bins):
+            return {name: np.empty(0) for name in ("tile_key", "count", "latitude", "longitude", "mean", "above")}
+        starts = np.flatnonzero(np.concatenate(([True], sorted_bins[1:] != sorted_bins[:-1])))
+        count = np.diff(np.append(starts, len(sorted_bins)))
+        res = self.results[order]
+        return {
+            "tile_key": tile_keys[order][starts],
+            "count": count,
+            "latitude": np.add.reduceat(self.latitudes[order], starts) / count,
+            "longitude": np.add.reduceat(self.longitudes[order], starts) / count,
+            "mean": np.add.reduceat(res, starts) / count,
+            "above": np.add.reduceat((res >= ACTION_LEVEL).astype(np.float64), starts),
+        }
+
+    def level(self, z: int) -> Dict[str, np.ndarray]:
+        """Aggregates for zoom z, loaded from disk or computed and saved on first use."""
+        level = self._levels.get(z)
+        if level is not None:
+            return level
+        with self._lock:
+            level = self._levels.get(z)
+            if level is not None:
+                return level
+            path = self._level_path(z)
+            if path and os.path.exists(path):
+                try:
+                    with np.load(path) as data:
+                        level = {name: data[name] for name in data.files}
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Rebuilding unreadable tile level {path}: {e}")
+            if level is None:
+                level = self._build_level(z)
+                if path:
+                    tmp_path = path + ".tmp.npz"
+                    np.savez(tmp_path, **level)
+                    os.replace(tmp_path, path)
+            self._levels[z] = level
+            return level
+
+    def build(self, max_zoom: int = FULL_RESOLUTION_ZOOM - 1):
+        """Precompute every aggregate level up to max_zoom."""
+        for z in range(max_zoom + 1):
+            self.level(z)
+
+    def _points_in_tile(self, z: int, x: int, y: int) -> np.ndarray:
+        with self._lock:
+            if self._point_order is None:
+                scale = 1 << FULL_RESOLUTION_ZOOM
+                keys = _tile_key((self._wx * scale).astype(np.int64), (self._wy * scale).astype(np.int64))
+                order = np.argsort(keys, kind="stable")
+                self._point_keys = keys[order]
+                self._point_order = order
+        # Look up the enclosing tile at FULL_RESOLUTION_ZOOM, then narrow to (x, y)
+        shift = z - FULL_RESOLUTION_ZOOM
+        key = _tile_key(x >> shift, y >> shift)
+        lo = np.searchsorted(self._point_keys, key, side="left")
+        hi = np.searchsorted(self._point_keys, key, side="right")
+        candidates = self._point_order[lo:hi]
+        scale = 1 << z
+        inside = ((self._wx[candidates] * scale).astype(np.int64) == x) & \
+            ((self._wy[candidates] * scale).astype(np.int64) == y)
+        return np.sort(candidates[inside])
+
+    def tile(self, z: int, x: int, y: int) -> Dict:
+        """Aggregated bins for tile z/x/y, or its individual points at full-resolution zooms."""
+        if z >= FULL_RESOLUTION_ZOOM:
+            indices = self._points_in_tile(z, x, y)
+            if self.records is not None:
+                points = [self.records[i] for i in indices.tolist()]
+            else:
+                points = [
+                    {"latitude": la, "longitude": lo, "final_result": r}
+                    for la, lo, r in zip(self.latitudes[indices].tolist(), self.longitudes[indices].tolist(),
+                                         self.results[indices].tolist())
+                ]
+            return {"z": z, "x": x, "y": y, "type": "points", "points": points}
+
+        level = self.level(z)
+        key = _tile_key(x, y)
+        start = np.searchsorted(level["tile_key"], key, side="left")
+        end = np.searchsorted(level["tile_key"], key, side="right")
+        bins = [
+            {
+                "latitude": lat,
+                "longitude": lon,
+                "count": count,
+                "mean": round(mean, 3),
+                "share_above_action_level": round(above / count, 4),
+            }
+            for lat, lon, count, mean, above in zip(
+                level["latitude"][start:end].tolist(), level["longitude"][start:end].tolist(),
+                level["count"][start:end].astype(np.int64).tolist(),
+                level["mean"][start:end].tolist(), level["above"][start:end].tolist(),
+            )
+        ]
+        return {"z": z, "x": x, "y": y, "type": "bins", "bins": bins}
@@ -0,0 +1,126 @@
+"""
+Bounded thread pool for blocking Snowflake calls.
+
+The Snowflake connector is synchronous. Calling it directly from an async
+endpoint blocks the event loop, so a slow warehouse query would stall every
+other request on the worker. Endpoints instead await WarehouseExecutor.run,
+which runs the call on a dedicated pool with a fixed number of threads and a
+bounded queue, and keeps counters for how deep that queue gets.
+
+run_shared additionally coalesces identical concurrent calls (same function
+and key, e.g. singleflight.query_key of the SQL and its parameters), so a
+burst of users opening the map costs one warehouse query, not one each.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable
+
+from singleflight import SingleFlight
+
+
+class WarehouseBusyError(Exception):
+    """Raised when the warehouse queue is full and a call is rejected."""
+
+
+class WarehouseExecutor:
+    """Runs blocking warehouse calls on a bounded thread pool."""
+
+    def __init__(self, max_workers: int = 5, max_queue: int = 100):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warehouse")
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_queue_wait = 0.0
+        self.total_run_time = 0.0
+        self._flights = SingleFlight("warehouse")
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the warehouse pool and await its result."""
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise WarehouseBusyError(
+                    f"Warehouse queue is full ({self.queued} calls waiting)"
+                )
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        submitted = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context into the thread so per-request profiling sees the call
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, context.run, functools.partial(self._call, submitted, fn, *args, **kwargs)
+        )
+
+    async def run_shared(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Like run, but callers passing the same fn and key while a call is in flight share its result."""
+        return await self._flights.do(
+            (fn.__module__, fn.__qualname__, key), lambda: self.run(fn, *args, **kwargs)
+        )
+
+    def _call(self, submitted: float, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.total_queue_wait += started - submitted
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        else:
+            with self._lock:
+                self.completed += 1
+            return result
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.total_run_time += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_queue_wait_ms": 1000 * self.total_queue_wait / finished if finished else 0.0,
+                "avg_run_ms": 1000 * self.total_run_time / finished if finished else 0.0,
+                "coalesced": self._flights.coalesced,
+                "in_flight_shared": len(self._flights),
+            }
+
+    def shutdown(self):
+        """Cancel queued calls and stop the worker threads once running calls finish.
+
+        A fresh pool replaces the old one, so the executor can serve an app started again in the same process.
+        """
+        executor, self._executor = self._executor, ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="warehouse"
+        )
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+warehouse = WarehouseExecutor(
+    max_workers=int(os.getenv("WAREHOUSE_MAX_WORKERS", os.getenv("SNOWFLAKE_POOL_MAX_SIZE", "5"))),
+    max_queue=int(os.getenv("WAREHOUSE_MAX_QUEUE", "100")),
+)
@@ -14,6 +14,7 @@ export interface Neighborhood {
   risk_level: 'low' | 'medium' | 'high'
   messaging_template: string
   created_at: string
+  updated_at?: string
 }
 
 export interface Address {
@@ -24,6 +25,7 @@ export interface Address {
   notes?: string
   visited_at?: string
   created_at: string
+  updated_at?: string
 }
 
 export interface NeighborhoodCreate {
@@ -38,8 +40,19 @@ export interface AddressCreate {
   neighborhood_id?: string
 }
 
+// Records changed and ids deleted since a collection version; reset means
+// the client's version is unknown to the server and changed holds everything
+export interface CollectionDelta<T> {
+  version: number
+  changed: T[]
+  deleted: string[]
+  reset: boolean
+}
+
 export const neighborhoodsApi = {
   getAll: () => api.get<Neighborhood[]>('/neighborhoods').then(res => res.data),
+  getChanges: (since: number) =>
+    api.get<CollectionDelta<Neighborhood>>('/neighborhoods', { params: { since } }).then(res => res.data),
   create: (data: NeighborhoodCreate) => 
     api.post<Neighborhood>('/neighborhoods', data).then(res => res.data),
   update: (id: string, data: NeighborhoodCreate) =>
@@ -48,17 +61,65 @@ export const neighborhoodsApi = {
     api.delete(`/neighborhoods/${id}`).then(res => res.data),
 }
 
+export interface AddressImport {
+  id: string
+  format: 'csv' | 'ndjson'
+  state: 'running' | 'completed' | 'failed'
+  started_at: string
+  finished_at?: string
+  rows: number
+  imported: number
+  duplicates: number
+  errors: number
+  row_errors?: { row: number | null; error: string }[]
+}
+
+export interface AddressUpdate extends Partial<Omit<Address, 'id' | 'created_at'>> {
+  id: string
+}
+
+export interface AddressUpdateResult {
+  id: string
+  ok: boolean
+  address?: Address
+  error?: string
+}
+
+export interface AddressCounts {
+  total: number
+  by_status: Record<string, number>
+  by_neighborhood: Record<string, number>
+  groups: { neighborhood_id: string | null; status: string; count: number }[]
+}
+
 export const addressesApi = {
-  getAll: (neighborhoodId?: string) => {
-    const params = neighborhoodId ? { neighborhood_id: neighborhoodId } : {}
+  getAll: (neighborhoodId?: string, status?: Address['status']) => {
+    const params = { neighborhood_id: neighborhoodId || undefined, status: status || undefined }
     return api.get<Address[]>('/addresses', { params }).then(res => res.data)
   },
+  getCounts: (neighborhoodId?: string, status?: Address['status']) => {
+    const params = { neighborhood_id: neighborhoodId || undefined, status: status || undefined }
+    return api.get<AddressCounts>('/addresses/counts', { params }).then(res => res.data)
+  },
+  getChanges: (since: number, neighborhoodId?: string, status?: Address['status']) => {
+    const params = { since, neighborhood_id: neighborhoodId || undefined, status: status || undefined }
+    return api.get<CollectionDelta<Address>>('/addresses', { params }).then(res => res.data)
+  },
   create: (data: AddressCreate) =>
     api.post<Address>('/addresses', data).then(res => res.data),
   update: (id: string, data: Partial<Address>) =>
     api.put<Address>(`/addresses/${id}`, data).then(res => res.data),
+  updateMany: (updates: AddressUpdate[]) =>
+    api.patch<AddressUpdateResult[]>('/addresses', updates).then(res => res.data),
   delete: (id: string) =>
     api.delete(`/addresses/${id}`).then(res => res.data),
+  import: (file: File | Blob, format?: 'csv' | 'ndjson') =>
+    api.post<AddressImport>('/addresses/import', file, {
+      params: format ? { format } : {},
+      headers: { 'Content-Type': format === 'ndjson' ? 'application/x-ndjson' : 'text/csv' },
+    }).then(res => res.data),
+  getImports: () =>
+    api.get<AddressImport[]>('/addresses/imports').then(res => res.data),
 }
 
 export interface RadonTestResult {
@@ -88,13 +149,79 @@ export interface RadonTestResultMap {
   valid_test: string
   city?: string
   zip_code?: string
+  distance_miles?: number
+}
+
+interface DictionaryColumn {
+  values: (string | null)[]
+  codes: number[]
+}
+
+// format=columnar payload: parallel arrays, coordinates scaled to integers
+export interface RadonTestResultColumns {
+  format: 'columnar'
+  count: number
+  coordinate_scale: number
+  latitude: number[]
+  longitude: number[]
+  final_result: number[]
+  valid_test: DictionaryColumn
+  city: DictionaryColumn
+  zip_code: DictionaryColumn
+  distance_miles?: number[]
+}
+
+export const decodeRadonColumns = (columns: RadonTestResultColumns): RadonTestResultMap[] => {
+  const results: RadonTestResultMap[] = new Array(columns.count)
+  for (let i = 0; i < columns.count; i++) {
+    results[i] = {
+      latitude: columns.latitude[i] / columns.coordinate_scale,
+      longitude: columns.longitude[i] / columns.coordinate_scale,
+      final_result: columns.final_result[i],
+      valid_test: columns.valid_test.values[columns.valid_test.codes[i]] ?? '',
+      city: columns.city.values[columns.city.codes[i]] ?? undefined,
+      zip_code: columns.zip_code.values[columns.zip_code.codes[i]] ?? undefined,
+    }
+    if (columns.distance_miles) {
+      results[i].distance_miles = columns.distance_miles[i]
+    }
+  }
+  return results
+}
+
+export interface RadonTestResultPage {
+  results: RadonTestResultMap[]
+  next_cursor: string | null
+}
+
+export interface RadonTileBin {
+  latitude: number
+  longitude: number
+  count: number
+  mean: number
+  share_above_action_level: number
+}
+
+export interface RadonTile {
+  z: number
+  x: number
+  y: number
+  type: 'bins' | 'points'
+  bins?: RadonTileBin[]
+  points?: RadonTestResultMap[]
 }
 
 export const tornadoMapApi = {
   getTornadoPath: () =>
     api.get<TornadoPoint[]>('/map/tornado-path').then(res => res.data),
   getRadonTestResults: (nearTornado: boolean = true, radiusMiles: number = 2.0) =>
-    api.get<RadonTestResultMap[]>('/map/radon-results', {
-      params: { near_tornado: nearTornado, radius_miles: radiusMiles }
+    api.get<RadonTestResultColumns>('/map/radon-results', {
+      params: { near_tornado: nearTornado, radius_miles: radiusMiles, format: 'columnar' }
+    }).then(res => decodeRadonColumns(res.data)),
+  getRadonTile: (z: number, x: number, y: number) =>
+    api.get<RadonTile>(`/map/tiles/${z}/${x}/${y}`).then(res => res.data),
+  getRadonTestResultsPage: (cursor?: string, limit: number = 1000, nearTornado: boolean = false, radiusMiles: number = 2.0) =>
+    api.get<RadonTestResultPage>('/map/radon-results/page', {
+      params: { cursor, limit, near_tornado: nearTornado, radius_miles: radiusMiles }
     }).then(res => res.data),
 }